@@ -0,0 +1,180 @@
+# In-process load generator: drives the FastAPI app over an ASGI transport, no sockets
+import asyncio
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+
+from backend.benchmarks.results import peak_rss_mb
+from backend.benchmarks.synthetic import (
+    make_checkins,
+    make_report_image,
+    make_report_text,
+    make_reports,
+    make_scanned_pdf,
+    make_text_pdf,
+)
+
+# A request factory returns (method, path, kwargs for httpx) for request number i
+RequestFactory = Callable[[int], Tuple[str, str, Dict[str, Any]]]
+
+# name -> (measured scenario, background scenario kept running for as long as the measured one runs)
+MIXED_SCENARIOS = {
+    "analyze_under_extraction": ("analyze", "extract_text_pdf"),
+}
+
+
+def _unique(body: bytes, i: int) -> bytes:
+    # Trailing bytes keep every body distinct so the extraction cache cannot short-circuit the run
+    return body + f"\n%bench-{i}\n".encode()
+
+
+def build_scenarios(seed: int = 0, cache: bool = False) -> Dict[str, RequestFactory]:
+    checkins = make_checkins(256, seed=seed)
+    explained = [{**c, "explainMethod": "auto"} for c in checkins]
+    report = make_report_text(random.Random(seed), lines=60)
+    text_pdf = make_text_pdf([report, report])
+    scenarios: Dict[str, RequestFactory] = {
+        "analyze": lambda i: ("POST", "/analyze", {"json": checkins[i % len(checkins)]}),
+        "analyze_explain": lambda i: ("POST", "/analyze", {"json": explained[i % len(explained)]}),
+        "analyze_batch30": lambda i: ("POST", "/analyze_batch", {
+            "json": {"items": [checkins[(i + k) % len(checkins)] for k in range(30)]},
+        }),
+        "extract_text_pdf": lambda i: ("POST", "/extract_from_upload_stream", {
+            "content": text_pdf if cache else _unique(text_pdf, i),
+            "headers": {"Content-Type": "application/pdf"},
+        }),
+    }
+    try:
+        image = make_report_image(report)
+        scanned = make_scanned_pdf(make_reports(2, seed=seed))
+    except RuntimeError:
+        return scenarios
+    scenarios["extract_image"] = lambda i: ("POST", "/extract_from_upload_stream", {
+        "content": image if cache else _unique(image, i),
+        "headers": {"Content-Type": "image/png"},
+    })
+    scenarios["extract_scanned_pdf"] = lambda i: ("POST", "/extract_from_upload_stream", {
+        "content": scanned if cache else _unique(scanned, i),
+        "headers": {"Content-Type": "application/pdf"},
+    })
+    return scenarios
+
+
+def _percentile(sorted_ms: List[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = (len(sorted_ms) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo)
+
+
+def _failed(response: httpx.Response) -> bool:
+    if response.status_code != 200:
+        return True
+    try:
+        body = response.json()
+    except ValueError:
+        return True
+    return isinstance(body, dict) and (body.get("ok") is False or "error" in body)
+
+
+async def _drive(client: httpx.AsyncClient, factory: RequestFactory, concurrency: int,
+                 total: int | None, duration_s: float | None, stop: asyncio.Event | None = None) -> Dict[str, Any]:
+    counter = itertools.count()
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    deadline = time.perf_counter() + duration_s if duration_s else None
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if total is not None and i >= total:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if stop is not None and stop.is_set():
+                return
+            method, path, kwargs = factory(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+                failed = _failed(response)
+            except Exception:
+                status, failed = "exception", True
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            errors += int(failed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "wallS": round(wall, 3),
+        "throughputRps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50Ms": round(_percentile(latencies, 0.50), 3),
+        "p95Ms": round(_percentile(latencies, 0.95), 3),
+        "p99Ms": round(_percentile(latencies, 0.99), 3),
+        "maxMs": round(latencies[-1], 3) if latencies else 0.0,
+        "statusCounts": statuses,
+        "peakRssMb": peak_rss_mb(),
+    }
+
+
+async def _drive_mixed(client: httpx.AsyncClient, foreground: RequestFactory, background: RequestFactory,
+                       concurrency: int, total: int | None, duration_s: float | None) -> Dict[str, Any]:
+    """Measure ``foreground`` while ``background`` runs at the same concurrency; reports both."""
+    stop = asyncio.Event()
+    behind = asyncio.create_task(_drive(client, background, concurrency, None, None, stop=stop))
+    try:
+        measured = await _drive(client, foreground, concurrency, total, duration_s)
+    finally:
+        stop.set()
+    other = await behind
+    measured["background"] = {k: other[k] for k in ("requests", "errors", "throughputRps", "p50Ms", "p99Ms")}
+    return measured
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout_s: float):
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        health = (await client.get("/health")).json()
+        if health.get("ready"):
+            return health
+        await asyncio.sleep(0.05)
+    raise TimeoutError("AI service did not become ready")
+
+
+async def run_load_async(app, scenarios: Dict[str, RequestFactory], names: List[str], concurrency: int = 8,
+                         total: int | None = 500, duration_s: float | None = None,
+                         warmup: int = 20) -> Dict[str, Any]:
+    """Run each named scenario against ``app`` with its lifespan started; returns metrics per scenario."""
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await _wait_ready(client, timeout_s=120)
+            for name in names:
+                if name in MIXED_SCENARIOS:
+                    foreground, background = (scenarios[n] for n in MIXED_SCENARIOS[name])
+                    results[name] = await _drive_mixed(client, foreground, background, concurrency, total, duration_s)
+                    continue
+                factory = scenarios[name]
+                if warmup:
+                    await _drive(client, factory, min(concurrency, warmup), warmup, None)
+                results[name] = await _drive(client, factory, concurrency, total, duration_s)
+    return results
+
+
+def run_load(app, scenarios: Dict[str, RequestFactory], names: List[str], **kwargs) -> Dict[str, Any]:
+    return asyncio.run(run_load_async(app, scenarios, names, **kwargs))
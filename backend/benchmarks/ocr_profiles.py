@@ -0,0 +1,90 @@
+# OCR quality/latency comparison across preprocessing + tesseract profiles on synthetic scans
+import difflib
+import time
+from typing import Any, Dict, List
+
+from backend.benchmarks.synthetic import make_ocr_samples
+from backend.models.ai_service.labExtraction import extract_fields
+from backend.models.ai_service.ocrPipeline import ocr_available, ocr_image
+from backend.models.ai_service.ocrPreprocess import PROFILES, get_profile, preprocess
+
+
+def char_accuracy(expected: str, actual: str) -> float:
+    """Similarity of whitespace-normalized texts in [0, 1] (difflib ratio)."""
+    a, b = " ".join(expected.split()), " ".join(actual.split())
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def lab_recall(expected: str, actual: str) -> float:
+    """Share of labs parsed from the ground-truth text that are also parsed, with the same value, from OCR output."""
+    want = {(lab["name"], lab["value"]) for lab in extract_fields(expected)["labs"]}
+    if not want:
+        return 1.0
+    got = {(lab["name"], lab["value"]) for lab in extract_fields(actual)["labs"]}
+    return len(want & got) / len(want)
+
+
+def _mean(values: List[float]) -> float:
+    return round(sum(values) / len(values), 4) if values else 0.0
+
+
+def run_ocr_comparison(profiles: List[str] | None = None, n_pages: int = 2, seed: int = 0,
+                       lang: str = "eng") -> Dict[str, Any]:
+    """Per profile: preprocessing stage times, pixels handed to tesseract, OCR time and quality.
+
+    Quality and OCR time need tesseract; without it only preprocessing is measured.
+    """
+    samples = make_ocr_samples(n_pages=n_pages, seed=seed)
+    run_ocr = ocr_available(images_only=True)
+    results: Dict[str, Any] = {"samples": len(samples), "ocr": run_ocr, "profiles": {}}
+    for name in profiles or list(PROFILES):
+        profile = get_profile(name)
+        stage_ms: Dict[str, List[float]] = {}
+        megapixels, ocr_ms, accuracy, recall = [], [], [], []
+        by_variant: Dict[str, List[float]] = {}
+        for sample in samples:
+            img = sample["image"]
+            if profile.preprocess:
+                out, stages, _ = preprocess(img, profile, dpi=sample["dpi"])
+                for stage, ms in stages.items():
+                    stage_ms.setdefault(stage, []).append(ms)
+            else:
+                out = img
+            megapixels.append(out.width * out.height / 1e6)
+            if not run_ocr:
+                continue
+            started = time.perf_counter()
+            page = ocr_image(img, lang=lang, profile=profile.name, dpi=sample["dpi"])
+            ocr_ms.append((time.perf_counter() - started) * 1000)
+            acc = char_accuracy(sample["text"], page["text"])
+            accuracy.append(acc)
+            recall.append(lab_recall(sample["text"], page["text"]))
+            by_variant.setdefault(sample["variant"], []).append(acc)
+        row: Dict[str, Any] = {
+            "tesseractConfig": profile.tesseract_config(),
+            "preprocessMs": {stage: _mean(v) for stage, v in stage_ms.items()},
+            "preprocessTotalMs": _mean([sum(x) for x in zip(*stage_ms.values())]) if stage_ms else 0.0,
+            "megapixels": _mean(megapixels),
+        }
+        if run_ocr:
+            row.update(
+                ocrMs=_mean(ocr_ms),
+                charAccuracy=_mean(accuracy),
+                labRecall=_mean(recall),
+                charAccuracyByVariant={k: _mean(v) for k, v in by_variant.items()},
+            )
+        results["profiles"][profile.name] = row
+    return results
+
+
+def format_ocr_comparison(results: Dict[str, Any]) -> str:
+    header = f"{'profile':<11} {'prep ms':>9} {'MPix':>6} {'ocr ms':>9} {'chars':>6} {'labs':>6}"
+    lines = [header, "-" * len(header)]
+    for name, row in results["profiles"].items():
+        ocr_ms = f"{row['ocrMs']:9.1f}" if "ocrMs" in row else f"{'-':>9}"
+        acc = f"{row['charAccuracy']:6.3f}" if "charAccuracy" in row else f"{'-':>6}"
+        rec = f"{row['labRecall']:6.3f}" if "labRecall" in row else f"{'-':>6}"
+        lines.append(f"{name:<11} {row['preprocessTotalMs']:9.1f} {row['megapixels']:6.2f} {ocr_ms} {acc} {rec}")
+    if not results["ocr"]:
+        lines.append("(tesseract not available: preprocessing only)")
+    return "\n".join(lines)
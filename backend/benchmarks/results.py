@@ -0,0 +1,101 @@
+# Benchmark result files, environment capture and baseline comparison
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    info: Dict[str, Any] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+    }
+    for name in ("numpy", "torch", "captum", "shap", "pdfminer", "pytesseract"):
+        try:
+            module = __import__(name)
+            info[name] = getattr(module, "__version__", "installed")
+        except Exception:
+            info[name] = None
+    return info
+
+
+def save_results(results: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Metric name -> True when larger is better
+_DIRECTIONS = {
+    "medianUs": False,
+    "p95Us": False,
+    "throughputRps": True,
+    "p50Ms": False,
+    "p95Ms": False,
+    "p99Ms": False,
+}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.15) -> List[Dict[str, Any]]:
+    """Compare every shared benchmark metric; returns one row per metric with its relative change.
+
+    A row is marked ``regression`` when it is worse than the baseline by more than ``tolerance``.
+    """
+    rows: List[Dict[str, Any]] = []
+    for section in ("micro", "load"):
+        cur_section = current.get(section) or {}
+        base_section = baseline.get(section) or {}
+        for name in sorted(set(cur_section) & set(base_section)):
+            cur, base = cur_section[name], base_section[name]
+            if not isinstance(cur, dict) or not isinstance(base, dict):
+                continue
+            for metric, higher_is_better in _DIRECTIONS.items():
+                if metric not in cur or metric not in base or not base[metric]:
+                    continue
+                change = (cur[metric] - base[metric]) / base[metric]
+                worse = -change if higher_is_better else change
+                rows.append({
+                    "benchmark": f"{section}.{name}",
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": cur[metric],
+                    "change": round(change, 4),
+                    "regression": worse > tolerance,
+                })
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<44} {'metric':<14} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        lines.append(
+            f"{r['benchmark']:<44} {r['metric']:<14} {r['baseline']:>12.2f} {r['current']:>12.2f} {r['change'] * 100:>7.1f}%{flag}"
+        )
+    return "\n".join(lines)
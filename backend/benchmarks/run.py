@@ -0,0 +1,70 @@
+# Benchmark CLI: python -m backend.benchmarks.run --help
+import argparse
+import json
+import os
+import sys
+
+from backend.benchmarks.results import compare, environment, format_comparison, load_results, peak_rss_mb, save_results
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "latest.json")
+DEFAULT_LOAD_SCENARIOS = ("analyze", "analyze_explain", "analyze_batch30", "extract_text_pdf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks and in-process load tests for the AI service.")
+    parser.add_argument("--suite", choices=("micro", "load", "ocr", "all"), default="all",
+                        help="all = micro + load; ocr compares OCR profiles and is run on request")
+    parser.add_argument("--quick", action="store_true", help="shorter timings, for smoke runs")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_LOAD_SCENARIOS),
+                        help="comma-separated load scenarios (also: extract_image, extract_scanned_pdf, "
+                             "analyze_under_extraction)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--duration", type=float, default=None, help="seconds per scenario (overrides --requests)")
+    parser.add_argument("--cache", action="store_true", help="reuse identical documents so extraction hits the cache")
+    parser.add_argument("--ocr-profiles", help="comma-separated OCR profiles to compare (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment(), "args": vars(args)}
+    if args.suite in ("micro", "all"):
+        from backend.benchmarks.micro import run_micro
+
+        results["micro"] = run_micro(quick=args.quick, seed=args.seed)
+    if args.suite in ("load", "all"):
+        from backend.benchmarks.loadgen import MIXED_SCENARIOS, build_scenarios, run_load
+        from backend.models.ai_service.main import app
+
+        scenarios = build_scenarios(seed=args.seed, cache=args.cache)
+        names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+        unknown = [n for n in names if n not in scenarios and n not in MIXED_SCENARIOS]
+        if unknown:
+            parser.error(f"unknown or unavailable scenarios: {', '.join(unknown)}")
+        total = None if args.duration else (max(20, args.requests // 5) if args.quick else args.requests)
+        results["load"] = run_load(app, scenarios, names, concurrency=args.concurrency,
+                                   total=total, duration_s=args.duration)
+    if args.suite == "ocr":
+        from backend.benchmarks.ocr_profiles import format_ocr_comparison, run_ocr_comparison
+
+        profiles = [p.strip() for p in args.ocr_profiles.split(",")] if args.ocr_profiles else None
+        results["ocr"] = run_ocr_comparison(profiles, n_pages=1 if args.quick else 3, seed=args.seed)
+        print(format_ocr_comparison(results["ocr"]), file=sys.stderr)
+    results["peakRssMb"] = peak_rss_mb()
+
+    save_results(results, args.out)
+    print(json.dumps({k: results[k] for k in ("micro", "load", "ocr") if k in results}, indent=2))
+    print(f"results written to {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        rows = compare(results, load_results(args.baseline), tolerance=args.tolerance)
+        print(format_comparison(rows))
+        if any(r["regression"] for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+# Deterministic synthetic check-ins, lab report text, PDFs and images for benchmarks
+import io
+import random
+from typing import Any, Dict, List
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except Exception:
+    Image = None
+    ImageDraw = None
+    ImageFont = None
+
+_LAB_LINES = (
+    ("Glucose", (70, 260), "mg/dL"),
+    ("Hemoglobin", (8, 17), "g/dL"),
+    ("HbA1c", (4.5, 11), "%"),
+    ("Creatinine", (0.5, 3.5), "mg/dL"),
+    ("Sodium", (128, 150), "mmol/L"),
+    ("Potassium", (3.0, 6.0), "mmol/L"),
+    ("WBC", (3, 22), "10^3/uL"),
+    ("Platelets", (90, 450), "10^3/uL"),
+    ("CRP", (0.5, 120), "mg/L"),
+    ("Total Cholesterol", (120, 320), "mg/dL"),
+    ("ALT", (8, 180), "U/L"),
+    ("Total Bilirubin", (0.2, 4.0), "mg/dL"),
+)
+
+
+def make_checkin(rng: random.Random, missing_rate: float = 0.1) -> Dict[str, Any]:
+    """A plausible /analyze payload; each field is dropped with ``missing_rate``."""
+
+    def maybe(value):
+        return None if rng.random() < missing_rate else value
+
+    vitals = {
+        "heartRate": maybe(round(rng.gauss(84, 18), 1)),
+        "systolicBP": maybe(round(rng.gauss(124, 20), 1)),
+        "diastolicBP": maybe(round(rng.gauss(79, 12), 1)),
+        "respiratoryRate": maybe(round(rng.gauss(17, 4), 1)),
+        "temperature": maybe(round(rng.gauss(37.2, 0.8), 1)),
+    }
+    labs = {
+        "wbc": maybe(round(abs(rng.gauss(8.5, 3.5)), 2)),
+        "crp": maybe(round(abs(rng.gauss(12, 20)), 2)),
+        "glucose": maybe(round(abs(rng.gauss(110, 35)), 1)),
+    }
+    return {
+        "notes": "synthetic check-in",
+        "vitals": {k: v for k, v in vitals.items() if v is not None},
+        "labs": {k: v for k, v in labs.items() if v is not None},
+        "explainMethod": "none",
+    }
+
+
+def make_checkins(n: int, seed: int = 0, **kwargs) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [make_checkin(rng, **kwargs) for _ in range(n)]
+
+
+def make_report_text(rng: random.Random, lines: int = 40) -> str:
+    """A lab report with header metadata, analyte lines and filler text."""
+    out = [
+        "CITY DIAGNOSTICS LABORATORY",
+        f"Patient Name: Test Patient {rng.randint(1, 999)}",
+        f"Patient ID: MRN-{rng.randint(100000, 999999)}",
+        f"Date: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024",
+        "",
+    ]
+    while len(out) < lines:
+        name, (lo, hi), unit = rng.choice(_LAB_LINES)
+        if rng.random() < 0.25:
+            out.append("Sample collected in fasting state. Reference ranges vary by method.")
+        else:
+            out.append(f"{name}: {rng.uniform(lo, hi):.1f} {unit}")
+    return "\n".join(out)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_text_pdf(pages: List[str]) -> bytes:
+    """A minimal PDF with a real text layer (Helvetica), one page per string."""
+    objects: List[bytes] = []
+    n_pages = len(pages)
+    page_ids = [3 + 2 * i for i in range(n_pages)]
+    font_id = 3 + 2 * n_pages
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>".encode())
+    for i, text in enumerate(pages):
+        body = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"]
+        for line in text.splitlines()[:60]:
+            body.append(f"({_pdf_escape(line)}) Tj T*")
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {page_ids[i] + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    buf = io.BytesIO()
+    buf.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(buf.tell())
+        buf.write(f"{i} 0 obj\n".encode() + obj + b"\nendobj\n")
+    xref = buf.tell()
+    buf.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        buf.write(f"{off:010d} 00000 n \n".encode())
+    buf.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return buf.getvalue()
+
+
+def _font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def render_page_image(text: str, width: int = 1240, height: int = 1754, font_size: int = 28):
+    """Render report text onto a white grayscale page (A4 at ~150 DPI)."""
+    if Image is None:
+        raise RuntimeError("Pillow is required for synthetic images")
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    font = _font(font_size)
+    y = 60
+    for line in text.splitlines():
+        draw.text((80, y), line, fill=0, font=font)
+        y += int(font_size * 1.4)
+        if y > height - 60:
+            break
+    return img
+
+
+def make_report_image(text: str, fmt: str = "PNG", **kwargs) -> bytes:
+    buf = io.BytesIO()
+    render_page_image(text, **kwargs).save(buf, fmt)
+    return buf.getvalue()
+
+
+def make_scanned_pdf(pages: List[str]) -> bytes:
+    """An image-only PDF (no text layer), so extraction must go through OCR."""
+    images = [render_page_image(text) for text in pages]
+    buf = io.BytesIO()
+    images[0].save(buf, "PDF", save_all=True, append_images=images[1:], resolution=150)
+    return buf.getvalue()
+
+
+def make_reports(n_pages: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [make_report_text(rng) for _ in range(n_pages)]
+
+
+def make_ocr_samples(n_pages: int = 2, seed: int = 0, dpi: int = 200) -> List[Dict[str, Any]]:
+    """Rendered report pages with known text, in scan-like variants, for OCR comparisons.
+
+    Variants: ``clean`` (straight, white page), ``skewed`` (rotated 2.5 degrees),
+    ``margins`` (text in a small block on an oversized, slightly gray page) and
+    ``rgb_noisy`` (RGB with speckle noise). Pages are rendered at ``dpi``.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required for synthetic images")
+    rng = random.Random(seed)
+    width, height = round(8.27 * dpi), round(11.69 * dpi)
+    font_size = round(dpi * 0.18)
+    samples = []
+    for text in make_reports(n_pages, seed=seed):
+        page = render_page_image(text, width=width, height=height, font_size=font_size)
+        skewed = page.rotate(2.5, expand=True, fillcolor=255)
+        margins = Image.new("L", (width + dpi * 2, height + dpi * 2), 235)
+        margins.paste(page, (dpi, dpi))
+        noisy = page.convert("RGB")
+        pixels = noisy.load()
+        for _ in range(width * height // 200):
+            x, y = rng.randrange(width), rng.randrange(height)
+            pixels[x, y] = (rng.randrange(256),) * 3
+        for variant, img in (("clean", page), ("skewed", skewed), ("margins", margins), ("rgb_noisy", noisy)):
+            samples.append({"variant": variant, "image": img, "dpi": dpi, "text": text})
+    return samples
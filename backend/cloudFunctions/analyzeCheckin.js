@@ -22,7 +22,11 @@ module.exports = async function analyzeCheckin(req, res) {
           explainMethod: payload?.payload?.explainMethod,
           useScipyWinsorize: payload?.payload?.useScipyWinsorize,
         };
-        const { data } = await httpClient.post(`${usePython.replace(/\/$/, '')}/analyze`, body, { timeout: 8000 });
+        const { data } = await httpClient.post(`${usePython.replace(/\/$/, '')}/analyze`, body, {
+          timeout: 8000,
+          // Lets the service skip or degrade explanations instead of running past our timeout
+          headers: { 'X-Request-Timeout-Ms': '8000' },
+        });
         advisory = await advisoryAgent(data);
       } catch (e) {
         // fall back to local analysis below
@@ -25,10 +25,19 @@ module.exports = [
       // If Python AI service is configured, prefer it for robust PDF/image extraction
       if (AI_SERVICE_URL) {
         try {
+          // Send raw bytes; the streaming endpoint spools to disk instead of decoding base64 JSON
           const { data } = await httpClient.post(
-            `${AI_SERVICE_URL.replace(/\/$/, '')}/extract_from_upload`,
-            { data: file.buffer.toString('base64'), mime: file.mimetype },
-            { timeout: 30000 }
+            `${AI_SERVICE_URL.replace(/\/$/, '')}/extract_from_upload_stream`,
+            file.buffer,
+            {
+              timeout: 30000,
+              params: { mime: file.mimetype },
+              headers: {
+                'Content-Type': file.mimetype || 'application/octet-stream',
+                'X-Request-Timeout-Ms': '30000',
+              },
+              maxBodyLength: Infinity,
+            }
           );
           if (data && data.ok) {
             // Normalize and return immediately (also perform validation/sanitization like local path)
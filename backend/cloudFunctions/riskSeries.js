@@ -14,17 +14,22 @@ module.exports = async function riskSeries(req, res) {
     // Prefer configured URL; in dev, auto-try localhost if env not set
     const usePython = AI_SERVICE_URL || 'http://localhost:8000';
     let points = [];
+    let trends = null;
     if (usePython) {
       try {
-        // For now, approximate risk using top-1 diagnosis confidence from python per checkin notes only
-        const results = [];
-        for (const it of reversed) {
-          const body = { notes: it.notes || 'daily checkin' };
-          const { data } = await httpClient.post(`${usePython.replace(/\/$/, '')}/analyze`, body, { timeout: 5000 });
-          const top = Array.isArray(data?.diagnoses) && data.diagnoses[0] ? Number(data.diagnoses[0].confidence) : null;
-          results.push(typeof top === 'number' ? top : 0.5);
-        }
-        points = results;
+        // Risk is the top-1 diagnosis confidence per check-in. The service caches scores by
+        // check-in id and model version, so a refresh only scores check-ins it has not seen yet.
+        const checkins = reversed.map((it, i) => ({ id: String(it.id || i), date: labels[i], notes: it.notes || 'daily checkin' }));
+        const { data } = await httpClient.post(`${usePython.replace(/\/$/, '')}/risk_series`, { userId, checkins }, {
+          timeout: 5000,
+          headers: { 'X-Request-Timeout-Ms': '5000' },
+        });
+        const scored = data?.ok && Array.isArray(data.points) ? data.points : [];
+        points = reversed.map((_, i) => {
+          const top = Number(scored[i]);
+          return typeof scored[i] === 'number' && !Number.isNaN(top) ? top : 0.5;
+        });
+        trends = data?.trends || null;
       } catch (e) {
         // fall back to simple client-side compatible average if python unavailable
         points = reversed.map(() => 0.5);
@@ -33,7 +38,7 @@ module.exports = async function riskSeries(req, res) {
       points = reversed.map(() => 0.5);
     }
 
-    return res.json({ ok: true, labels, points });
+    return res.json({ ok: true, labels, points, trends });
   } catch (e) {
     return res.status(500).json({ ok: false, error: e.message });
   }
@@ -0,0 +1,77 @@
+# Per-endpoint admission control: bounded concurrency plus a bounded wait queue
+import asyncio
+from collections import deque
+from typing import Any, Dict
+
+QUEUE_FULL = "queue_full"
+DEADLINE = "deadline"
+
+
+class AdmissionGate:
+    """At most ``max_concurrency`` requests run; at most ``max_queue`` wait for a slot.
+
+    Used from the event loop only, so no locking. A request that finds the queue
+    full is rejected at once instead of adding to the backlog; a queued request
+    gives up when its deadline passes. A released slot is handed directly to the
+    oldest waiter.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self._active = 0
+        self._waiters: deque = deque()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {QUEUE_FULL: 0, DEADLINE: 0}
+
+    async def acquire(self, timeout_s: float | None = None) -> str | None:
+        """Take a slot, waiting up to ``timeout_s``. Returns None when admitted, else the rejection reason."""
+        if timeout_s is not None and timeout_s <= 0:
+            return self._reject(DEADLINE)
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return self._reject(QUEUE_FULL)
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout_s)
+        except asyncio.TimeoutError:
+            if fut in self._waiters:
+                self._waiters.remove(fut)
+            elif fut.done() and not fut.cancelled():
+                self.release()  # the slot was handed over as the wait timed out
+            return self._reject(DEADLINE)
+        except asyncio.CancelledError:
+            if fut in self._waiters:
+                self._waiters.remove(fut)  # a disconnected client must not hold a queue place
+            elif fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        self.admitted += 1
+        return None
+
+    def release(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)  # slot passes to the waiter; _active is unchanged
+                return
+        self._active -= 1
+
+    def _reject(self, reason: str) -> str:
+        self.rejected[reason] += 1
+        return reason
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxConcurrency": self.max_concurrency,
+            "maxQueue": self.max_queue,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
@@ -0,0 +1,119 @@
+# Bounded LRU + TTL cache for feature attribution results
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+
+def weights_hash(model) -> str:
+    """Stable SHA-256 fingerprint of a model's parameters and buffers.
+
+    Also accepts a dict of exported NumPy weights (see inferenceBackends).
+    """
+    h = hashlib.sha256()
+    if isinstance(model, dict):
+        for name, arr in sorted(model.items()):
+            h.update(name.encode("utf-8"))
+            h.update(arr.tobytes())
+        return h.hexdigest()
+    state_dict = getattr(model, "state_dict", None)
+    if state_dict is None:
+        h.update(repr(type(model)).encode("utf-8"))
+        return h.hexdigest()
+    for name, tensor in sorted(state_dict().items()):
+        h.update(name.encode("utf-8"))
+        h.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+class AttributionCache:
+    """Thread-safe LRU cache with per-entry TTL for explainer outputs.
+
+    Keys combine the model weights hash, explain method, target class and the
+    normalized feature vector rounded to ``decimals`` places, so near-identical
+    check-ins share one Integrated Gradients / SHAP run.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_s: float = 3600.0, decimals: int = 3, enabled: bool = True):
+        self.max_size = max(1, int(max_size))
+        self.ttl_s = float(ttl_s)
+        self.decimals = int(decimals)
+        self.enabled = bool(enabled)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, model_hash: str, method: str | None, target_index: int, x_row) -> Tuple:
+        """Build a cache key from a (1, F) tensor/array row."""
+        if hasattr(x_row, "detach"):
+            x_row = x_row.detach().cpu().numpy()
+        try:
+            values = x_row.reshape(-1).round(self.decimals)
+        except AttributeError:
+            values = [round(float(v), self.decimals) for v in x_row]
+        # +0.0 folds -0.0 into 0.0 so both round to the same key
+        features = tuple(float(v) + 0.0 for v in values)
+        return (model_hash, (method or "auto").lower(), int(target_index), features)
+
+    def get(self, key: Hashable):
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_hash: str | None = None):
+        """Drop all entries, or only those computed for ``model_hash``.
+
+        Call this from model reload paths so stale attributions are never served.
+        """
+        with self._lock:
+            if model_hash is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == model_hash]:
+                    del self._data[key]
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxSize": self.max_size,
+                "ttlS": self.ttl_s,
+                "decimals": self.decimals,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,89 @@
+# Per-request deadlines propagated from callers and checked between processing stages
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Mapping
+
+TIMEOUT_HEADER = "x-request-timeout-ms"  # budget relative to arrival, in milliseconds
+DEADLINE_HEADER = "x-request-deadline"   # absolute Unix time, in seconds or milliseconds
+
+# Absolute time.monotonic() deadline of the request being served; None: no deadline
+_DEADLINE: contextvars.ContextVar = contextvars.ContextVar("ai_request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before ``stage`` could start or finish."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded at {stage}")
+        self.stage = stage
+
+    def __reduce__(self):
+        # Raised in extraction pool workers and re-raised in the server process
+        return (DeadlineExceeded, (self.stage,))
+
+
+def parse_deadline(headers: Mapping[str, str], default_timeout_s: float = 0.0) -> float | None:
+    """Monotonic deadline from the request headers, or ``default_timeout_s`` after now.
+
+    When several are given the earliest wins. Malformed header values are ignored.
+    """
+    now = time.monotonic()
+    budgets = []
+    raw = headers.get(TIMEOUT_HEADER)
+    if raw:
+        try:
+            budgets.append(float(raw) / 1000.0)
+        except ValueError:
+            pass
+    raw = headers.get(DEADLINE_HEADER)
+    if raw:
+        try:
+            at = float(raw)
+            budgets.append((at / 1000.0 if at > 1e11 else at) - time.time())
+        except ValueError:
+            pass
+    if default_timeout_s and default_timeout_s > 0:
+        budgets.append(default_timeout_s)
+    return now + min(budgets) if budgets else None
+
+
+@contextmanager
+def deadline_scope(deadline: float | None):
+    """Make ``deadline`` the current request's deadline; threadpool calls inherit it."""
+    token = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def current_deadline() -> float | None:
+    return _DEADLINE.get()
+
+
+def remaining_s() -> float | None:
+    """Seconds left before the current deadline (may be negative); None without a deadline."""
+    deadline = _DEADLINE.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def remaining_ms() -> float | None:
+    left = remaining_s()
+    return None if left is None else left * 1000.0
+
+
+def check_deadline(stage: str):
+    """Raise DeadlineExceeded when the current deadline has passed; cheap enough to call per page."""
+    deadline = _DEADLINE.get()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded(stage)
+
+
+def wait_timeout(cap: float | None = None) -> float | None:
+    """Timeout for a blocking wait: the remaining budget, optionally capped, never negative."""
+    left = remaining_s()
+    if left is None:
+        return cap
+    left = max(0.0, left)
+    return left if cap is None else min(left, cap)
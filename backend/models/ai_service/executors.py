@@ -0,0 +1,156 @@
+# Dedicated executors per workload class, so slow extraction never queues behind or in front of inference
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class PoolSaturated(Exception):
+    """The pool already holds ``max_workers + max_queue`` tasks."""
+
+    def __init__(self, pool: str):
+        super().__init__(f"{pool} pool is saturated")
+        self.pool = pool
+
+
+def _noop():
+    return None
+
+
+def _timed_call(fn: Callable, submitted: float, args: tuple, kwargs: dict):
+    """Run ``fn`` and report its queue wait and run time; executes in the pool worker.
+
+    ``submitted`` is a ``time.monotonic()`` stamp, comparable across processes on one host.
+    """
+    started = time.monotonic()
+    result = fn(*args, **kwargs)
+    return result, started - submitted, time.monotonic() - started
+
+
+class WorkloadPool:
+    """A thread or process pool for one workload class, with a bounded backlog and utilization counters.
+
+    ``run`` is awaited from the event loop. Thread tasks run in a copy of the
+    caller's context, so request deadlines and stage traces carry over. Process
+    tasks must be picklable module-level functions; the executor is created on
+    first use with ``mp_context`` (default spawn, which is safe to start from a
+    threaded server). ``max_workers=0`` runs process tasks in the default
+    threadpool instead, for platforms or tests without subprocesses.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int,
+                 mp_context: str | None = "spawn", initializer: Callable | None = None, initargs: tuple = ()):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unknown pool kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(0, int(max_workers)) if kind == "process" else max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self._mp_context = mp_context
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor = None
+        self._lock = threading.Lock()
+        self._created = time.monotonic()
+        self._inflight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_s = 0.0
+        self.wait_s = 0.0
+
+    @property
+    def out_of_process(self) -> bool:
+        return self.kind == "process" and self.max_workers > 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "thread":
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-pool")
+                    elif self.max_workers > 0:
+                        ctx = multiprocessing.get_context(self._mp_context) if self._mp_context else None
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx,
+                                                             initializer=self._initializer, initargs=self._initargs)
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on this pool; raises PoolSaturated when the backlog is full."""
+        with self._lock:
+            if self._inflight >= max(1, self.max_workers) + self.max_queue:
+                self.rejected += 1
+                raise PoolSaturated(self.name)
+            self._inflight += 1
+            self.submitted += 1
+        try:
+            executor = self._get_executor()
+            submitted = time.monotonic()
+            if executor is None:
+                loop = asyncio.get_running_loop()
+                ctx = contextvars.copy_context()
+                future = loop.run_in_executor(None, ctx.run, _timed_call, fn, submitted, args, kwargs)
+            elif self.kind == "thread":
+                ctx = contextvars.copy_context()
+                future = asyncio.wrap_future(executor.submit(ctx.run, _timed_call, fn, submitted, args, kwargs))
+            else:
+                future = asyncio.wrap_future(executor.submit(_timed_call, fn, submitted, args, kwargs))
+            try:
+                result, wait_s, run_s = await future
+            except BaseException as e:
+                with self._lock:
+                    self.failed += 1
+                if isinstance(e, BrokenExecutor):
+                    self._discard(executor)  # a worker died; start a fresh pool on the next call
+                raise
+            with self._lock:
+                self.completed += 1
+                self.wait_s += wait_s
+                self.busy_s += run_s
+            return result
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def start(self):
+        """Create the executor and start its worker processes now rather than on the first task."""
+        executor = self._get_executor()
+        if executor is not None and self.kind == "process":
+            executor.submit(_noop)
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy now, plus utilization (busy worker-seconds over capacity) since the pool was created."""
+        with self._lock:
+            workers = max(1, self.max_workers)
+            elapsed = max(time.monotonic() - self._created, 1e-9)
+            return {
+                "kind": "inline" if self.kind == "process" and not self.max_workers else self.kind,
+                "workers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "inflight": self._inflight,
+                "busy": min(self._inflight, workers),
+                "queued": max(0, self._inflight - workers),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "busySeconds": round(self.busy_s, 3),
+                "utilization": round(min(1.0, self.busy_s / (elapsed * workers)), 4),
+                "avgQueueWaitMs": round(self.wait_s / self.completed * 1000, 3) if self.completed else 0.0,
+            }
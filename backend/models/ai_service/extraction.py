@@ -0,0 +1,230 @@
+# Document text extraction (text layer, OCR, field parsing); runs in the extraction process pool
+from typing import Any, Callable, Dict, List, Tuple
+
+try:
+    from backend.models.ai_service import settings
+    from backend.models.ai_service.ocrPipeline import (
+        OcrPageStream, ocr_available, ocr_image_bytes, ocr_pdf_bytes, ocr_pdf_path, pdf_page_count,
+    )
+    from backend.models.ai_service.pdfTextLayer import iter_text_pages, text_layer_available, text_page_count
+    from backend.models.ai_service.ocrPreprocess import get_profile
+    from backend.models.ai_service.labExtraction import extract_fields
+    from backend.models.ai_service.deadlines import DeadlineExceeded, check_deadline, deadline_scope
+    from backend.models.instrumentation import span, trace_stages
+    from backend.models.optionalDeps import preload
+except Exception:
+    from . import settings
+    from .ocrPipeline import OcrPageStream, ocr_available, ocr_image_bytes, ocr_pdf_bytes, ocr_pdf_path, pdf_page_count
+    from .pdfTextLayer import iter_text_pages, text_layer_available, text_page_count
+    from .ocrPreprocess import get_profile
+    from .labExtraction import extract_fields
+    from .deadlines import DeadlineExceeded, check_deadline, deadline_scope
+    from ..instrumentation import span, trace_stages
+    from ..optionalDeps import preload
+
+
+class ExtractOptions:
+    """Plain, picklable copy of the extraction options of a request model."""
+
+    __slots__ = ("lang", "use_ocr", "dpi", "first_page", "last_page", "ocr_profile")
+
+    def __init__(self, lang: str | None = None, use_ocr: bool | None = None, dpi: int | None = None,
+                 first_page: int | None = None, last_page: int | None = None, ocr_profile: str | None = None):
+        self.lang = lang
+        self.use_ocr = use_ocr
+        self.dpi = dpi
+        self.first_page = first_page
+        self.last_page = last_page
+        self.ocr_profile = ocr_profile
+
+    @classmethod
+    def from_request(cls, req) -> "ExtractOptions":
+        return cls(**{name: getattr(req, name, None) for name in cls.__slots__})
+
+
+def ocr_profile_name(req) -> str:
+    """Resolved OCR profile name for a request; raises ValueError for unknown names."""
+    return get_profile(getattr(req, "ocr_profile", None) or settings.OCR_PROFILE).name
+
+
+def _merge_page(page: Dict[str, Any], ocr: Dict[str, Any] | None) -> Dict[str, Any]:
+    entry = {k: page[k] for k in ("page", "chars", "density", "imageCoverage")}
+    if ocr is None:
+        entry.update(method="pdfminer", text=page["text"])
+    else:
+        entry.update(ocr, method="ocr")
+        if not ocr.get("text"):
+            # OCR failed or found nothing; keep whatever the text layer had
+            entry["text"] = page["text"]
+    return entry
+
+
+def extract_pdf_pages(content, req, lang: str, profile: str, timings: Dict[str, float],
+                      on_page: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+    """Per-page text layer, with OCR only for pages that fail the density test.
+
+    Pages are handed to the OCR pool as soon as pdfminer has laid them out, so
+    OCR of early pages overlaps with parsing of later ones. With ``use_ocr``
+    False nothing is OCR'd. Page records carry a ``method`` tag and are merged
+    in page order. ``on_page`` receives each final page record as soon as it
+    is known: text-layer pages during parsing, OCR'd pages as OCR finishes.
+    """
+    allow_ocr = req.use_ocr is None and ocr_available()
+    text_pages: Dict[int, Dict[str, Any]] = {}
+    ocr_by_page: Dict[int, Dict[str, Any]] = {}
+    with OcrPageStream(content, lang=lang, dpi=req.dpi, profile=profile) as stream:
+        with span("pdfminer") as sp:
+            for page in iter_text_pages(content, req.first_page, req.last_page):
+                check_deadline("pdfminer")
+                if allow_ocr and page["needsOcr"]:
+                    stream.submit(page["page"])
+                elif on_page is not None:
+                    on_page(_merge_page(page, None))
+                text_pages[page["page"]] = page
+        timings["pdfminerMs"] = round(sp.elapsed_ms, 2)
+        if len(stream):
+            report = None if on_page is None else (lambda ocr: on_page(_merge_page(text_pages[ocr["page"]], ocr)))
+            with span("ocr") as sp:
+                ocr_by_page = {p["page"]: p for p in stream.results(on_page=report)}
+            timings["ocrMs"] = round(sp.elapsed_ms, 2)
+
+    pages = [_merge_page(page, ocr_by_page.get(n)) for n, page in text_pages.items()]
+
+    if not ocr_by_page:
+        method = "pdfminer"
+    elif len(ocr_by_page) == len(pages):
+        method = "ocr"
+    else:
+        method = "hybrid"
+    if req.last_page is None:
+        page_count = max(1, int(req.first_page or 1)) - 1 + len(pages)
+    else:
+        page_count = pdf_page_count(content) if isinstance(content, str) else None
+    return {
+        "text": "\n\n".join(p["text"] for p in pages if p.get("text")).strip(),
+        "pages": pages,
+        "method": method,
+        "pageCount": page_count,
+    }
+
+
+def extract_document(content, mime: str | None, req, timings: Dict[str, float] | None = None,
+                     on_page: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+    """Text-layer/OCR extraction plus field parsing shared by the extraction endpoints.
+
+    ``content`` is the document as bytes or a path to a spooled file. PDFs are
+    read page by page. In auto mode only pages without a usable text layer are
+    OCR'd (see ``extract_pdf_pages``). ``use_ocr=True`` OCRs every page.
+    Anything else is treated as an image and OCR'd directly. Stage durations
+    are written into ``timings`` when given; ``on_page`` is called with each
+    page record as it completes (see ``extract_pdf_pages``).
+    """
+    on_disk = isinstance(content, str)
+    timings = timings if timings is not None else {}
+    chosen_lang = (req.lang or "eng").strip()
+    profile = ocr_profile_name(req)
+    text = ""
+    method = "none"
+    page_count = None
+    ocr_pages: List[Dict[str, Any]] = []
+
+    if mime == "application/pdf":
+        hybrid = None
+        if req.use_ocr is not True and text_layer_available():
+            try:
+                hybrid = extract_pdf_pages(content, req, chosen_lang, profile, timings, on_page)
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                # Unparseable text layer: OCR the whole range below when allowed
+                if req.use_ocr is False or not ocr_available():
+                    raise
+        if hybrid is not None:
+            text, method, page_count, ocr_pages = hybrid["text"], hybrid["method"], hybrid["pageCount"], hybrid["pages"]
+        elif req.use_ocr is not False and ocr_available():
+            check_deadline("ocr")
+            method = "ocr"
+            ocr_pdf = ocr_pdf_path if on_disk else ocr_pdf_bytes
+            with span("ocr") as sp:
+                ocr = ocr_pdf(content, lang=chosen_lang, dpi=req.dpi, first_page=req.first_page, last_page=req.last_page,
+                              profile=profile, on_page=_tagged(on_page))
+            timings["ocrMs"] = round(sp.elapsed_ms, 2)
+            page_count = ocr["pageCount"]
+            ocr_pages = [{**p, "method": "ocr"} for p in ocr["pages"]]
+            text = ocr["text"]
+    else:
+        # Assume image
+        if ocr_available(images_only=True):
+            try:
+                with span("ocr") as sp:
+                    ocr = ocr_image_bytes(content, lang=chosen_lang, profile=profile)
+                timings["ocrMs"] = round(sp.elapsed_ms, 2)
+                for page in ocr["pages"] if on_page is not None else ():
+                    on_page({**page, "method": "ocr"})
+                method = "ocr"
+                page_count = ocr["pageCount"]
+                ocr_pages = [{**p, "method": "ocr"} for p in ocr["pages"]]
+                text = ocr["text"]
+            except DeadlineExceeded:
+                raise
+            except Exception:
+                text = ""
+
+    check_deadline("extract_fields")
+    with span("extract_fields"):
+        extracted = extract_fields(text)
+    return {
+        "ocr": {"text": text, "pages": ocr_pages, "method": method, "pageCount": page_count, "lang": chosen_lang,
+                "profile": profile},
+        "extracted": extracted,
+    }
+
+
+def _tagged(on_page):
+    return None if on_page is None else (lambda page: on_page({**page, "method": "ocr"}))
+
+
+def expected_pages(content, mime: str | None, req) -> int | None:
+    """Pages ``extract_document`` will return for this document and page range; None when unknown."""
+    if mime != "application/pdf":
+        return 1
+    total = text_page_count(content) if text_layer_available() else None
+    if total is None:
+        total = pdf_page_count(content) if isinstance(content, str) else None
+    first = max(1, int(req.first_page or 1))
+    last = int(req.last_page) if req.last_page else total
+    if last is None:
+        return None
+    if total is not None:
+        last = min(last, total)
+    return max(0, last - first + 1)
+
+
+def init_extract_worker(ocr_workers: int):
+    """Extraction pool initializer: take this worker's share of the OCR budget and import the parsers up front."""
+    settings.OCR_WORKERS = max(1, int(ocr_workers))
+    preload(settings.EXTRACT_PRELOAD_IMPORTS)
+
+
+def run_extraction(content, mime: str | None, opts: ExtractOptions, deadline: float | None = None,
+                   capture: bool = True, progress=None) -> Tuple[Dict[str, Any], Dict[str, float], Dict[str, float]]:
+    """Extraction pool entry point: ``extract_document`` under the caller's deadline.
+
+    ``deadline`` is the caller's ``time.monotonic()`` deadline; the monotonic
+    clock is shared by processes on one host. Returns ``(result, timings,
+    stages)``. In a pool process (``capture``) spans stay in that process, so
+    they are collected into ``stages`` (ms) for the caller to record.
+    ``progress`` (picklable, e.g. ``extractionJobs.JobProgress``) is told the
+    expected page count and then handed each page as it completes.
+    """
+    timings: Dict[str, float] = {}
+    on_page = None
+    if progress is not None:
+        progress.expect(expected_pages(content, mime, opts))
+        on_page = progress.page
+    with deadline_scope(deadline):
+        if not capture:
+            return extract_document(content, mime, opts, timings=timings, on_page=on_page), timings, {}
+        with trace_stages() as stages:
+            result = extract_document(content, mime, opts, timings=timings, on_page=on_page)
+    return result, timings, dict(stages)
@@ -0,0 +1,169 @@
+# Content-addressed cache for document extraction results
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+
+def content_key(content, **options) -> str:
+    """SHA-256 over the document bytes plus every option that changes the result.
+
+    ``content`` may be bytes/memoryview or a path to a file on disk.
+    """
+    h = hashlib.sha256()
+    if isinstance(content, (str, os.PathLike)):
+        with open(content, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    else:
+        h.update(content)
+    return finish_key(h, **options)
+
+
+def finish_key(hasher, **options) -> str:
+    """Finalize a cache key from a SHA-256 hasher already fed with the document bytes."""
+    h = hasher.copy()
+    h.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier result cache: an in-memory LRU in front of an optional on-disk tier.
+
+    The disk tier is a directory of gzip-compressed JSON files named by key and
+    evicted oldest-first once the directory exceeds ``disk_max_bytes``. Disk hits
+    are promoted into memory.
+    """
+
+    def __init__(self, max_entries: int = 256, directory: str | None = None, disk_max_bytes: int = 512 << 20, enabled: bool = True):
+        self.max_entries = max(1, int(max_entries))
+        self.directory = directory
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.enabled = bool(enabled)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_set(key, value)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        self._memory_set(key, value)
+        self._disk_set(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory:
+            with self._disk_lock:
+                for name in os.listdir(self.directory):
+                    if name.endswith(".json.gz"):
+                        try:
+                            os.unlink(os.path.join(self.directory, name))
+                        except OSError:
+                            pass
+
+    def _memory_set(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.evictions += 1
+
+    def _disk_get(self, key: str):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # refresh recency for eviction
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _disk_set(self, key: str, value: Dict[str, Any]):
+        if not self.directory:
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(value).encode("utf-8"))
+            os.replace(tmp, self._path(key))
+        except OSError:
+            return
+        self._disk_evict()
+
+    def _disk_evict(self):
+        with self._disk_lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json.gz"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+                total += st.st_size
+            if total <= self.disk_max_bytes:
+                return
+            for _, size, name in sorted(entries):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                total -= size
+                self.disk_evictions += 1
+                if total <= self.disk_max_bytes:
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "memoryEntries": len(self._memory),
+                "maxEntries": self.max_entries,
+                "diskEnabled": bool(self.directory),
+                "memoryHits": self.memory_hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "hitRate": (hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "diskEvictions": self.disk_evictions,
+            }
@@ -0,0 +1,392 @@
+# Background document extraction jobs: a SQLite-backed priority queue with per-page progress
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL,
+    url TEXT,
+    content_path TEXT,
+    mime TEXT,
+    options TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat_at REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    page_count INTEGER,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+CREATE TABLE IF NOT EXISTS job_pages (
+    job_id TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (job_id, page)
+);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")  # readers (status polls) never block the page writers
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class JobStore:
+    """Extraction jobs in one SQLite database, shared by every server worker on the host.
+
+    Uploaded documents are written next to the database until their job
+    finishes. Jobs are claimed highest ``priority`` first, then oldest first;
+    the claim is a single write transaction, so concurrent workers never run
+    the same job. A running job holds a lease that its runner renews with
+    ``heartbeat``; ``recover`` requeues jobs whose lease ran out because their
+    server process died. Finished results stay until ``purge`` removes them.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "evolveai-extraction-jobs")
+        self.content_dir = os.path.join(self.directory, "content")
+        os.makedirs(self.content_dir, exist_ok=True)
+        self.path = os.path.join(self.directory, "jobs.sqlite3")
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid = None
+        conn = _connect(self.path)
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened per process on first use: a connection must not cross the multi-worker launcher's fork
+        if self._pid != os.getpid():
+            self._conn = _connect(self.path)
+            self._pid = os.getpid()
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def submit(self, source: str, options: Dict[str, Any], priority: int = 0, content: bytes | None = None,
+               url: str | None = None, mime: str | None = None) -> str:
+        job_id = uuid.uuid4().hex
+        content_path = None
+        if content is not None:
+            content_path = os.path.join(self.content_dir, job_id)
+            with open(content_path, "wb") as f:
+                f.write(content)
+        self._execute(
+            "INSERT INTO jobs (id, status, priority, source, url, content_path, mime, options, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, int(priority), source, url, content_path, mime, json.dumps(options), time.time()),
+        )
+        return job_id
+
+    def claim_next(self, owner: str) -> Dict[str, Any] | None:
+        """Mark the most urgent queued job running and return it; None when the queue is empty."""
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY priority DESC, created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (RUNNING, owner, time.time(), time.time(), row["id"]),
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self._job(job)
+
+    def requeue(self, job_id: str, count_attempt: bool = True):
+        self._execute(
+            "UPDATE jobs SET status = ?, owner = NULL, attempts = attempts - ? WHERE id = ?",
+            (QUEUED, 0 if count_attempt else 1, job_id),
+        )
+
+    def finish(self, job_id: str, result: Dict[str, Any]):
+        pages = len((result.get("ocr") or {}).get("pages") or [])
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, pages_done = ?, page_count = ?, error = NULL "
+            "WHERE id = ?",
+            (DONE, time.time(), json.dumps(result), pages, pages, job_id),
+        )
+        self._release(job_id)
+
+    def fail(self, job_id: str, error: str):
+        self._execute("UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                      (FAILED, time.time(), error, job_id))
+        self._release(job_id)
+
+    def _release(self, job_id: str):
+        """Drop what only a running job needs: partial pages and the uploaded document."""
+        self._execute("DELETE FROM job_pages WHERE job_id = ?", (job_id,))
+        try:
+            os.unlink(os.path.join(self.content_dir, job_id))
+        except OSError:
+            pass
+
+    def get(self, job_id: str, with_pages: bool = True) -> Dict[str, Any] | None:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = self._job(rows[0])
+        if with_pages and job["status"] in (QUEUED, RUNNING):
+            pages = self._execute("SELECT record FROM job_pages WHERE job_id = ? ORDER BY page", (job_id,))
+            job["pages"] = [json.loads(r["record"]) for r in pages]
+        return job
+
+    def heartbeat(self, owner: str):
+        """Renew the lease on every job ``owner`` is running."""
+        self._execute("UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND owner = ?", (time.time(), RUNNING, owner))
+
+    def recover(self, lease_s: float, max_attempts: int) -> int:
+        """Requeue (or fail, once out of attempts) running jobs whose lease expired; returns how many."""
+        rows = self._execute("SELECT id, attempts FROM jobs WHERE status = ? AND heartbeat_at < ?",
+                             (RUNNING, time.time() - lease_s))
+        for row in rows:
+            if row["attempts"] >= max_attempts:
+                self.fail(row["id"], "server exited while running the job")
+            else:
+                self.requeue(row["id"])
+        return len(rows)
+
+    def purge(self, older_than_s: float) -> int:
+        """Delete finished jobs older than ``older_than_s``; returns how many."""
+        cutoff = time.time() - older_than_s
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, cutoff))
+            return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for row in self._execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def queued(self) -> int:
+        return self._execute("SELECT COUNT(*) AS n FROM jobs WHERE status = ?", (QUEUED,))[0]["n"]
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        if job.get("result"):
+            job["result"] = json.loads(job["result"])
+        return job
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = self._pid = None
+
+
+class JobProgress:
+    """Picklable progress sink handed to ``run_extraction``; writes straight to the job database.
+
+    Works the same in the server process and in an extraction worker process.
+    Write errors are swallowed: progress is advisory and must never fail the job.
+    """
+
+    _connections: Dict[str, sqlite3.Connection] = {}
+    _lock = threading.Lock()  # one connection per database and process, shared by OCR/extraction threads
+
+    def __init__(self, path: str, job_id: str):
+        self.path = path
+        self.job_id = job_id
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = JobProgress._connections.get(self.path)
+        if conn is None:
+            conn = JobProgress._connections[self.path] = _connect(self.path)
+        return conn
+
+    def expect(self, page_count: int | None):
+        try:
+            with JobProgress._lock:
+                self._conn().execute("UPDATE jobs SET page_count = ? WHERE id = ?", (page_count, self.job_id))
+        except sqlite3.Error:
+            pass
+
+    def page(self, record: Dict[str, Any]):
+        try:
+            with JobProgress._lock:
+                conn = self._conn()
+                conn.execute("INSERT OR REPLACE INTO job_pages (job_id, page, record) VALUES (?, ?, ?)",
+                             (self.job_id, int(record["page"]), json.dumps(record)))
+                conn.execute("UPDATE jobs SET pages_done = (SELECT COUNT(*) FROM job_pages WHERE job_id = ?) WHERE id = ?",
+                             (self.job_id, self.job_id))
+        except sqlite3.Error:
+            pass
+
+
+class JobDeferred(Exception):
+    """The job cannot start now (e.g. the extraction pool is full); requeue it without using an attempt."""
+
+
+class JobRunner:
+    """Runs queued jobs on ``concurrency`` asyncio tasks in this server process.
+
+    ``execute(job)`` does the work and returns the response to store: a body
+    with ``ok: False`` marks the job failed. An exception is retried until the
+    job has used ``max_attempts``; ``JobDeferred`` puts it back without
+    counting. Idle tasks wake on ``notify`` (a local submit) or every
+    ``poll_s``, which picks up jobs submitted to sibling server workers. A
+    housekeeping task renews this runner's leases, requeues jobs of runners
+    that stopped renewing for ``lease_s`` and purges results older than
+    ``retention_s``.
+    """
+
+    def __init__(self, store: JobStore, execute: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 concurrency: int = 1, max_attempts: int = 3, poll_s: float = 1.0, lease_s: float = 30.0,
+                 retention_s: float = 7 * 86400.0):
+        self.store = store
+        self.execute = execute
+        self.concurrency = max(1, int(concurrency))
+        self.max_attempts = max(1, int(max_attempts))
+        self.poll_s = max(0.01, float(poll_s))
+        self.lease_s = max(3 * self.poll_s, float(lease_s))
+        self.retention_s = float(retention_s)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wake: asyncio.Event | None = None
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.recovered = 0
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"extraction-job-{i}") for i in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._housekeeping(), name="extraction-job-housekeeping"))
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _housekeeping(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                recovered = await asyncio.to_thread(self.store.recover, self.lease_s, self.max_attempts)
+                if recovered:
+                    self.recovered += recovered
+                    self.notify()
+                if self.retention_s > 0:
+                    await asyncio.to_thread(self.store.purge, self.retention_s)
+            except sqlite3.Error:
+                pass  # e.g. the database is locked for longer than the busy timeout; try again next round
+            await asyncio.sleep(self.lease_s / 3)
+
+    async def _idle(self):
+        try:
+            await asyncio.wait_for(self._wake.wait(), self.poll_s)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    async def _worker(self):
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next, self.owner)
+            if job is None:
+                await self._idle()
+                continue
+            self.running += 1
+            try:
+                await self._run(job)
+            finally:
+                self.running -= 1
+
+    async def _run(self, job: Dict[str, Any]):
+        try:
+            response = await self.execute(job)
+        except JobDeferred:
+            await asyncio.to_thread(self.store.requeue, job["id"], False)
+            await asyncio.sleep(self.poll_s)
+            return
+        except asyncio.CancelledError:
+            # Server shutdown: hand the job back for the next start
+            await asyncio.shield(asyncio.to_thread(self.store.requeue, job["id"], False))
+            raise
+        except Exception as e:
+            if job["attempts"] < self.max_attempts:
+                self.retried += 1
+                await asyncio.to_thread(self.store.requeue, job["id"])
+            else:
+                self.failed += 1
+                await asyncio.to_thread(self.store.fail, job["id"], str(e) or type(e).__name__)
+            return
+        if response.get("ok"):
+            self.completed += 1
+            await asyncio.to_thread(self.store.finish, job["id"], response)
+        else:
+            self.failed += 1
+            await asyncio.to_thread(self.store.fail, job["id"], str(response.get("error") or "extraction failed"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "recovered": self.recovered,
+            "jobs": self.store.counts(),
+        }
+
+
+def describe_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public status view of a stored job (no result body, partial pages while unfinished)."""
+    view = {
+        "jobId": job["id"],
+        "status": job["status"],
+        "priority": job["priority"],
+        "source": job["source"],
+        "attempts": job["attempts"],
+        "createdAt": job["created_at"],
+        "startedAt": job["started_at"],
+        "finishedAt": job["finished_at"],
+        "progress": {"pagesDone": job["pages_done"], "pageCount": job["page_count"]},
+    }
+    if job.get("error"):
+        view["error"] = job["error"]
+    if "pages" in job:
+        view["pages"] = job["pages"]
+    return view
@@ -0,0 +1,144 @@
+# Dynamic micro-batching scheduler for DiagnosisModel inference
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class InferenceScheduler:
+    """Coalesce concurrent single-row inference calls into one batched forward pass.
+
+    Callers hand over a (1, F) row via ``submit`` and block until their own row
+    of the batched output is available. A single worker thread drains the queue:
+    it takes the first pending row, then keeps collecting until ``max_batch_size``
+    rows are queued, ``max_wait_us`` has elapsed since the first row arrived, or
+    every in-flight caller is already part of the batch (so an idle service adds
+    no waiting). ``run_batch`` receives the list of rows and the ``context`` they
+    were submitted with, and must return an indexable result with one entry per
+    row, in order. Rows submitted with different ``context`` objects (e.g. two
+    model versions during a hot-swap) never share a ``run_batch`` call.
+
+    With ``enabled=False`` each call runs ``run_batch`` inline on its own row,
+    which is handy when debugging the model path.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any], Any], Any],
+        max_batch_size: int = 32,
+        max_wait_us: int = 2000,
+        enabled: bool = True,
+    ):
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_us = max(0, int(max_wait_us))
+        self.enabled = bool(enabled)
+
+        self._queue: "queue.Queue[tuple[Any, Future, float, Any]]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._inflight = 0
+
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._batch_sizes: Dict[int, int] = {}
+        self._wait_us_total = 0.0
+        self._wait_us_max = 0.0
+
+    def submit(self, row: Any, timeout: float | None = None, context: Any = None) -> Any:
+        """Run one row through the model and return its slice of the batch output."""
+        if not self.enabled:
+            out = self._run_batch([row], context)
+            self._record([time.perf_counter()], time.perf_counter())
+            return out[0]
+
+        self._ensure_worker()
+        fut: Future = Future()
+        with self._stats_lock:
+            self._inflight += 1
+        try:
+            self._queue.put((row, fut, time.perf_counter(), context))
+            return fut.result(timeout=timeout)
+        finally:
+            with self._stats_lock:
+                self._inflight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self._batches
+            return {
+                "enabled": self.enabled,
+                "maxBatchSize": self.max_batch_size,
+                "maxWaitUs": self.max_wait_us,
+                "batches": batches,
+                "items": self._items,
+                "avgBatchSize": (self._items / batches) if batches else 0.0,
+                "maxObservedBatchSize": self._max_batch,
+                "batchSizeHistogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "avgQueueWaitUs": (self._wait_us_total / self._items) if self._items else 0.0,
+                "maxQueueWaitUs": self._wait_us_max,
+                "queueDepth": self._queue.qsize(),
+            }
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._loop, name="inference-scheduler", daemon=True)
+            self._worker.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait_us / 1_000_000
+        while len(batch) < self.max_batch_size:
+            with self._stats_lock:
+                inflight = self._inflight
+            if len(batch) >= inflight and self._queue.empty():
+                break
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            groups: Dict[int, List[tuple]] = {}
+            for item in batch:
+                groups.setdefault(id(item[3]), []).append(item)
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, batch: List[tuple]):
+        started = time.perf_counter()
+        self._record([enqueued for _, _, enqueued, _ in batch], started)
+        try:
+            out = self._run_batch([row for row, _, _, _ in batch], batch[0][3])
+            for i, (_, fut, _, _) in enumerate(batch):
+                fut.set_result(out[i])
+        except Exception as e:
+            for _, fut, _, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+
+    def _record(self, enqueued: List[float], started: float):
+        size = len(enqueued)
+        waits = [max(0.0, (started - t) * 1_000_000) for t in enqueued]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._max_batch = max(self._max_batch, size)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._wait_us_total += sum(waits)
+            self._wait_us_max = max([self._wait_us_max] + waits)
@@ -0,0 +1,165 @@
+# Single-pass lab/metadata extraction over OCR or text-layer output
+import re
+from typing import Any, Dict, List
+
+# Bump when the registry, scoring or text pipeline changes so cached extraction results are not reused
+EXTRACTOR_VERSION = "5"
+
+
+class Analyte:
+    """Registry entry for one lab analyte.
+
+    ``conversions`` maps a lowercase unit spelling to the factor that converts a
+    value in that unit into ``unit`` (the canonical unit reported to callers).
+    ``plausible`` is a (low, high) range in the canonical unit used to score
+    confidence; values outside it are kept but marked low-confidence.
+    """
+
+    def __init__(self, name: str, aliases, unit: str, conversions: Dict[str, float] | None = None, plausible=None):
+        self.name = name
+        self.aliases = tuple(aliases)
+        self.unit = unit
+        self.conversions = {unit.lower(): 1.0}
+        self.conversions.update({k.lower(): float(v) for k, v in (conversions or {}).items()})
+        self.plausible = plausible
+
+
+ANALYTES: List[Analyte] = [
+    Analyte("glucose", ("glucose", "blood sugar", "fbs", "rbs"), "mg/dL", {"mmol/L": 18.016}, (20, 1000)),
+    Analyte("hemoglobin", ("hemoglobin", "haemoglobin", "hgb", "hb"), "g/dL", {"g/L": 0.1}, (2, 25)),
+    Analyte("hba1c", ("hba1c", "hemoglobin a1c", "haemoglobin a1c", "a1c"), "%", {}, (3, 20)),
+    Analyte("creatinine", ("creatinine", "creat"), "mg/dL", {"umol/L": 1 / 88.42, "µmol/L": 1 / 88.42}, (0.1, 20)),
+    Analyte("sodium", ("sodium",), "mmol/L", {"mEq/L": 1.0}, (100, 180)),
+    Analyte("potassium", ("potassium",), "mmol/L", {"mEq/L": 1.0}, (1.5, 9)),
+    Analyte("chloride", ("chloride",), "mmol/L", {"mEq/L": 1.0}, (70, 140)),
+    # BUN counts only the nitrogen (28 of urea's 60 g/mol), so the two are separate analytes
+    Analyte("bun", ("blood urea nitrogen", "urea nitrogen", "bun"), "mg/dL", {"mmol/L": 2.8}, (1, 300)),
+    Analyte("urea", ("blood urea", "serum urea", "urea"), "mg/dL", {"mmol/L": 6.006}, (2, 650)),
+    Analyte("wbc", ("wbc", "white blood cells", "white cell count", "total leukocyte count", "tlc"), "10^3/uL", {"10^9/L": 1.0, "/cumm": 0.001, "cells/cumm": 0.001}, (0.5, 100)),
+    Analyte("platelets", ("platelets", "platelet count", "plt"), "10^3/uL", {"10^9/L": 1.0, "lakh/cumm": 100.0}, (5, 2000)),
+    Analyte("crp", ("c-reactive protein", "c reactive protein", "crp"), "mg/L", {"mg/dL": 10.0}, (0, 500)),
+    Analyte("cholesterol", ("total cholesterol", "cholesterol"), "mg/dL", {"mmol/L": 38.67}, (50, 600)),
+    Analyte("triglycerides", ("triglycerides", "tg"), "mg/dL", {"mmol/L": 88.57}, (20, 3000)),
+    Analyte("alt", ("alt", "sgpt"), "U/L", {}, (1, 5000)),
+    Analyte("ast", ("ast", "sgot"), "U/L", {}, (1, 5000)),
+    Analyte("bilirubin", ("total bilirubin", "bilirubin"), "mg/dL", {"umol/L": 1 / 17.1, "µmol/L": 1 / 17.1}, (0.1, 40)),
+]
+
+# Unsigned: no registered analyte is negative, and a dash before the number is a separator ("Sodium - 140")
+_VALUE = r"(?P<value>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+_DASHES = "\\-\u2013\u2014"  # for character classes
+
+
+def _alias_pattern(alias: str) -> str:
+    return r"\s+".join(re.escape(part) for part in alias.split())
+
+
+def _unit_key(unit: str) -> str:
+    return re.sub(r"\s+", "", unit).lower()
+
+
+class LabExtractor:
+    """Compiled scanner that finds every registered analyte in one pass over the text.
+
+    All aliases are folded into a single alternation (longest first) followed by
+    a shared separator/value/unit tail, so adding analytes grows the pattern, not
+    the number of scans.
+    """
+
+    def __init__(self, analytes: List[Analyte] | None = None):
+        self.analytes = list(analytes or ANALYTES)
+        self._by_alias: Dict[str, Analyte] = {}
+        for analyte in self.analytes:
+            for alias in analyte.aliases:
+                self._by_alias[" ".join(alias.lower().split())] = analyte
+        units = {}
+        for analyte in self.analytes:
+            for unit in analyte.conversions:
+                units[_unit_key(unit)] = unit
+        aliases = sorted(self._by_alias, key=len, reverse=True)
+        unit_alt = "|".join(
+            r"\s*".join(re.escape(ch) for ch in u) for u in sorted(units, key=len, reverse=True)
+        )
+        self._pattern = re.compile(
+            # A name hyphenated into a longer word ("Glucose-6-phosphate") is not a reading
+            r"(?<![\w-])(?P<name>" + "|".join(_alias_pattern(a) for a in aliases) + r")(?![\w])"
+            r"(?![" + _DASHES + r"][\w" + _DASHES + r"]*[^\W\d_])"
+            r"(?P<filler>[^\d\n" + _DASHES + r"]{0,24}?)"
+            r"(?P<sep>[:=" + _DASHES + r"](?:\s*[:=" + _DASHES + r"])*\s*)?" + _VALUE +
+            r"(?:\s*(?P<unit>" + unit_alt + r")(?![A-Za-z]))?",
+            re.IGNORECASE,
+        )
+
+    def extract(self, text: str) -> List[Dict[str, Any]]:
+        """Return the most confident occurrence of each analyte (the first on ties) with canonical value, unit, span and confidence."""
+        found: Dict[str, Dict[str, Any]] = {}
+        for m in self._pattern.finditer(text or ""):
+            analyte = self._by_alias.get(" ".join(m.group("name").lower().split()))
+            if analyte is None:
+                continue
+            try:
+                raw_value = float(m.group("value").replace(",", ""))
+            except ValueError:
+                continue
+            raw_unit = m.group("unit")
+            factor = analyte.conversions.get(_unit_key(raw_unit)) if raw_unit else 1.0
+            confidence = 0.6
+            if raw_unit and factor is not None:
+                confidence += 0.2
+            if m.group("sep"):
+                confidence += 0.1
+            if factor is None:
+                # unit belongs to another analyte; keep the number as-is
+                factor = 1.0
+                confidence -= 0.2
+            value = raw_value * factor
+            if analyte.plausible and not (analyte.plausible[0] <= value <= analyte.plausible[1]):
+                confidence -= 0.3
+            confidence = round(max(0.05, min(confidence, 0.95)), 2)
+            best = found.get(analyte.name)
+            if best is not None and best["confidence"] >= confidence:
+                continue
+            found[analyte.name] = {
+                "name": analyte.name,
+                "value": round(value, 4),
+                "unit": analyte.unit,
+                "rawValue": raw_value,
+                "rawUnit": raw_unit,
+                "position": [m.start(), m.end()],
+                "confidence": confidence,
+            }
+        return sorted(found.values(), key=lambda lab: lab["position"][0])
+
+
+_META_PATTERNS = {
+    "patientName": re.compile(r"(?:patient|name)\s*[:\-]?\s*([A-Za-z ,.'-]{3,})", re.IGNORECASE),
+    "patientId": re.compile(r"(?:mrn|patient\s*id|accession)\s*[:\-]?\s*([A-Za-z0-9\-]+)", re.IGNORECASE),
+    "date": re.compile(r"(?:date|reported\s*on)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\d{4}[\-]\d{2}[\-]\d{2})", re.IGNORECASE),
+}
+
+_EXTRACTOR: LabExtractor | None = None
+
+
+def get_lab_extractor() -> LabExtractor:
+    global _EXTRACTOR
+    if _EXTRACTOR is None:
+        _EXTRACTOR = LabExtractor()
+    return _EXTRACTOR
+
+
+def extract_meta(text: str) -> Dict[str, Any]:
+    meta = {}
+    for key, pattern in _META_PATTERNS.items():
+        m = pattern.search(text or "")
+        meta[key] = m.group(1) if m else None
+    return meta
+
+
+def extract_fields(text: str) -> Dict[str, Any]:
+    """Structured fields in the shape returned under ``extracted`` by the extraction endpoints."""
+    return {
+        "meta": extract_meta(text),
+        "labs": get_lab_extractor().extract(text),
+        "diagnoses": [],
+        "medications": [],
+    }
@@ -1,55 +1,407 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Any, Dict, List
 import platform
 import threading
+from contextlib import asynccontextmanager
 import time
 import io
-import re
 import base64
-
-try:
-    import requests
-    from pdfminer.high_level import extract_text as pdfminer_extract_text
-    from pdf2image import convert_from_bytes
-    import pytesseract
-    from PIL import Image
-except Exception:
-    requests = None
-    pdfminer_extract_text = None
-    convert_from_bytes = None
-    pytesseract = None
-    Image = None
+import json
 
 try:
     from backend.models.diagnosisModel import (
-        DiagnosisModel,
-        featurize_payload_to_tensor,
+        FEATURE_NAMES,
+        LABELS,
+        TORCH,
     )
-    from backend.models.redFlagModel import detect_red_flags
-    from backend.models.explainabilityUtils import summarize_attributions, compute_attributions
+    from backend.models.redFlagModel import detect_red_flags, detect_red_flags_batch, get_red_flag_engine
+    from backend.models.explainabilityUtils import CAPTUM, SHAP, summarize_attributions, compute_attributions_batch
+    from backend.models.optionalDeps import capabilities, preload as preload_imports
+    from backend.models import instrumentation
+    from backend.models.instrumentation import span, trace_stages, format_stages
 except Exception:  # fallback to relative imports for execution context differences
-    from ..diagnosisModel import DiagnosisModel, featurize_payload_to_tensor
-    from ..redFlagModel import detect_red_flags
-    from ..explainabilityUtils import summarize_attributions, compute_attributions
+    from ..diagnosisModel import FEATURE_NAMES, LABELS, TORCH
+    from ..redFlagModel import detect_red_flags, detect_red_flags_batch, get_red_flag_engine
+    from ..explainabilityUtils import CAPTUM, SHAP, summarize_attributions, compute_attributions_batch
+    from ..optionalDeps import capabilities, preload as preload_imports
+    from .. import instrumentation
+    from ..instrumentation import span, trace_stages, format_stages
+
+try:
+    from backend.models.ai_service import settings
+    from backend.models.ai_service.inferenceScheduler import InferenceScheduler
+    from backend.models.ai_service.attributionCache import AttributionCache
+    from backend.models.ai_service.extraction import ExtractOptions, init_extract_worker, ocr_profile_name, run_extraction
+    from backend.models.ai_service.extractionCache import ExtractionCache, content_key, finish_key
+    from backend.models.ai_service.uploadStreaming import UploadTooLarge, receive_upload
+    from backend.models.ai_service.pdfFetcher import FetchTooLarge, active_fetcher, get_fetcher
+    from backend.models.ai_service.modelRegistry import ModelHandle, ModelRegistry
+    from backend.models.ai_service.labExtraction import EXTRACTOR_VERSION
+    from backend.models.ai_service.riskSeries import RiskScoreCache, checkin_fingerprint, rolling_trends
+    from backend.models.ai_service.runtime import apply_thread_budget, config_report
+    from backend.models.ai_service.startup import startup_report
+    from backend.models.ai_service.deadlines import (
+        DeadlineExceeded, check_deadline, current_deadline, deadline_scope, parse_deadline, remaining_ms, remaining_s,
+        wait_timeout,
+    )
+    from backend.models.ai_service.admission import QUEUE_FULL, AdmissionGate
+    from backend.models.ai_service.executors import PoolSaturated, WorkloadPool
+    from backend.models.ai_service.extractionJobs import DONE, FAILED, JobDeferred, JobProgress, JobRunner, JobStore, describe_job
+except Exception:
+    from . import settings
+    from .inferenceScheduler import InferenceScheduler
+    from .attributionCache import AttributionCache
+    from .extraction import ExtractOptions, init_extract_worker, ocr_profile_name, run_extraction
+    from .extractionCache import ExtractionCache, content_key, finish_key
+    from .uploadStreaming import UploadTooLarge, receive_upload
+    from .pdfFetcher import FetchTooLarge, active_fetcher, get_fetcher
+    from .modelRegistry import ModelHandle, ModelRegistry
+    from .labExtraction import EXTRACTOR_VERSION
+    from .riskSeries import RiskScoreCache, checkin_fingerprint, rolling_trends
+    from .runtime import apply_thread_budget, config_report
+    from .startup import startup_report
+    from .deadlines import (
+        DeadlineExceeded, check_deadline, current_deadline, deadline_scope, parse_deadline, remaining_ms, remaining_s,
+        wait_timeout,
+    )
+    from .admission import QUEUE_FULL, AdmissionGate
+    from .executors import PoolSaturated, WorkloadPool
+    from .extractionJobs import DONE, FAILED, JobDeferred, JobProgress, JobRunner, JobStore, describe_job
 
 try:
-    import torch
+    import numpy as np
 except Exception:
-    torch = None
+    np = None
 
-app = FastAPI()
+instrumentation.set_enabled(settings.METRICS_ENABLED)
+apply_thread_budget()
+# Everything else optional (shap, pdfminer, OCR, requests) is imported on first use
+preload_imports(settings.PRELOAD_IMPORTS)
+METRICS = instrumentation.REGISTRY
 
-# Lazily created global model to avoid per-request initialization cost
-_MODEL: DiagnosisModel | None = None
+# Model versions are loaded, warmed up and swapped by the registry; see _lifespan
 _MODEL_LOCK = threading.Lock()
 
+# Attribution results keyed by weights hash, method, target and rounded features
+_EXPLAIN_CACHE = AttributionCache(
+    max_size=settings.EXPLAIN_CACHE_SIZE,
+    ttl_s=settings.EXPLAIN_CACHE_TTL_S,
+    decimals=settings.EXPLAIN_CACHE_DECIMALS,
+    enabled=settings.EXPLAIN_CACHE_ENABLED,
+)
+
+# Risk scores per (weights hash, featurizer version, check-in ID, content fingerprint)
+_RISK_CACHE = RiskScoreCache(max_size=settings.RISK_CACHE_SIZE, enabled=settings.RISK_CACHE_ENABLED)
+
+
+def _install_handle(handle: ModelHandle):
+    """Registry activation hook: drop attributions and risk scores of the replaced version."""
+    previous = _REGISTRY.active
+    if previous is not None and previous.hash != handle.hash:
+        _EXPLAIN_CACHE.invalidate(previous.hash)
+        _RISK_CACHE.invalidate(previous.hash)
+
+
+_REGISTRY = ModelRegistry(
+    settings.MODEL_DIR,
+    on_activate=_install_handle,
+    warm=settings.MODEL_WARMUP,
+    backend=settings.INFERENCE_BACKEND,
+)
+
+
+def get_handle() -> ModelHandle:
+    return _REGISTRY.get()
+
+
+def get_model():
+    return _REGISTRY.get().model
+
+
+def preload():
+    """Load model weights, featurizer and red-flag rules before workers fork (see serve.py).
+
+    Each worker then reuses this state copy-on-write and only runs its own warmup.
+    """
+    handle = _REGISTRY.preload(settings.MODEL_VERSION)
+    if _is_explainable(handle.model):
+        CAPTUM.load()  # a torch model: torch is imported already, and IG runs on every explained /analyze
+    get_red_flag_engine()
+
+
+def _startup_load():
+    try:
+        _REGISTRY.reload(settings.MODEL_VERSION)
+    except Exception:
+        # Pinned version missing or unreadable; fall back to the newest checkpoint on first use
+        _REGISTRY.get()
+
+
+@asynccontextmanager
+async def _lifespan(_app):
+    # Load and warm up off the event loop so /health can report "starting" meanwhile
+    threading.Thread(target=_startup_load, name="model-startup", daemon=True).start()
+    _REGISTRY.start_watcher(settings.MODEL_WATCH_INTERVAL_S, settings.MODEL_VERSION)
+    # Spawn extraction processes now, so the first report does not pay their interpreter startup
+    _EXTRACT_POOL.start()
+    if _JOBS is not None:
+        _JOBS.start()
+    yield
+    if _JOBS is not None:
+        await _JOBS.stop()
+    _REGISTRY.stop_watcher()
+    for pool in _POOLS:
+        pool.shutdown()
+
+
+app = FastAPI(lifespan=_lifespan)
+
+
+def _model_device(model):
+    return model.device if hasattr(model, "device") else ("cuda" if TORCH.load().cuda.is_available() else "cpu")
+
+
+def _is_explainable(model) -> bool:
+    return bool(model is not None and getattr(model, "_has_torch", False))
+
+
+def _to_model_tensor(model, x_np):
+    """Torch view of a featurized NumPy batch on the model's device, for explainers."""
+    return TORCH.load().from_numpy(x_np).to(_model_device(model))
+
+
+def _forward_rows(rows, handle: ModelHandle):
+    """Run a list of (1, 8) float32 rows through ``handle``'s backend as one (N, 8) batch."""
+    backend = handle.backend
+    if backend is None:
+        return [None] * len(rows)
+    x = rows[0] if len(rows) == 1 else np.concatenate(rows, axis=0)
+    with span("model_lock_wait"):
+        _MODEL_LOCK.acquire()
+    try:
+        with span("forward"):
+            return backend.predict_proba(x)
+    finally:
+        _MODEL_LOCK.release()
+
+
+# Coalesces concurrent /analyze calls into shared forward passes
+_SCHEDULER = InferenceScheduler(
+    _forward_rows,
+    max_batch_size=settings.BATCH_MAX_SIZE,
+    max_wait_us=settings.BATCH_MAX_WAIT_US,
+    enabled=settings.BATCHING_ENABLED,
+)
+
+# OCR/pdfminer results keyed by SHA-256 of the document bytes and extraction options
+_EXTRACT_CACHE = ExtractionCache(
+    max_entries=settings.EXTRACT_CACHE_SIZE,
+    directory=settings.EXTRACT_CACHE_DIR,
+    disk_max_bytes=int(settings.EXTRACT_CACHE_DISK_MAX_MB * 1024 * 1024),
+    enabled=settings.EXTRACT_CACHE_ENABLED,
+)
+
+# Workload classes run on separate executors: inference requests on a thread pool sized to fill
+# micro-batches, document extraction (pdfminer, OCR) in worker processes with their own OCR pools
+_INFERENCE_POOL = WorkloadPool("inference", "thread", settings.INFERENCE_POOL_THREADS, settings.INFERENCE_POOL_QUEUE)
+_EXTRACT_POOL = WorkloadPool(
+    "extraction",
+    "process",
+    settings.EXTRACT_WORKERS,
+    settings.EXTRACT_POOL_QUEUE,
+    mp_context=settings.OCR_MP_CONTEXT,
+    initializer=init_extract_worker,
+    initargs=(max(1, settings.OCR_WORKERS // max(1, settings.EXTRACT_WORKERS)),),
+)
+_POOLS = (_INFERENCE_POOL, _EXTRACT_POOL)
+
+
+async def _run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job runner entry point: the same extraction as the synchronous endpoints, reporting pages as they finish."""
+    progress = JobProgress(_JOB_STORE.path, job["id"])
+    timeout = settings.JOBS_TIMEOUT_S
+    try:
+        with deadline_scope(time.monotonic() + timeout if timeout > 0 else None):
+            if job["source"] == "url":
+                response = await _extract_from_pdf(PdfExtractRequest(url=job["url"], **job["options"]), progress)
+            else:
+                opts = UploadOptions(mime=job["mime"], **job["options"])
+                response = await _extract_from_file(job["content_path"], job["mime"], opts, progress)
+    except PoolSaturated:
+        raise JobDeferred()
+    except DeadlineExceeded as e:
+        return {"ok": False, "error": str(e)}
+    if isinstance(response, JSONResponse):
+        return json.loads(response.body)
+    return response
+
+
+# Queued extraction jobs persist in SQLite and run in the background on the extraction pool
+_JOB_STORE = JobStore(settings.JOBS_DIR) if settings.JOBS_ENABLED else None
+_JOBS = JobRunner(
+    _JOB_STORE,
+    _run_job,
+    concurrency=settings.JOBS_CONCURRENCY,
+    max_attempts=settings.JOBS_MAX_ATTEMPTS,
+    poll_s=settings.JOBS_POLL_S,
+    lease_s=settings.JOBS_LEASE_S,
+    retention_s=settings.JOBS_RETENTION_S,
+) if _JOB_STORE is not None else None
+
+# Bounded concurrency and wait queue per endpoint class; requests beyond both are shed with 429
+_GATES = {
+    "analyze": AdmissionGate("analyze", settings.ANALYZE_MAX_CONCURRENCY, settings.ANALYZE_MAX_QUEUE),
+    "extract": AdmissionGate("extract", settings.EXTRACT_MAX_CONCURRENCY, settings.EXTRACT_MAX_QUEUE),
+}
+_GATED_PATHS = {
+    "/analyze": "analyze",
+    "/analyze_batch": "analyze",
+    "/risk_series": "analyze",
+    "/extract_from_pdf": "extract",
+    "/extract_from_upload": "extract",
+    "/extract_from_upload_stream": "extract",
+}
+
+
+def _collect_service_metrics():
+    """Pull-time gauges for /metrics from the scheduler, caches, fetcher and registry."""
+    batching = _SCHEDULER.stats()
+    explain = _EXPLAIN_CACHE.stats()
+    extraction = _EXTRACT_CACHE.stats()
+    risk = _RISK_CACHE.stats()
+    pool_stats = {p.name: p.stats() for p in _POOLS}
+    handle = _REGISTRY.active
+    families = [
+        ("ai_batch_items_total", "counter", "Rows run through the micro-batcher.", [({}, batching["items"])]),
+        ("ai_batches_total", "counter", "Batched forward passes.", [({}, batching["batches"])]),
+        ("ai_batch_queue_depth", "gauge", "Rows waiting for the micro-batcher.", [({}, batching["queueDepth"])]),
+        ("ai_batch_avg_queue_wait_seconds", "gauge", "Mean micro-batch queue wait.", [({}, batching["avgQueueWaitUs"] / 1e6)]),
+        ("ai_explain_cache_lookups_total", "counter", "Attribution cache lookups.",
+         [({"result": "hit"}, explain["hits"]), ({"result": "miss"}, explain["misses"])]),
+        ("ai_explain_cache_entries", "gauge", "Attribution cache size.", [({}, explain["size"])]),
+        ("ai_risk_cache_lookups_total", "counter", "Risk score cache lookups.",
+         [({"result": "hit"}, risk["hits"]), ({"result": "miss"}, risk["misses"])]),
+        ("ai_extraction_cache_lookups_total", "counter", "Extraction cache lookups.",
+         [({"result": "memory_hit"}, extraction["memoryHits"]), ({"result": "disk_hit"}, extraction["diskHits"]),
+          ({"result": "miss"}, extraction["misses"])]),
+        ("ai_admission_active", "gauge", "Requests holding an admission slot.",
+         [({"gate": name}, gate.stats()["active"]) for name, gate in _GATES.items()]),
+        ("ai_admission_queued", "gauge", "Requests waiting for an admission slot.",
+         [({"gate": name}, gate.stats()["queued"]) for name, gate in _GATES.items()]),
+        ("ai_admission_rejected_total", "counter", "Requests shed before running.",
+         [({"gate": name, "reason": reason}, count)
+          for name, gate in _GATES.items() for reason, count in gate.rejected.items()]),
+        ("ai_pool_workers", "gauge", "Workers per executor.", [({"pool": p.name}, p.max_workers) for p in _POOLS]),
+        ("ai_pool_inflight", "gauge", "Tasks running or queued per executor.",
+         [({"pool": p.name}, pool_stats[p.name]["inflight"]) for p in _POOLS]),
+        ("ai_pool_busy_seconds_total", "counter", "Worker-seconds spent running tasks; rate / workers = utilization.",
+         [({"pool": p.name}, pool_stats[p.name]["busySeconds"]) for p in _POOLS]),
+        ("ai_pool_rejected_total", "counter", "Tasks refused because the executor backlog was full.",
+         [({"pool": p.name}, pool_stats[p.name]["rejected"]) for p in _POOLS]),
+        ("ai_model_ready", "gauge", "1 once a model version is active.", [({}, 1 if handle is not None else 0)]),
+        ("ai_model_swaps_total", "counter", "Model activations.", [({}, _REGISTRY.swaps)]),
+    ]
+    if _JOB_STORE is not None:
+        families.append(("ai_jobs", "gauge", "Background extraction jobs by status.",
+                         [({"status": status}, n) for status, n in _JOB_STORE.counts().items()]))
+    if handle is not None:
+        families.append(("ai_model_info", "gauge", "Active model version and inference backend.",
+                         [({"version": handle.version, "backend": getattr(handle.backend, "name", "none")}, 1)]))
+    fetcher = active_fetcher()
+    if fetcher is not None:
+        fetched = fetcher.stats()
+        families.append(("ai_fetch_requests_total", "counter", "Report URL fetches.",
+                         [({"result": "revalidated"}, fetched["revalidated"]),
+                          ({"result": "downloaded"}, fetched["requests"] - fetched["revalidated"])]))
+        families.append(("ai_fetch_downloaded_bytes_total", "counter", "Bytes downloaded by the fetcher.",
+                         [({}, fetched["downloadedBytes"])]))
+    return families
+
+
+METRICS.register_collector(_collect_service_metrics)
+METRICS.describe("ai_requests_total", "counter", "HTTP requests by endpoint and status code.")
+METRICS.describe("ai_request_duration_seconds", "histogram", "HTTP request wall time by endpoint.")
+METRICS.describe("ai_deadline_exceeded_total", "counter", "Requests aborted at their deadline, by stage.")
+
+
+def _deadline_response(stage: str, started: float | None = None) -> JSONResponse:
+    METRICS.inc("ai_deadline_exceeded_total", stage=stage)
+    content: Dict[str, Any] = {"ok": False, "error": "deadline exceeded", "stage": stage}
+    if started is not None:
+        content["latencyMs"] = int((time.time() - started) * 1000)
+    return JSONResponse(status_code=503, content=content)
 
-def get_model() -> DiagnosisModel:
-    global _MODEL
-    if _MODEL is None:
-        _MODEL = DiagnosisModel()
-    return _MODEL
+
+@app.exception_handler(DeadlineExceeded)
+async def _on_deadline_exceeded(_request: Request, exc: DeadlineExceeded):
+    return _deadline_response(exc.stage)
+
+
+@app.exception_handler(PoolSaturated)
+async def _on_pool_saturated(_request: Request, exc: PoolSaturated):
+    return JSONResponse(status_code=429, headers={"Retry-After": "1"}, content={"ok": False, "error": str(exc)})
+
+
+# Registered before _request_metrics so that middleware wraps this one and counts shed requests
+@app.middleware("http")
+async def _admission(request: Request, call_next):
+    """Attach the request deadline and hold an admission slot for the request's endpoint class.
+
+    Sheds with 429 when the endpoint's queue is full and with 503 when the
+    deadline has passed on arrival or while queued.
+    """
+    deadline = parse_deadline(request.headers, settings.REQUEST_TIMEOUT_S)
+    gate = _GATES.get(_GATED_PATHS.get(request.url.path)) if settings.ADMISSION_ENABLED else None
+    with deadline_scope(deadline):
+        if gate is None:
+            return await call_next(request)
+        started = time.time()
+        rejected = await gate.acquire(remaining_s())
+        if rejected == QUEUE_FULL:
+            return JSONResponse(status_code=429, headers={"Retry-After": "1"}, content={
+                "ok": False, "error": f"{gate.name} queue full", "latencyMs": int((time.time() - started) * 1000),
+            })
+        if rejected is not None:
+            return _deadline_response("admission", started)
+        try:
+            return await call_next(request)
+        finally:
+            gate.release()
+
+
+@app.middleware("http")
+async def _request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    if settings.METRICS_ENABLED:
+        route = request.scope.get("route")
+        # Shed requests never reach the router; label them by path when it is a gated endpoint
+        endpoint = getattr(route, "path", None) or (request.url.path if request.url.path in _GATED_PATHS else "unmatched")
+        METRICS.observe("ai_request_duration_seconds", time.perf_counter() - started, endpoint=endpoint)
+        METRICS.inc("ai_requests_total", endpoint=endpoint, status=str(response.status_code))
+    return response
+
+
+def _debug_timings(request: Request | None) -> bool:
+    if settings.DEBUG_TIMINGS:
+        return True
+    return request is not None and request.headers.get("x-debug-timings", "").lower() in ("1", "true", "yes")
+
+
+def _with_stages(response, stages: Dict[str, float], request: Request | None):
+    """Attach the per-stage breakdown (ms) to a JSON body when debug timings are on."""
+    if isinstance(response, dict) and _debug_timings(request):
+        response["stages"] = format_stages(stages)
+    return response
+
+
+@app.get("/metrics")
+def metrics():
+    """Stage histograms, request counters and service gauges in Prometheus text format."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 class AnalyzeRequest(BaseModel):
@@ -63,107 +415,215 @@ class PdfExtractRequest(BaseModel):
     url: str
     use_ocr: bool | None = None  # True: force OCR, False: never OCR, None: auto-fallback
     lang: str | None = None      # e.g., 'eng', 'hin', 'eng+hin'
-class UploadExtractRequest(BaseModel):
-    data: str  # base64 of binary
+    dpi: int | None = None       # OCR rasterization DPI (defaults to AI_OCR_DPI)
+    first_page: int | None = None
+    last_page: int | None = None
+    ocr_profile: str | None = None  # preprocessing + tesseract profile (defaults to AI_OCR_PROFILE)
+class UploadOptions(BaseModel):
     mime: str | None = None
     use_ocr: bool | None = None
     lang: str | None = None
+    dpi: int | None = None
+    first_page: int | None = None
+    last_page: int | None = None
+    ocr_profile: str | None = None
+class UploadExtractRequest(UploadOptions):
+    data: str  # base64 of binary
+class AnalyzeBatchRequest(BaseModel):
+    items: List[AnalyzeRequest]
+class RiskCheckin(BaseModel):
+    id: str
+    date: str | None = None
+    notes: str | None = None
+    vitals: Dict[str, Any] | None = None
+    labs: Dict[str, Any] | None = None
+class RiskSeriesRequest(BaseModel):
+    userId: str | None = None
+    checkins: List[RiskCheckin]  # oldest first
+    windows: List[int] | None = None  # moving-average windows, default [3, 7]
 
 
 
 @app.get("/health")
 def health():
-    cuda_ok = bool(torch and hasattr(torch, "cuda") and torch.cuda.is_available())
-    device = None
-    try:
-        m = _MODEL
-        device = getattr(m, "device", None) if m else None
-    except Exception:
-        device = None
-    # Detect optional libs for explainability
-    try:
-        from backend.models.explainabilityUtils import IntegratedGradients, shap
-    except Exception:
-        try:
-            from ..explainabilityUtils import IntegratedGradients, shap
-        except Exception:
-            IntegratedGradients = None
-            shap = None
+    # torch is only imported once a torch model or backend needs it; until then CUDA is not probed
+    torch = TORCH.load() if TORCH.loaded else None
+    cuda_ok = bool(torch.cuda.is_available()) if torch is not None else None
+    handle = _REGISTRY.active
+    device = getattr(handle.model, "device", None) if handle else None
     return {
-        "status": "ok",
-        "torchAvailable": bool(torch is not None),
+        "status": "ok" if _REGISTRY.ready else "starting",
+        "ready": _REGISTRY.ready,
+        "torchAvailable": TORCH.available(),
         "cudaAvailable": cuda_ok,
-        "modelLoaded": bool(_MODEL is not None),
+        "modelLoaded": _REGISTRY.ready,
         "modelDevice": device,
+        "modelVersion": handle.version if handle else None,
+        "inferenceBackend": getattr(handle.backend, "name", None) if handle else None,
+        "modelLoadMs": round(handle.load_ms + handle.warmup_ms, 2) if handle else None,
+        "model": _REGISTRY.describe(),
         "python": platform.python_version(),
         "platform": platform.platform(),
-        "captumAvailable": bool(IntegratedGradients is not None),
-        "shapAvailable": bool(shap is not None),
+        # Cached probes: answered from module specs, without importing shap or captum
+        "captumAvailable": CAPTUM.available(),
+        "shapAvailable": SHAP.available(),
+        "batching": _SCHEDULER.stats(),
+        "explainCache": _EXPLAIN_CACHE.stats(),
+        "riskCache": _RISK_CACHE.stats(),
+        "extractionCache": _EXTRACT_CACHE.stats(),
+        "fetcher": active_fetcher().stats() if active_fetcher() is not None else None,
+        "admission": {name: gate.stats() for name, gate in _GATES.items()},
+        "pools": {p.name: p.stats() for p in _POOLS},
+        "jobs": _JOBS.stats() if _JOBS is not None else None,
+        "runtime": config_report(),
+        "startup": startup_report(),
     }
 
 
+def _rank_diagnoses(p: List[float], top_k: int | None):
+    """Return (top_indices, diagnoses) for one row of class probabilities."""
+    k = top_k or len(p)
+    k = max(1, min(int(k), len(p)))
+    top_indices = sorted(range(len(p)), key=lambda i: p[i], reverse=True)[:k]
+    diagnoses = [
+        {"label": LABELS[i], "confidence": float(p[i])} for i in top_indices
+    ]
+    return top_indices, diagnoses
+
+
+def _explain_rows(model, x_batch, target_indices: List[int], methods: List[str | None], model_hash: str | None = None,
+                  features: List[str] | None = None) -> List[Dict[str, Any]]:
+    """Explain every row of an (N, 8) batch, serving repeats from the attribution cache.
+
+    Cache misses are grouped by explain method and attributed in one batched call each.
+    The remaining request budget is checked before each call: below
+    AI_EXPLAIN_DEGRADE_BUDGET_MS SHAP is skipped and IG runs with fewer steps
+    (marked ``degraded``, not cached); below AI_EXPLAIN_MIN_BUDGET_MS the
+    remaining rows go unexplained.
+    """
+    n = len(target_indices)
+    attrs: List[Any] = [None] * n
+    keys: List[Any] = [None] * n
+    used: List[str | None] = [None] * n
+    degraded: List[bool] = [False] * n
+    skipped: List[bool] = [False] * n
+    pending: Dict[str, List[int]] = {}
+    x_np = x_batch.detach().cpu().numpy() if model_hash is not None else None
+    for i in range(n):
+        chosen = (methods[i] or "auto").lower()
+        if chosen == "none":
+            continue
+        used[i] = methods[i] or "auto"
+        if x_np is not None:
+            keys[i] = _EXPLAIN_CACHE.make_key(model_hash, chosen, target_indices[i], x_np[i])
+            attrs[i] = _EXPLAIN_CACHE.get(keys[i])
+        if attrs[i] is None:
+            pending.setdefault(chosen, []).append(i)
+
+    for chosen, idx in pending.items():
+        left = remaining_ms()
+        if left is not None and left < settings.EXPLAIN_MIN_BUDGET_MS:
+            for i in idx:
+                skipped[i] = True
+            continue
+        short = left is not None and left < settings.EXPLAIN_DEGRADE_BUDGET_MS
+        method = "captum" if short else chosen
+        options = {"n_steps": settings.EXPLAIN_DEGRADED_IG_STEPS} if short else {}
+        rows = compute_attributions_batch(
+            model, x_batch[idx], [int(target_indices[i]) for i in idx], method=method, **options
+        )
+        for r, i in enumerate(idx):
+            attrs[i] = rows[r] if rows else None
+            if short:
+                used[i], degraded[i] = method, True
+            elif attrs[i] is not None and keys[i] is not None:
+                _EXPLAIN_CACHE.set(keys[i], attrs[i])
+
+    features = features or FEATURE_NAMES
+    results = []
+    for i in range(n):
+        if skipped[i]:
+            results.append({"available": False, "reason": "deadline"})
+            continue
+        payload = {
+            "available": attrs[i] is not None,
+            "method": used[i] if attrs[i] is not None else "none",
+            "features": features,
+            "attributions": attrs[i],
+        }
+        if degraded[i]:
+            payload["degraded"] = True
+        results.append(summarize_attributions(payload))
+    return results
+
+
+def _explain_row(model, x_row, target_index: int, method: str | None, model_hash: str | None = None,
+                 features: List[str] | None = None) -> Dict[str, Any]:
+    """Compute attributions for a single (1, 8) row and shape the explainability payload."""
+    return _explain_rows(model, x_row, [int(target_index)], [method], model_hash=model_hash, features=features)[0]
+
+
+def _fallback_diagnoses() -> List[Dict[str, Any]]:
+    # Fallback when no backend can serve (untrained model without torch)
+    return [
+        {"label": "Condition A", "confidence": 0.72},
+        {"label": "Condition B", "confidence": 0.18},
+        {"label": "Condition C", "confidence": 0.10},
+    ]
+
+
 @app.post("/analyze")
-def analyze(req: AnalyzeRequest):
+async def analyze(req: AnalyzeRequest, request: Request):
+    with trace_stages() as stages:
+        response = await _INFERENCE_POOL.run(_analyze, req)
+    return _with_stages(response, stages, request)
+
+
+def _analyze(req: AnalyzeRequest) -> Dict[str, Any]:
     started = time.time()
     try:
-        model = get_model()
+        # One handle for the whole request: featurizer, backend, explainer and cache keys all match
+        handle = get_handle()
+        model = handle.model
+        featurizer = handle.featurizer
 
         # Prepare features
         payload = req.dict() if req else {}
-        x = featurize_payload_to_tensor(payload, use_scipy_winsorize=bool(payload.get("useScipyWinsorize")))
+        x = None
+        if featurizer is not None:
+            x, _ = featurizer.featurize([payload], use_scipy_winsorize=bool(payload.get("useScipyWinsorize")))
 
         diagnoses: List[Dict[str, Any]] = []
         explainability: Dict[str, Any] = {"available": False}
 
-        if x is not None and torch is not None:
-            with _MODEL_LOCK:
-                # Move to the same device as model
-                device = model.device if hasattr(model, "device") else ("cuda" if torch.cuda.is_available() else "cpu")
-                x = x.to(device)
-                probs = model.predict_proba(x)
+        if x is not None and handle.backend is not None:
+            # Scheduled through the micro-batcher; returns this request's row only
+            check_deadline("inference")
+            with span("inference"):
+                try:
+                    probs = _SCHEDULER.submit(x, timeout=wait_timeout(), context=handle)
+                except TimeoutError:
+                    raise DeadlineExceeded("inference")
 
             if probs is not None:
-                p = probs[0].detach().cpu().tolist()
-                labels = ["Condition A", "Condition B", "Condition C"]
-
-                # top-K filter
-                k = payload.get("topK") or len(p)
-                k = max(1, min(int(k), len(p)))
-                top_indices = sorted(range(len(p)), key=lambda i: p[i], reverse=True)[:k]
-                diagnoses = [
-                    {"label": labels[i], "confidence": float(p[i])} for i in top_indices
-                ]
+                p = probs.tolist()
+                top_indices, diagnoses = _rank_diagnoses(p, payload.get("topK"))
 
                 # Compute simple feature attributions for top-1
-                top1 = top_indices[0]
-                method = payload.get("explainMethod")
-                attrs = compute_attributions(model, x, target_index=int(top1), method=method)
-                feature_names = [
-                    "heartRate",
-                    "systolicBP",
-                    "diastolicBP",
-                    "respiratoryRate",
-                    "temperature",
-                    "wbc",
-                    "crp",
-                    "glucose",
-                ]
-                explainability = summarize_attributions({
-                    "available": attrs is not None,
-                    "method": (method or "auto") if attrs is not None else "none",
-                    "features": feature_names,
-                    "attributions": attrs,
-                })
+                if _is_explainable(model):
+                    with span("explain"):
+                        explainability = _explain_row(
+                            model, _to_model_tensor(model, x), top_indices[0], payload.get("explainMethod"), handle.hash,
+                            featurizer.features,
+                        )
+                else:
+                    explainability = {"available": False, "reason": "torch not available"}
         else:
-            # Fallback if torch unavailable
-            diagnoses = [
-                {"label": "Condition A", "confidence": 0.72},
-                {"label": "Condition B", "confidence": 0.18},
-                {"label": "Condition C", "confidence": 0.10},
-            ]
+            diagnoses = _fallback_diagnoses()
             explainability = {"available": False, "reason": "torch not available"}
 
-        red_flags = detect_red_flags(payload)
+        with span("red_flags"):
+            red_flags = detect_red_flags(payload)
 
         return {
             "diagnoses": diagnoses,
@@ -171,6 +631,8 @@ def analyze(req: AnalyzeRequest):
             "explainability": explainability,
             "latencyMs": int((time.time() - started) * 1000),
         }
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return {
             "diagnoses": [],
@@ -181,178 +643,494 @@ def analyze(req: AnalyzeRequest):
         }
 
 
-@app.post("/extract_from_pdf")
-def extract_from_pdf(req: PdfExtractRequest):
+@app.post("/analyze_batch")
+async def analyze_batch(req: AnalyzeBatchRequest, request: Request):
+    """Analyze N check-ins with a single featurization pass and one forward pass.
+
+    Results are returned in input order. Each item carries its own ``error``
+    field so that one malformed item does not fail the whole batch.
+    """
+    with trace_stages() as stages:
+        response = await _INFERENCE_POOL.run(_analyze_batch, req)
+    return _with_stages(response, stages, request)
+
+
+def _analyze_batch(req: AnalyzeBatchRequest) -> Dict[str, Any]:
     started = time.time()
-    if requests is None:
-        return {"ok": False, "error": "requests missing", "latencyMs": int((time.time() - started) * 1000)}
+    items = list(req.items or []) if req else []
+    payloads = [it.dict() for it in items]
+    results: List[Dict[str, Any]] = [
+        {"diagnoses": [], "redFlags": [], "explainability": {"available": False}} for _ in payloads
+    ]
     try:
-        r = requests.get(req.url, timeout=15)
-        r.raise_for_status()
-        content = r.content
-        text = ""
-        pages_meta = {"count": None}
-        method = "none"
-        chosen_lang = (req.lang or "eng").strip()
-
-        # Prefer text extraction unless force OCR
-        if (req.use_ocr is not True) and pdfminer_extract_text is not None:
-            method = "pdfminer"
-            text = (pdfminer_extract_text(io.BytesIO(content)) or "").strip()
-
-        # Auto-fallback to OCR if: force OCR, or text too short/empty
-        should_try_ocr = (
-            (req.use_ocr is True) or
-            ((req.use_ocr is None) and (not text or len(text) < 200))
-        )
-        if should_try_ocr and convert_from_bytes is not None and pytesseract is not None:
-            method = "ocr"
-            images = convert_from_bytes(content)
-            pages_meta["count"] = len(images) if images else 0
-            ocr_pages: List[str] = []
-            for img in images:
+        handle = get_handle()
+        model = handle.model
+        featurizer = handle.featurizer
+
+        # Featurize the whole batch into one buffer; a bad payload only marks its own slot.
+        # Runs even without a backend so malformed items are reported rather than given fallbacks.
+        row_index: List[int] = []
+        x_all = None
+        if featurizer is not None and payloads:
+            x_all, errors = featurizer.featurize(
+                payloads,
+                use_scipy_winsorize=[bool(pl.get("useScipyWinsorize")) for pl in payloads],
+                strict=False,
+            )
+            for i, err in enumerate(errors):
+                if err is not None:
+                    results[i]["error"] = err
+                else:
+                    row_index.append(i)
+
+        if row_index and x_all is not None and handle.backend is not None:
+            if len(row_index) < len(payloads):
+                x_all = x_all[row_index]
+            check_deadline("inference")
+            with span("model_lock_wait"):
+                _MODEL_LOCK.acquire()
+            try:
+                with span("forward"):
+                    probs = handle.backend.predict_proba(x_all)
+            finally:
+                _MODEL_LOCK.release()
+            p_rows = probs.tolist() if probs is not None else []
+
+            ranked: List[int] = []
+            targets: List[int] = []
+            for r, i in enumerate(row_index):
+                if r >= len(p_rows):
+                    break
+                try:
+                    top_indices, diagnoses = _rank_diagnoses(p_rows[r], payloads[i].get("topK"))
+                    results[i]["diagnoses"] = diagnoses
+                    ranked.append(r)
+                    targets.append(top_indices[0])
+                except Exception as e:
+                    results[i]["error"] = str(e)
+
+            # Explanations for all ranked rows in batched explainer calls
+            if ranked and not _is_explainable(model):
+                for r in ranked:
+                    results[row_index[r]]["explainability"] = {"available": False, "reason": "torch not available"}
+            elif ranked:
                 try:
-                    if isinstance(img, Image.Image):
-                        ocr_pages.append(pytesseract.image_to_string(img, lang=chosen_lang) or "")
-                except Exception:
-                    ocr_pages.append("")
-            text = "\n\n".join([p.strip() for p in ocr_pages if p]).strip()
-
-        # If still empty
-        if not text:
-            method = method or "none"
-
-        # Very light regex-based lab extraction similar to Node side
-        def find(pattern):
-            m = re.search(pattern, text, flags=re.IGNORECASE)
-            return m.group(1) if m else None
-
-        def find_float(pattern):
-            v = find(pattern)
-            if not v:
-                return None
+                    with span("explain"):
+                        explained = _explain_rows(
+                            model,
+                            _to_model_tensor(model, x_all[ranked]),
+                            targets,
+                            [payloads[row_index[r]].get("explainMethod") for r in ranked],
+                            model_hash=handle.hash,
+                            features=featurizer.features,
+                        )
+                    for r, explainability in zip(ranked, explained):
+                        results[row_index[r]]["explainability"] = explainability
+                except Exception as e:
+                    for r in ranked:
+                        results[row_index[r]]["error"] = str(e)
+        elif handle.backend is None:
+            for i in range(len(payloads)):
+                if "error" not in results[i]:
+                    results[i]["diagnoses"] = _fallback_diagnoses()
+                    results[i]["explainability"] = {"available": False, "reason": "torch not available"}
+
+        with span("red_flags"):
             try:
-                return float(re.findall(r"-?\d+(?:\.\d+)?", v.replace(",", ""))[0])
-            except Exception:
-                return None
-
-        meta = {
-            "patientName": find(r"(?:patient|name)\s*[:\-]?\s*([A-Za-z ,.'-]{3,})"),
-            "patientId": find(r"(?:mrn|patient\s*id|accession)\s*[:\-]?\s*([A-Za-z0-9\-]+)"),
-            "date": find(r"(?:date|reported\s*on)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\d{4}[\-]\d{2}[\-]\d{2})"),
+                for result, flags in zip(results, detect_red_flags_batch(payloads)):
+                    result["redFlags"] = flags
+            except Exception as e:
+                for result in results:
+                    result.setdefault("error", str(e))
+
+        return {
+            "ok": True,
+            "count": len(results),
+            "results": results,
+            "latencyMs": int((time.time() - started) * 1000),
         }
-        labs = []
-        def push_lab(name, value, unit):
-            if value is None:
-                return
-            labs.append({"name": name, "value": value, "unit": unit, "confidence": 0.6})
-
-        push_lab("glucose", find_float(r"glucose\s*[:=\-]?\s*([\d.,]+)\s*(mg\/dl|mmol\/l)?"), "mg/dL")
-        push_lab("hemoglobin", find_float(r"(hemoglobin|hgb)\s*[:=\-]?\s*([\d.,]+)"), "g/dL")
-        push_lab("creatinine", find_float(r"creatinine\s*[:=\-]?\s*([\d.,]+)"), "mg/dL")
-        push_lab("sodium", find_float(r"sodium\s*[:=\-]?\s*([\d.,]+)"), "mmol/L")
-        push_lab("potassium", find_float(r"potassium\s*[:=\-]?\s*([\d.,]+)"), "mmol/L")
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return {
+            "ok": False,
+            "count": len(results),
+            "results": results,
+            "error": str(e),
+            "latencyMs": int((time.time() - started) * 1000),
+        }
+
 
+@app.post("/risk_series")
+async def risk_series(req: RiskSeriesRequest, request: Request):
+    """Risk score per check-in plus rolling trend features over the series.
+
+    Scores are cached by check-in ID and model version, so only check-ins not
+    seen since the last call (or edited since) reach the model.
+    """
+    with trace_stages() as stages:
+        response = await _INFERENCE_POOL.run(_risk_series, req)
+    return _with_stages(response, stages, request)
+
+
+def _risk_series(req: RiskSeriesRequest) -> Dict[str, Any]:
+    started = time.time()
+    checkins = [c.dict() for c in (req.checkins or [])]
+    try:
+        handle = get_handle()
+        featurizer = handle.featurizer
+        n = len(checkins)
+        scores: List[Any] = [None] * n
+        errors: List[Dict[str, Any]] = []
+        keys: List[Any] = []
+        if handle.backend is not None and featurizer is not None:
+            keys = [
+                RiskScoreCache.make_key(handle.hash, featurizer.version, c["id"], checkin_fingerprint(c))
+                for c in checkins
+            ]
+            with span("risk_cache_get"):
+                scores = _RISK_CACHE.get_many(keys)
+        pending = [i for i in range(n) if scores[i] is None]
+
+        if pending and keys:
+            x, row_errors = featurizer.featurize([checkins[i] for i in pending], strict=False)
+            check_deadline("inference")
+            # Use this handle's backend, not the registry's, so scores match the key's model hash
+            with span("model_lock_wait"):
+                _MODEL_LOCK.acquire()
+            try:
+                with span("forward"):
+                    probs = handle.backend.predict_proba(x)
+            finally:
+                _MODEL_LOCK.release()
+            top = probs.argmax(axis=1)
+            fresh = []
+            for r, i in enumerate(pending):
+                scores[i] = {"risk": float(probs[r, top[r]]), "label": LABELS[int(top[r])]}
+                if row_errors[r] is None:
+                    fresh.append((keys[i], scores[i]))
+                else:
+                    errors.append({"id": checkins[i]["id"], "error": row_errors[r]})
+            _RISK_CACHE.set_many(fresh)
+        elif pending:
+            top = _fallback_diagnoses()[0]
+            for i in pending:
+                scores[i] = {"risk": top["confidence"], "label": top["label"]}
+
+        points = [s["risk"] for s in scores]
+        with span("risk_trends"):
+            trends = rolling_trends(points, req.windows or (3, 7))
+        response = {
+            "ok": True,
+            "userId": req.userId,
+            "modelVersion": handle.version,
+            "ids": [c["id"] for c in checkins],
+            "labels": [c.get("date") or "" for c in checkins],
+            "points": points,
+            "topLabels": [s["label"] for s in scores],
+            "trends": trends,
+            "scored": len(pending),
+            "cached": n - len(pending),
+            "latencyMs": int((time.time() - started) * 1000),
+        }
+        if errors:
+            response["errors"] = errors
+        return response
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+
+
+def _extraction_key(content, mime: str | None, opts: ExtractOptions, hasher=None) -> str:
+    options = dict(
+        mime=mime,
+        lang=(opts.lang or "eng").strip(),
+        use_ocr=opts.use_ocr,
+        dpi=opts.dpi,
+        first_page=opts.first_page,
+        last_page=opts.last_page,
+        ocr_profile=ocr_profile_name(opts),
+        extractor=EXTRACTOR_VERSION,
+    )
+    return finish_key(hasher, **options) if hasher is not None else content_key(content, **options)
+
+
+async def _extract_cached(content, mime: str | None, req, hasher=None, timings: Dict[str, float] | None = None,
+                          progress: JobProgress | None = None) -> tuple[Dict[str, Any], bool]:
+    """Serve extraction results from the content-addressed cache, else run them on the extraction pool.
+
+    ``hasher`` is an already-fed SHA-256 of the content, for streamed uploads.
+    Hashing and the disk cache tier run on the default threadpool, never on the event loop.
+    ``progress`` receives pages as they are extracted (background jobs); cache hits report none.
+    """
+    opts = ExtractOptions.from_request(req)
+    key = await run_in_threadpool(_extraction_key, content, mime, opts, hasher)
+    with span("extraction_cache_get"):
+        cached = await run_in_threadpool(_EXTRACT_CACHE.get, key)
+    if cached is not None:
+        return cached, True
+    capture = _EXTRACT_POOL.out_of_process
+    result, doc_timings, doc_stages = await _EXTRACT_POOL.run(run_extraction, content, mime, opts, current_deadline(), capture,
+                                                              progress)
+    for stage, ms in doc_stages.items():
+        instrumentation.record(stage, ms / 1000)
+    if timings is not None:
+        timings.update(doc_timings)
+    # Don't pin transient OCR failures in the cache
+    if not any(p.get("error") for p in result["ocr"]["pages"]):
+        await run_in_threadpool(_EXTRACT_CACHE.set, key, result)
+    return result, False
+
+
+@app.post("/extract_from_pdf")
+async def extract_from_pdf(req: PdfExtractRequest, request: Request):
+    with trace_stages() as stages:
+        response = await _extract_from_pdf(req)
+    return _with_stages(response, stages, request)
+
+
+async def _extract_from_pdf(req: PdfExtractRequest, progress: JobProgress | None = None):
+    started = time.time()
+    fetcher = get_fetcher()
+    if fetcher is None:
+        return {"ok": False, "error": "requests missing", "latencyMs": int((time.time() - started) * 1000)}
+    try:
+        check_deadline("fetch")
+        fetched = await run_in_threadpool(fetcher.fetch, req.url, wait_timeout(fetcher.timeout_s))
+    except FetchTooLarge as e:
+        return JSONResponse(status_code=413, content={
+            "ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000),
+        })
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        check_deadline("fetch")  # a read timeout cut short by the request deadline
+        return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+    instrumentation.record("fetch", fetched.fetch_ms / 1000)
+    try:
+        timings: Dict[str, float] = {"fetchMs": fetched.fetch_ms}
+        result, cached = await _extract_cached(fetched.path, "application/pdf", req, hasher=fetched.hasher, timings=timings,
+                                               progress=progress)
         return {
             "ok": True,
-            "ocr": {"text": text, "pages": [], "method": method, "pageCount": pages_meta.get("count"), "lang": chosen_lang},
-            "extracted": {"meta": meta, "labs": labs, "diagnoses": [], "medications": []},
+            **result,
+            "cached": cached,
+            "fetch": {"status": fetched.status, "revalidated": fetched.revalidated, "sizeBytes": fetched.size},
+            "timings": timings,
             "latencyMs": int((time.time() - started) * 1000),
         }
+    except (DeadlineExceeded, PoolSaturated):
+        raise
     except Exception as e:
         return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+    finally:
+        fetcher.release(fetched, req.url)
 
 
 @app.post("/extract_from_upload")
-def extract_from_upload(req: UploadExtractRequest):
+async def extract_from_upload(req: UploadExtractRequest, request: Request):
+    with trace_stages() as stages:
+        response = await _extract_from_upload(req)
+    return _with_stages(response, stages, request)
+
+
+async def _extract_from_upload(req: UploadExtractRequest):
     started = time.time()
     try:
-        content = base64.b64decode(req.data or "") if req and req.data else b""
+        # Reject oversized bodies before paying for the base64 decode
+        if req and req.data and len(req.data) * 3 // 4 > settings.UPLOAD_MAX_BYTES:
+            return JSONResponse(status_code=413, content={
+                "ok": False,
+                "error": f"upload exceeds {settings.UPLOAD_MAX_BYTES} bytes",
+                "latencyMs": int((time.time() - started) * 1000),
+            })
+        with span("base64_decode"):
+            content = await run_in_threadpool(base64.b64decode, req.data) if req and req.data else b""
         if not content:
             return {"ok": False, "error": "empty content", "latencyMs": int((time.time() - started) * 1000)}
-        chosen_lang = (req.lang or "eng").strip()
-
-        text = ""
-        method = "none"
-        pages_meta = {"count": None}
-
-        if req.mime == "application/pdf":
-            if pdfminer_extract_text is not None:
-                method = "pdfminer"
-                text = (pdfminer_extract_text(io.BytesIO(content)) or "").strip()
-            should_try_ocr = (
-                (req.use_ocr is True) or ((req.use_ocr is None) and (not text or len(text) < 200))
-            )
-            if should_try_ocr and convert_from_bytes is not None and pytesseract is not None:
-                method = "ocr"
-                images = convert_from_bytes(content)
-                pages_meta["count"] = len(images) if images else 0
-                ocr_pages: List[str] = []
-                for img in images:
-                    try:
-                        if isinstance(img, Image.Image):
-                            ocr_pages.append(pytesseract.image_to_string(img, lang=chosen_lang) or "")
-                    except Exception:
-                        ocr_pages.append("")
-                text = "\n\n".join([p.strip() for p in ocr_pages if p]).strip()
-        else:
-            # Assume image
-            if Image is not None and pytesseract is not None:
-                try:
-                    img = Image.open(io.BytesIO(content))
-                    method = "ocr"
-                    text = pytesseract.image_to_string(img, lang=chosen_lang) or ""
-                except Exception:
-                    text = ""
-
-        def find(pattern):
-            m = re.search(pattern, text, flags=re.IGNORECASE)
-            return m.group(1) if m else None
-
-        def find_float(pattern):
-            v = find(pattern)
-            if not v:
-                return None
-            try:
-                return float(re.findall(r"-?\d+(?:\.\d+)?", v.replace(",", ""))[0])
-            except Exception:
-                return None
-
-        meta = {
-            "patientName": find(r"(?:patient|name)\s*[:\-]?\s*([A-Za-z ,.'-]{3,})"),
-            "patientId": find(r"(?:mrn|patient\s*id|accession)\s*[:\-]?\s*([A-Za-z0-9\-]+)"),
-            "date": find(r"(?:date|reported\s*on)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\d{4}[\-]\d{2}[\-]\d{2})"),
+        timings: Dict[str, float] = {}
+        result, cached = await _extract_cached(content, req.mime, req, timings=timings)
+        return {
+            "ok": True,
+            **result,
+            "cached": cached,
+            "timings": timings,
+            "latencyMs": int((time.time() - started) * 1000),
         }
-        labs = []
-        def push_lab(name, value, unit):
-            if value is None:
-                return
-            labs.append({"name": name, "value": value, "unit": unit, "confidence": 0.6})
-
-        push_lab("glucose", find_float(r"glucose\s*[:=\-]?\s*([\d.,]+)\s*(mg\/dl|mmol\/l)?"), "mg/dL")
-        push_lab("hemoglobin", find_float(r"(hemoglobin|hgb)\s*[:=\-]?\s*([\d.,]+)"), "g/dL")
-        push_lab("creatinine", find_float(r"creatinine\s*[:=\-]?\s*([\d.,]+)"), "mg/dL")
-        push_lab("sodium", find_float(r"sodium\s*[:=\-]?\s*([\d.,]+)"), "mmol/L")
-        push_lab("potassium", find_float(r"potassium\s*[:=\-]?\s*([\d.,]+)"), "mmol/L")
+    except (DeadlineExceeded, PoolSaturated):
+        raise
+    except Exception as e:
+        return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+
+
+@app.post("/extract_from_upload_stream")
+async def extract_from_upload_stream(request: Request):
+    """Extract from a raw binary or multipart/form-data upload streamed to a temp file.
+
+    Options (``mime``, ``use_ocr``, ``lang``, ``dpi``, ``first_page``,
+    ``last_page``) come from the query string or, for multipart, form fields.
+    The body is never held in memory as a whole; pdfminer, pdf2image and PIL
+    read the spooled file by path.
+    """
+    with trace_stages() as stages:
+        response = await _extract_from_upload_stream(request)
+    return _with_stages(response, stages, request)
+
 
+async def _extract_from_upload_stream(request: Request):
+    started = time.time()
+    try:
+        with span("receive_upload"):
+            upload = await receive_upload(request, settings.UPLOAD_MAX_BYTES)
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={
+            "ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000),
+        })
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+    try:
+        if not upload.size:
+            return {"ok": False, "error": "empty content", "latencyMs": int((time.time() - started) * 1000)}
+        params = {**upload.fields, **dict(request.query_params)}
+        known = getattr(UploadOptions, "model_fields", None) or UploadOptions.__fields__
+        opts = UploadOptions(**{k: v for k, v in params.items() if k in known})
+        mime = opts.mime or upload.mime
+        if not mime or mime == "application/octet-stream":
+            with open(upload.path, "rb") as f:
+                mime = "application/pdf" if f.read(5) == b"%PDF-" else mime
+        timings: Dict[str, float] = {}
+        result, cached = await _extract_cached(upload.path, mime, opts, upload.hasher, timings)
         return {
             "ok": True,
-            "ocr": {"text": text, "pages": [], "method": method, "pageCount": pages_meta.get("count"), "lang": chosen_lang},
-            "extracted": {"meta": meta, "labs": labs, "diagnoses": [], "medications": []},
+            **result,
+            "cached": cached,
+            "timings": timings,
+            "sizeBytes": upload.size,
             "latencyMs": int((time.time() - started) * 1000),
         }
+    except (DeadlineExceeded, PoolSaturated):
+        raise
+    except Exception as e:
+        return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+    finally:
+        upload.cleanup()
+
+
+async def _extract_from_file(path: str, mime: str | None, opts: UploadOptions, progress: JobProgress | None = None):
+    started = time.time()
+    try:
+        timings: Dict[str, float] = {}
+        result, cached = await _extract_cached(path, mime, opts, timings=timings, progress=progress)
+        return {
+            "ok": True,
+            **result,
+            "cached": cached,
+            "timings": timings,
+            "latencyMs": int((time.time() - started) * 1000),
+        }
+    except (DeadlineExceeded, PoolSaturated):
+        raise
+    except Exception as e:
+        return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
+
+
+class PdfJobRequest(PdfExtractRequest):
+    priority: int = 0  # higher runs first; equal priorities run in submission order
+
+
+class UploadJobRequest(UploadExtractRequest):
+    priority: int = 0
+
+
+def _job_links(job_id: str) -> Dict[str, str]:
+    return {"statusUrl": f"/jobs/{job_id}", "resultUrl": f"/jobs/{job_id}/result"}
+
+
+async def _submit_job(source: str, req, content: bytes | None = None, url: str | None = None, mime: str | None = None):
+    if _JOBS is None:
+        return JSONResponse(status_code=503, content={"ok": False, "error": "jobs disabled"})
+    try:
+        ocr_profile_name(req)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"ok": False, "error": str(e)})
+    if await run_in_threadpool(_JOB_STORE.queued) >= settings.JOBS_MAX_QUEUED:
+        return JSONResponse(status_code=429, headers={"Retry-After": "1"}, content={"ok": False, "error": "job queue full"})
+    options = {name: getattr(req, name) for name in ExtractOptions.__slots__}
+    job_id = await run_in_threadpool(_JOB_STORE.submit, source, options, req.priority, content, url, mime)
+    _JOBS.notify()
+    return JSONResponse(status_code=202, content={"ok": True, "jobId": job_id, "status": "queued", **_job_links(job_id)})
+
+
+@app.post("/jobs/extract_from_pdf")
+async def submit_pdf_job(req: PdfJobRequest):
+    """Queue ``/extract_from_pdf`` as a background job; the report is fetched when the job starts."""
+    return await _submit_job("url", req, url=req.url, mime="application/pdf")
+
+
+@app.post("/jobs/extract_from_upload")
+async def submit_upload_job(req: UploadJobRequest):
+    """Queue ``/extract_from_upload`` as a background job; the document is stored with the job until it finishes."""
+    if req.data and len(req.data) * 3 // 4 > settings.UPLOAD_MAX_BYTES:
+        return JSONResponse(status_code=413, content={"ok": False, "error": f"upload exceeds {settings.UPLOAD_MAX_BYTES} bytes"})
+    content = await run_in_threadpool(base64.b64decode, req.data) if req.data else b""
+    if not content:
+        return {"ok": False, "error": "empty content"}
+    mime = req.mime or ("application/pdf" if content[:5] == b"%PDF-" else None)
+    return await _submit_job("upload", req, content=content, mime=mime)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, pages: bool = True):
+    """Status and page progress of a job; while it runs, ``pages`` holds the pages extracted so far."""
+    job = await run_in_threadpool(_JOB_STORE.get, job_id, pages) if _JOB_STORE is not None else None
+    if job is None:
+        return JSONResponse(status_code=404, content={"ok": False, "error": "unknown job"})
+    return {"ok": True, **describe_job(job), **(_job_links(job_id) if job["status"] == DONE else {})}
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """The extraction response of a finished job; ``202`` with the job status while it is queued or running."""
+    job = await run_in_threadpool(_JOB_STORE.get, job_id, False) if _JOB_STORE is not None else None
+    if job is None:
+        return JSONResponse(status_code=404, content={"ok": False, "error": "unknown job"})
+    if job["status"] == DONE:
+        return {**job["result"], "jobId": job_id}
+    if job["status"] == FAILED:
+        return {"ok": False, "jobId": job_id, "error": job["error"]}
+    return JSONResponse(status_code=202, content={"ok": True, **describe_job(job)})
+
+
+class ReloadModelRequest(BaseModel):
+    version: str | None = None
+
+
+@app.post("/admin/reload_model")
+def reload_model(req: ReloadModelRequest, request: Request):
+    """Load, warm up and atomically swap in a checkpoint version (default: newest).
+
+    Requires ``X-Admin-Token`` to match ``AI_ADMIN_TOKEN``; disabled when that is unset.
+    """
+    if not settings.ADMIN_TOKEN or request.headers.get("x-admin-token") != settings.ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"ok": False, "error": "forbidden"})
+    started = time.time()
+    try:
+        handle = _REGISTRY.reload(req.version)
+        return {"ok": True, "model": handle.describe(), "latencyMs": int((time.time() - started) * 1000)}
     except Exception as e:
         return {"ok": False, "error": str(e), "latencyMs": int((time.time() - started) * 1000)}
 
 
 if __name__ == "__main__":
-    # Allows: python backend/models/ai_service/main.py
+    # Allows: python backend/models/ai_service/main.py (AI_WORKERS > 1 pre-forks workers; see serve.py)
     try:
-        import uvicorn
-        uvicorn.run("backend.models.ai_service.main:app", host="0.0.0.0", port=8000, reload=False)
-    except Exception:
-        # Fallback for relative path execution
+        import sys
+        from backend.models.ai_service.serve import main as serve_main
+        sys.exit(serve_main())
+    except ImportError:
+        # Fallback for relative path execution: single process
         import uvicorn
         uvicorn.run(app, host="0.0.0.0", port=8000)
-
-
@@ -0,0 +1,305 @@
+# Versioned checkpoint registry with startup warmup and atomic hot-swap
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+try:
+    import numpy as _np
+except Exception:
+    _np = None
+
+try:
+    from backend.models.diagnosisModel import Featurizer, create_model, get_featurizer
+    from backend.models.explainabilityUtils import compute_attributions_batch
+    from backend.models.inferenceBackends import create_backend, load_weights
+    from backend.models.optionalDeps import optional
+    from backend.models.ai_service.attributionCache import weights_hash
+except Exception:
+    from ..diagnosisModel import Featurizer, create_model, get_featurizer
+    from ..explainabilityUtils import compute_attributions_batch
+    from ..inferenceBackends import create_backend, load_weights
+    from ..optionalDeps import optional
+    from .attributionCache import weights_hash
+
+# Imported when a .pt checkpoint (or the untrained model) is loaded; serving an .npz export never imports it
+TORCH = optional("torch")
+
+CHECKPOINT_SUFFIX = ".pt"
+# Exported NumPy weights; served by the numpy backend, including in torch-less images
+WEIGHTS_SUFFIX = ".npz"
+UNTRAINED_VERSION = "untrained"
+
+
+class ModelHandle:
+    """An immutable, fully warmed-up model version ready to serve.
+
+    ``featurizer`` carries the checkpoint's own normalization stats, or the
+    default ones when it ships none; requests featurize with the featurizer of
+    the handle they score with, so inputs and weights always match.
+    ``backend`` serves probabilities (see inferenceBackends); ``model`` is the
+    torch module used for explanations and is None for NumPy-only exports.
+    """
+
+    def __init__(self, model, version: str, path: str | None, featurizer=None, load_ms: float = 0.0,
+                 warmup_ms: float = 0.0, backend=None, weights=None):
+        self.model = model
+        self.version = version
+        self.path = path
+        self.featurizer = featurizer
+        self.backend = backend
+        self.hash = weights_hash(model if model is not None else weights)
+        self.load_ms = load_ms
+        self.warmup_ms = warmup_ms
+        self.loaded_at = time.time()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "weightsHash": self.hash,
+            "loadMs": round(self.load_ms, 2),
+            "warmupMs": round(self.warmup_ms, 2),
+            "loadedAt": self.loaded_at,
+            "featureStatsVersion": getattr(self.featurizer, "version", None),
+            "backend": getattr(self.backend, "name", None),
+            "explainable": bool(getattr(self.model, "_has_torch", False)),
+        }
+
+
+def _suffixes():
+    return (CHECKPOINT_SUFFIX, WEIGHTS_SUFFIX) if TORCH.available() else (WEIGHTS_SUFFIX,)
+
+
+def list_checkpoints(directory: str) -> List[str]:
+    """Checkpoint versions in ``directory``, oldest first by modification time.
+
+    Without torch only exported ``.npz`` weights count as loadable versions.
+    """
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith(_suffixes())]
+    except OSError:
+        return []
+    newest: Dict[str, float] = {}
+    for n in names:
+        version = os.path.splitext(n)[0]
+        newest[version] = max(newest.get(version, 0.0), os.path.getmtime(os.path.join(directory, n)))
+    return sorted(newest, key=lambda v: (newest[v], v))
+
+
+def load_checkpoint(path: str):
+    """Build a DiagnosisModel from a checkpoint file.
+
+    Checkpoints are dicts with ``state_dict`` and optionally ``input_dim``,
+    ``num_classes``, ``version`` and ``featureStats``; a bare state dict is also
+    accepted. Returns ``(model, version, featurizer_or_None)``.
+    """
+    torch = TORCH.load()
+    if torch is None:
+        raise RuntimeError("torch is required to load checkpoints")
+    blob = torch.load(path, map_location="cpu", weights_only=True)
+    state = blob.get("state_dict", blob) if isinstance(blob, dict) else blob
+    meta = blob if isinstance(blob, dict) and "state_dict" in blob else {}
+    model = create_model(
+        input_dim=int(meta.get("input_dim", 8)),
+        num_classes=int(meta.get("num_classes", 3)),
+    )
+    model.load_state_dict(state)
+    model.eval()
+    version = str(meta.get("version") or os.path.basename(path)[: -len(CHECKPOINT_SUFFIX)])
+    stats = meta.get("featureStats")
+    featurizer = Featurizer.from_stats(stats) if stats else None
+    return model, version, featurizer
+
+
+def load_exported(path: str):
+    """Read exported ``.npz`` weights; returns ``(weights, version, featurizer_or_None)``."""
+    weights, meta = load_weights(path)
+    version = str(meta.get("version") or os.path.basename(path)[: -len(WEIGHTS_SUFFIX)])
+    stats = meta.get("featureStats")
+    featurizer = Featurizer.from_stats(stats) if stats else None
+    return weights, version, featurizer
+
+
+def warmup(model, num_features: int = 8, backend=None) -> float:
+    """Run representative forward and explain passes so first requests don't pay init costs."""
+    started = time.perf_counter()
+    if backend is not None and _np is not None:
+        for n in (1, 8):
+            backend.predict_proba(_np.zeros((n, num_features), dtype=_np.float32))
+    if not getattr(model, "_has_torch", False):
+        return (time.perf_counter() - started) * 1000
+    device = getattr(model, "device", "cpu")
+    x = TORCH.load().zeros(2, num_features, device=device)
+    for method in ("captum", "shap"):
+        try:
+            compute_attributions_batch(model, x, [0, 1], method=method)
+        except Exception:
+            pass
+    return (time.perf_counter() - started) * 1000
+
+
+class ModelRegistry:
+    """Loads versioned checkpoints and swaps the active model atomically.
+
+    Requests read ``active`` once and keep using that handle, so a swap never
+    blocks or disturbs in-flight work; the old model is released when the last
+    request holding it finishes. Loading and warmup happen before the swap.
+    """
+
+    def __init__(self, directory: str, on_activate: Callable[[ModelHandle], None] | None = None, warm: bool = True,
+                 backend: str | None = None):
+        self.directory = directory
+        self.warm = warm
+        self.backend_name = backend
+        self._on_activate = on_activate
+        self._active: ModelHandle | None = None
+        self._load_lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._watch_stop = threading.Event()
+        self._dir_signature = None
+        self._preloaded: ModelHandle | None = None
+        self.swaps = 0
+        self.last_error: str | None = None
+
+    @property
+    def active(self) -> ModelHandle | None:
+        return self._active
+
+    @property
+    def ready(self) -> bool:
+        return self._active is not None
+
+    def get(self) -> ModelHandle:
+        """Return the active handle, loading the default version on first use."""
+        handle = self._active
+        if handle is not None:
+            return handle
+        with self._load_lock:
+            if self._active is None:
+                self._activate(self._load(None))
+            return self._active
+
+    def _load(self, version: str | None, warm: bool | None = None) -> ModelHandle:
+        started = time.perf_counter()
+        versions = list_checkpoints(self.directory)
+        chosen = version or (versions[-1] if versions else None)
+        weights = None
+        if chosen is None:
+            model, path, featurizer = create_model(), None, None
+            chosen = UNTRAINED_VERSION
+        else:
+            # Prefer the full torch checkpoint; fall back to the NumPy export of the same version
+            path = None
+            for suffix in _suffixes():
+                candidate = os.path.join(self.directory, chosen + suffix)
+                if suffix == CHECKPOINT_SUFFIX and os.path.exists(candidate) and TORCH.load() is None:
+                    continue  # torch is installed but fails to import
+                if os.path.exists(candidate):
+                    path = candidate
+                    break
+            if path is None:
+                raise FileNotFoundError(f"checkpoint not found: {chosen}")
+            if path.endswith(CHECKPOINT_SUFFIX):
+                model, chosen, featurizer = load_checkpoint(path)
+            else:
+                model = None
+                weights, chosen, featurizer = load_exported(path)
+        featurizer = featurizer or get_featurizer()
+        try:
+            backend = create_backend(self.backend_name, model, weights)
+        except RuntimeError:
+            # Untrained model without torch: nothing can serve real probabilities
+            backend = None
+        load_ms = (time.perf_counter() - started) * 1000
+        num_features = getattr(model, "input_dim", None) or getattr(backend, "input_dim", 8)
+        warmup_ms = warmup(model, num_features, backend) if (self.warm if warm is None else warm) else 0.0
+        return ModelHandle(model, chosen, path, featurizer=featurizer, load_ms=load_ms, warmup_ms=warmup_ms,
+                           backend=backend, weights=weights)
+
+    def _activate(self, handle: ModelHandle):
+        if self._on_activate is not None:
+            self._on_activate(handle)
+        self._active = handle
+        self.swaps += 1
+
+    def preload(self, version: str | None = None) -> ModelHandle:
+        """Load ``version`` without warming it up or activating it.
+
+        Used by the multi-worker launcher before forking: the weights end up in
+        pages every worker shares copy-on-write, and the first ``reload`` in each
+        worker adopts this handle instead of reading the checkpoint again. Warmup
+        is deferred because it starts native thread pools, which do not survive fork.
+        """
+        with self._load_lock:
+            self._preloaded = self._load(version, warm=False)
+            return self._preloaded
+
+    def _take_preloaded(self, version: str | None) -> ModelHandle | None:
+        handle, self._preloaded = self._preloaded, None
+        if handle is None or version not in (None, handle.version):
+            return None
+        if self.warm:
+            num_features = getattr(handle.model, "input_dim", None) or getattr(handle.backend, "input_dim", 8)
+            handle.warmup_ms = warmup(handle.model, num_features, handle.backend)
+        return handle
+
+    def reload(self, version: str | None = None) -> ModelHandle:
+        """Load ``version`` (default: newest checkpoint), warm it up, then swap it in."""
+        with self._load_lock:
+            try:
+                handle = self._take_preloaded(version) or self._load(version)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            self._activate(handle)
+            self.last_error = None
+            self._dir_signature = self._signature()
+            return handle
+
+    def _signature(self):
+        # With torch, only checkpoints trigger a swap: an export landing before its
+        # .pt would otherwise activate a handle that cannot explain requests
+        watched = (CHECKPOINT_SUFFIX,) if TORCH.available() else (WEIGHTS_SUFFIX,)
+        try:
+            return tuple(
+                (n, os.path.getmtime(os.path.join(self.directory, n)))
+                for n in sorted(os.listdir(self.directory)) if n.endswith(watched)
+            )
+        except OSError:
+            return None
+
+    def start_watcher(self, interval_s: float, pinned_version: str | None = None):
+        """Poll the checkpoint directory and hot-swap when its contents change."""
+        if interval_s <= 0 or self._watcher is not None:
+            return
+        self._dir_signature = self._signature()
+
+        def loop():
+            while not self._watch_stop.wait(interval_s):
+                signature = self._signature()
+                if signature == self._dir_signature:
+                    continue
+                self._dir_signature = signature
+                try:
+                    self.reload(pinned_version)
+                except Exception:
+                    pass
+
+        self._watcher = threading.Thread(target=loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._watch_stop.set()
+
+    def describe(self) -> Dict[str, Any]:
+        handle = self._active
+        return {
+            "ready": handle is not None,
+            "directory": self.directory,
+            "available": list_checkpoints(self.directory),
+            "active": handle.describe() if handle is not None else None,
+            "backend": self.backend_name or "auto",
+            "swaps": self.swaps,
+            "lastError": self.last_error,
+        }
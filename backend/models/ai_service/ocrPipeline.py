@@ -0,0 +1,310 @@
+# Page-streaming OCR pipeline for PDFs and images
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+try:
+    from backend.models.ai_service import settings
+    from backend.models.ai_service.ocrPreprocess import PIL_IMAGE, get_profile, preprocess
+    from backend.models.ai_service.deadlines import DeadlineExceeded, check_deadline, wait_timeout
+    from backend.models.instrumentation import record
+    from backend.models.optionalDeps import optional
+except Exception:
+    from . import settings
+    from .ocrPreprocess import PIL_IMAGE, get_profile, preprocess
+    from .deadlines import DeadlineExceeded, check_deadline, wait_timeout
+    from ..instrumentation import record
+    from ..optionalDeps import optional
+
+# Imported on first OCR call; the server process only needs them when extraction runs in-process
+PDF2IMAGE = optional("pdf2image")
+PYTESSERACT = optional("pytesseract")
+
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def ocr_available(images_only: bool = False) -> bool:
+    if images_only:
+        return PIL_IMAGE.available() and PYTESSERACT.available()
+    return PDF2IMAGE.available() and PYTESSERACT.available()
+
+
+def _init_ocr_worker():
+    # Pages are already OCR'd in parallel across processes; keep each tesseract run single-threaded
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def get_ocr_pool() -> ProcessPoolExecutor | None:
+    """Shared process pool for page OCR, sized by AI_OCR_WORKERS (defaults to this worker's CPU share)."""
+    global _POOL
+    if _POOL is not None:
+        return _POOL
+    with _POOL_LOCK:
+        if _POOL is None and settings.OCR_WORKERS > 1:
+            try:
+                ctx = multiprocessing.get_context(settings.OCR_MP_CONTEXT) if settings.OCR_MP_CONTEXT else None
+                _POOL = ProcessPoolExecutor(max_workers=settings.OCR_WORKERS, mp_context=ctx, initializer=_init_ocr_worker)
+            except Exception:
+                _POOL = None
+    return _POOL
+
+
+def shutdown_ocr_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+
+
+def pdf_page_count(path: str) -> int | None:
+    pdf2image = PDF2IMAGE.load()
+    if pdf2image is None:
+        return None
+    try:
+        return int(pdf2image.pdfinfo_from_path(path).get("Pages"))
+    except Exception:
+        return None
+
+
+def ocr_image(img, lang: str = "eng", profile: str | None = None, dpi: float | None = None) -> Dict[str, Any]:
+    """OCR one PIL image with a named profile (see ocrPreprocess) and return its per-page record.
+
+    ``dpi`` is the raster resolution, used to downscale to the profile's target.
+    """
+    chosen = get_profile(profile)
+    stages: Dict[str, float] = {}
+    if chosen.preprocess:
+        img, stages, _ = preprocess(img, chosen, dpi=dpi)
+    started = time.perf_counter()
+    try:
+        text = PYTESSERACT.load().image_to_string(img, lang=lang, config=chosen.tesseract_config()) or ""
+        error = None
+    except Exception as e:
+        text, error = "", str(e)
+    page = {"text": text.strip(), "ocrMs": round((time.perf_counter() - started) * 1000, 2), "profile": chosen.name}
+    if stages:
+        page["preprocessMs"] = stages
+    if error:
+        page["error"] = error
+    return page
+
+
+def _record_page(page: Dict[str, Any]):
+    # Pages may run in pool workers; feed their own timings to this process's histograms
+    if "rasterMs" in page:
+        record("ocr.rasterize_page", page["rasterMs"] / 1000)
+    record("ocr.tesseract_page", page.get("ocrMs", 0.0) / 1000)
+    for stage, ms in (page.get("preprocessMs") or {}).items():
+        record(f"ocr.preprocess.{stage}", ms / 1000)
+
+
+def _ocr_pdf_page(path: str, page_number: int, lang: str, dpi: int, profile: str | None = None) -> Dict[str, Any]:
+    """Rasterize a single PDF page and OCR it; runs inside a pool worker."""
+    started = time.perf_counter()
+    try:
+        # Preprocessing profiles work on grayscale; have poppler render it directly
+        images = PDF2IMAGE.load().convert_from_path(path, dpi=dpi, first_page=page_number, last_page=page_number,
+                                   grayscale=get_profile(profile).preprocess)
+    except Exception as e:
+        return {"page": page_number, "text": "", "rasterMs": 0.0, "ocrMs": 0.0, "error": str(e)}
+    raster_ms = round((time.perf_counter() - started) * 1000, 2)
+    texts = []
+    ocr_ms = 0.0
+    error = None
+    stages: Dict[str, float] = {}
+    for img in images:
+        rec = ocr_image(img, lang=lang, profile=profile, dpi=dpi)
+        texts.append(rec["text"])
+        ocr_ms += rec["ocrMs"]
+        error = error or rec.get("error")
+        for stage, ms in (rec.get("preprocessMs") or {}).items():
+            stages[stage] = round(stages.get(stage, 0.0) + ms, 3)
+        img.close()
+    page = {"page": page_number, "text": "\n".join(t for t in texts if t), "rasterMs": raster_ms, "ocrMs": round(ocr_ms, 2)}
+    if stages:
+        page["preprocessMs"] = stages
+    if error:
+        page["error"] = error
+    return page
+
+
+def ocr_pdf_path(
+    path: str,
+    lang: str = "eng",
+    dpi: int | None = None,
+    first_page: int | None = None,
+    last_page: int | None = None,
+    pages: List[int] | None = None,
+    profile: str | None = None,
+    on_page: Callable[[Dict[str, Any]], None] | None = None,
+) -> Dict[str, Any]:
+    """OCR a PDF on disk page by page, in parallel, and reassemble text in page order.
+
+    Pages are rasterized one at a time inside the workers, so at most one bitmap
+    per worker is alive. At most 2 x workers pages are in flight at once.
+    ``pages`` overrides the first/last range with an explicit list of page numbers.
+    ``profile`` names the preprocessing/tesseract profile (see ocrPreprocess).
+    ``on_page`` is called with each page record as it completes, in completion order.
+    Raises DeadlineExceeded, after cancelling queued pages, when the request
+    deadline passes. Returns ``{"text", "pages", "pageCount"}``.
+    """
+    if not ocr_available():
+        return {"text": "", "pages": [], "pageCount": None}
+    dpi = int(dpi or settings.OCR_DPI)
+    profile = get_profile(profile or settings.OCR_PROFILE).name
+    total = pdf_page_count(path)
+    if pages is None:
+        first = max(1, int(first_page or 1))
+        last = int(last_page or total or first)
+        if total:
+            last = min(last, total)
+        pages = list(range(first, last + 1))
+
+    pool = get_ocr_pool() if len(pages) > 1 else None
+    results: Dict[int, Dict[str, Any]] = {}
+    if pool is None:
+        for n in pages:
+            check_deadline("ocr")
+            results[n] = _ocr_pdf_page(path, n, lang, dpi, profile)
+            if on_page is not None:
+                on_page(results[n])
+    else:
+        window = max(1, settings.OCR_WORKERS * 2)
+        queue = list(pages)
+        in_flight = {}
+        while queue or in_flight:
+            while queue and len(in_flight) < window:
+                n = queue.pop(0)
+                in_flight[pool.submit(_ocr_pdf_page, path, n, lang, dpi, profile)] = n
+            done, _ = wait(in_flight, timeout=wait_timeout(), return_when=FIRST_COMPLETED)
+            if not done:
+                # Pages already running finish in their workers; the rest never start
+                for fut in in_flight:
+                    fut.cancel()
+                raise DeadlineExceeded("ocr")
+            for fut in done:
+                n = in_flight.pop(fut)
+                try:
+                    results[n] = fut.result()
+                except Exception as e:
+                    results[n] = {"page": n, "text": "", "rasterMs": 0.0, "ocrMs": 0.0, "error": str(e)}
+                if on_page is not None:
+                    on_page(results[n])
+
+    ordered = [results[n] for n in pages]
+    for p in ordered:
+        _record_page(p)
+    return {
+        "text": "\n\n".join(p["text"] for p in ordered if p.get("text")).strip(),
+        "pages": ordered,
+        "pageCount": total if total is not None else len(ordered),
+    }
+
+
+class OcrPageStream:
+    """OCR individual pages of one PDF as a caller discovers that they need it.
+
+    ``submit`` hands a page to the OCR pool right away, so rasterization and
+    tesseract overlap with whatever the caller does next (e.g. pdfminer parsing
+    later pages). ``results`` waits for everything submitted and returns page
+    records in page order. Without a pool, pages run in-process in ``results``.
+    ``source`` is a path or PDF bytes; bytes are spooled to a temp file on the
+    first submit only.
+    """
+
+    def __init__(self, source, lang: str = "eng", dpi: int | None = None, profile: str | None = None):
+        self._source = source
+        self._path = source if isinstance(source, str) else None
+        self._spooled = False
+        self.lang = lang
+        self.dpi = int(dpi or settings.OCR_DPI)
+        self.profile = get_profile(profile or settings.OCR_PROFILE).name
+        self._pending: Dict[int, Any] = {}
+
+    def _ensure_path(self) -> str:
+        if self._path is None:
+            fd, self._path = tempfile.mkstemp(suffix=".pdf")
+            self._spooled = True
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._source)
+        return self._path
+
+    def submit(self, page_number: int):
+        path = self._ensure_path()
+        pool = get_ocr_pool()
+        if pool is not None:
+            self._pending[page_number] = pool.submit(_ocr_pdf_page, path, page_number, self.lang, self.dpi, self.profile)
+        else:
+            self._pending[page_number] = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def results(self, on_page: Callable[[Dict[str, Any]], None] | None = None) -> List[Dict[str, Any]]:
+        ordered = []
+        for n in sorted(self._pending):
+            fut = self._pending[n]
+            check_deadline("ocr")
+            if fut is None:
+                page = _ocr_pdf_page(self._path, n, self.lang, self.dpi, self.profile)
+            else:
+                try:
+                    page = fut.result(timeout=wait_timeout())
+                except TimeoutError:
+                    raise DeadlineExceeded("ocr")  # close() cancels the pages not yet started
+                except Exception as e:
+                    page = {"page": n, "text": "", "rasterMs": 0.0, "ocrMs": 0.0, "error": str(e)}
+            _record_page(page)
+            if on_page is not None:
+                on_page(page)
+            ordered.append(page)
+        return ordered
+
+    def close(self):
+        for fut in self._pending.values():
+            if fut is not None:
+                fut.cancel()
+        if self._spooled:
+            try:
+                os.unlink(self._path)
+            except OSError:
+                pass
+            self._spooled = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ocr_pdf_bytes(content: bytes, **kwargs) -> Dict[str, Any]:
+    """Spool PDF bytes to a temp file once and OCR it with ``ocr_pdf_path``."""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        return ocr_pdf_path(path, **kwargs)
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def ocr_image_bytes(content, lang: str = "eng", profile: str | None = None) -> Dict[str, Any]:
+    """OCR a single uploaded image (bytes or a file path); returns the same shape as ``ocr_pdf_path``."""
+    if not ocr_available(images_only=True):
+        return {"text": "", "pages": [], "pageCount": None}
+    img = PIL_IMAGE.load().open(content if isinstance(content, (str, os.PathLike)) else io.BytesIO(content))
+    page = {"page": 1, **ocr_image(img, lang=lang, profile=profile or settings.OCR_PROFILE)}
+    _record_page(page)
+    return {"text": page["text"], "pages": [page], "pageCount": 1}
@@ -0,0 +1,222 @@
+# OCR image preprocessing (grayscale, crop, downscale, deskew, binarize) and tesseract profiles
+import time
+from typing import Any, Dict, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from backend.models.optionalDeps import optional
+except Exception:
+    from ..optionalDeps import optional
+
+PIL_IMAGE = optional("PIL", "PIL.Image")
+
+# Characters that appear in lab tables: analyte names, values, units, flags and reference ranges
+LAB_TABLE_CHARS = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    " .,:;/%()[]<>=+-*^#µ"
+)
+DIGIT_CHARS = "0123456789.,-<>/%"
+# A4 width in inches; used to estimate the DPI of uploads that carry no DPI metadata
+PAGE_WIDTH_IN = 8.27
+
+
+class OcrProfile:
+    """Named tesseract configuration plus the preprocessing applied before it.
+
+    ``psm``/``oem`` map to tesseract's page segmentation and engine modes;
+    ``whitelist`` restricts recognized characters. ``target_dpi`` caps the
+    resolution handed to tesseract: larger rasters are downscaled, since OCR
+    time grows with pixel count. The ``default`` profile reproduces the
+    historical behaviour (no preprocessing, tesseract defaults).
+    """
+
+    def __init__(self, name: str, psm: int | None = None, oem: int | None = None, whitelist: str | None = None,
+                 preserve_spaces: bool = False, preprocess: bool = True, target_dpi: int | None = 200,
+                 crop: bool = True, deskew: bool = True, binarize: bool = True, description: str = ""):
+        self.name = name
+        self.psm = psm
+        self.oem = oem
+        self.whitelist = whitelist
+        self.preserve_spaces = preserve_spaces
+        self.preprocess = preprocess
+        self.target_dpi = target_dpi
+        self.crop = crop
+        self.deskew = deskew
+        self.binarize = binarize
+        self.description = description
+
+    def tesseract_config(self) -> str:
+        parts = []
+        if self.psm is not None:
+            parts.append(f"--psm {self.psm}")
+        if self.oem is not None:
+            parts.append(f"--oem {self.oem}")
+        if self.preserve_spaces:
+            parts.append("-c preserve_interword_spaces=1")
+        if self.whitelist:
+            parts.append(f"-c tessedit_char_whitelist={self.whitelist.replace(' ', '')}")
+        return " ".join(parts)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "tesseractConfig": self.tesseract_config(),
+            "preprocess": self.preprocess,
+            "targetDpi": self.target_dpi if self.preprocess else None,
+        }
+
+
+PROFILES: Dict[str, OcrProfile] = {
+    p.name: p
+    for p in (
+        OcrProfile("default", preprocess=False, description="tesseract defaults on the raw raster"),
+        OcrProfile("document", psm=3, oem=1, target_dpi=200,
+                   description="cleaned-up page, automatic layout analysis"),
+        OcrProfile("fast", psm=6, oem=1, target_dpi=150, deskew=False,
+                   description="single text block at 150 DPI; for clean, straight scans"),
+        OcrProfile("lab_table", psm=6, oem=1, target_dpi=200, whitelist=LAB_TABLE_CHARS, preserve_spaces=True,
+                   description="tabular lab sheets: keeps column spacing, restricts to lab-report characters"),
+        OcrProfile("digits", psm=6, oem=1, target_dpi=200, whitelist=DIGIT_CHARS, preserve_spaces=True,
+                   description="numeric-only regions such as value columns"),
+    )
+}
+
+
+def get_profile(name: str | None) -> OcrProfile:
+    """Look up a profile by name (None: the ``default`` profile)."""
+    profile = PROFILES.get((name or "default").strip().lower())
+    if profile is None:
+        raise ValueError(f"unknown OCR profile: {name} (choose from {', '.join(PROFILES)})")
+    return profile
+
+
+def _resample(name: str):
+    image = PIL_IMAGE.load()
+    return getattr(getattr(image, "Resampling", image), name)
+
+
+def source_dpi(img, default: float | None = None) -> float:
+    """DPI from the image metadata, else ``default``, else estimated from an A4 page width."""
+    dpi = img.info.get("dpi")
+    if dpi:
+        try:
+            return float(dpi[0])
+        except (TypeError, ValueError, IndexError):
+            pass
+    return float(default or img.width / PAGE_WIDTH_IN)
+
+
+def to_grayscale(img):
+    return img if img.mode == "L" else img.convert("L")
+
+
+def crop_to_content(img, margin: int = 16, ink_threshold: int = 200):
+    """Crop a grayscale page to the bounding box of its ink plus ``margin`` pixels."""
+    box = img.point(lambda v: 255 if v < ink_threshold else 0).getbbox()
+    if box is None:
+        return img
+    x0, y0, x1, y1 = box
+    return img.crop((max(0, x0 - margin), max(0, y0 - margin), min(img.width, x1 + margin), min(img.height, y1 + margin)))
+
+
+def downscale(img, dpi: float, target_dpi: int | None) -> Tuple[Any, float]:
+    """Area-average ``img`` down to ``target_dpi``; never upscales. Returns ``(image, scale)``."""
+    if not target_dpi or dpi <= target_dpi * 1.05:
+        return img, 1.0
+    scale = target_dpi / dpi
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, _resample("BOX")), scale
+
+
+def otsu_threshold(img) -> int:
+    """Otsu's threshold from the 256-bin histogram of a grayscale image."""
+    hist = img.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0.0
+    best, best_var = 127, -1.0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best_var:
+            best, best_var = t, between
+    return best
+
+
+def binarize(img):
+    t = otsu_threshold(img)
+    return img.point(lambda v: 255 if v > t else 0)
+
+
+def estimate_skew(img, max_angle: float = 5.0, step: float = 0.25, probe_width: int = 600) -> float:
+    """Rotation (degrees, counter-clockwise) that best aligns text lines with the rows.
+
+    Projection-profile search on a small binarized copy: the angle whose row
+    ink profile has the highest variance wins. A 1-degree sweep is refined at
+    ``step`` around the best coarse angle. Needs NumPy; returns 0 without it.
+    """
+    if np is None:
+        return 0.0
+    probe = img
+    if img.width > probe_width:
+        probe = img.resize((probe_width, max(1, round(img.height * probe_width / img.width))), _resample("BOX"))
+    t = otsu_threshold(probe)
+    probe = probe.point(lambda v: 255 if v < t else 0)
+
+    def score(angle):
+        rotated = probe.rotate(angle, resample=_resample("NEAREST"), expand=True, fillcolor=0)
+        return float(np.asarray(rotated, dtype=np.float32).sum(axis=1).var())
+
+    coarse = max((float(a) for a in range(-int(max_angle), int(max_angle) + 1)), key=score)
+    fine = [coarse + k * step for k in range(-int(1 / step) + 1, int(1 / step))]
+    return max((a for a in fine if abs(a) <= max_angle), key=score)
+
+
+def deskew(img, max_angle: float = 5.0, min_angle: float = 0.2) -> Tuple[Any, float]:
+    angle = estimate_skew(img, max_angle=max_angle)
+    if abs(angle) < min_angle:
+        return img, 0.0
+    return img.rotate(angle, resample=_resample("BILINEAR"), expand=True, fillcolor=255), angle
+
+
+def preprocess(img, profile: OcrProfile, dpi: float | None = None) -> Tuple[Any, Dict[str, float], Dict[str, Any]]:
+    """Run the profile's preprocessing stages on a PIL image.
+
+    Stages run cheapest-first on the fewest pixels: grayscale, crop to content,
+    downscale to ``target_dpi``, deskew, binarize. Returns
+    ``(image, stage_timings_ms, info)``.
+    """
+    timings: Dict[str, float] = {}
+    info: Dict[str, Any] = {"inputSize": [img.width, img.height]}
+    dpi = source_dpi(img, dpi)
+
+    def timed(stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        out = fn(*args, **kwargs)
+        timings[stage] = round((time.perf_counter() - started) * 1000, 3)
+        return out
+
+    img = timed("grayscale", to_grayscale, img)
+    if profile.crop:
+        img = timed("crop", crop_to_content, img, margin=max(4, round(dpi / 12)))
+    img, scale = timed("downscale", downscale, img, dpi, profile.target_dpi)
+    if profile.deskew:
+        img, angle = timed("deskew", deskew, img)
+        info["skewDeg"] = angle
+    if profile.binarize:
+        img = timed("binarize", binarize, img)
+    info.update(outputSize=[img.width, img.height], sourceDpi=round(dpi, 1), scale=round(scale, 4))
+    return img, timings, info
@@ -0,0 +1,259 @@
+# Pooled, size-limited, conditional-request fetcher for report URLs
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict
+
+try:
+    from backend.models.ai_service import settings
+    from backend.models.optionalDeps import optional
+except Exception:
+    from . import settings
+    from ..optionalDeps import optional
+
+# Imported when the first fetcher is built
+REQUESTS = optional("requests")
+
+
+class FetchTooLarge(Exception):
+    pass
+
+
+class FetchResult:
+    """A fetched document on disk plus how it was obtained.
+
+    ``path`` belongs to this result alone until ``PdfFetcher.release``; cache
+    evictions and later fetches of the same URL never touch it.
+    ``hasher`` is a SHA-256 of the body for the extraction cache key;
+    ``revalidated`` is True when the server answered 304 and the local copy was reused.
+    """
+
+    def __init__(self, path: str, size: int, hasher, status: int, revalidated: bool, fetch_ms: float):
+        self.path = path
+        self.size = size
+        self.hasher = hasher
+        self.status = status
+        self.revalidated = revalidated
+        self.fetch_ms = fetch_ms
+
+
+class PdfFetcher:
+    """Fetch report URLs through one pooled ``requests.Session``.
+
+    Bodies are streamed to files under ``cache_dir`` with a hard ``max_bytes``
+    limit. The last ``max_entries`` URLs keep their ETag/Last-Modified
+    validators and body on disk, so repeat fetches send a conditional request
+    and reuse the local copy on 304.
+
+    Every result gets its own hard link (a copy where links are unsupported) to
+    the body, so replacing or evicting a cache entry only removes the cache's
+    link. Each process keeps its entries in a ``<pid>`` subdirectory of
+    ``cache_dir``, cleared at startup along with those of exited processes.
+    """
+
+    def __init__(self, session=None, max_bytes: int = 50 << 20, timeout_s: float = 15.0,
+                 pool_size: int = 16, cache_dir: str | None = None, max_entries: int = 128):
+        if session is None:
+            requests = REQUESTS.load()
+            if requests is None:
+                raise RuntimeError("requests is required to fetch reports")
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.max_bytes = int(max_bytes)
+        self.timeout_s = float(timeout_s)
+        base_dir = cache_dir or os.path.join(tempfile.gettempdir(), "evolveai-fetch-cache")
+        self.cache_dir = os.path.join(base_dir, str(os.getpid()))
+        self.max_entries = max(1, int(max_entries))
+        _sweep(base_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.revalidated = 0
+        self.downloaded_bytes = 0
+
+    def _new_path(self) -> str:
+        return os.path.join(self.cache_dir, uuid.uuid4().hex + ".bin")
+
+    def _link(self, src: str) -> str:
+        dst = self._new_path()
+        try:
+            os.link(src, dst)
+        except FileNotFoundError:
+            raise
+        except OSError:  # e.g. a filesystem without hard links
+            shutil.copyfile(src, dst)
+        return dst
+
+    def fetch(self, url: str, timeout_s: float | None = None) -> FetchResult:
+        """Download ``url`` (or revalidate the cached copy); ``timeout_s`` overrides the connect/read timeout."""
+        started = time.perf_counter()
+        # Take this request's own link to the cached body before revalidating, so the bytes
+        # returned on 304 are the ones the validators describe even if the entry changes meanwhile
+        private = None
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                try:
+                    private = self._link(entry["path"])
+                except OSError:
+                    self._entries.pop(url, None)
+                    entry = None
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            result = self._get(url, headers, entry, private, started, timeout_s)
+        except BaseException:
+            _unlink(private)
+            raise
+        if result.path != private:
+            _unlink(private)
+        return result
+
+    def _get(self, url, headers, entry, private, started, timeout_s) -> FetchResult:
+        with self.session.get(url, headers=headers, stream=True,
+                              timeout=self.timeout_s if timeout_s is None else timeout_s) as r:
+            with self._lock:
+                self.requests += 1
+            if r.status_code == 304 and entry is not None:
+                with self._lock:
+                    self.revalidated += 1
+                    if url in self._entries:
+                        self._entries.move_to_end(url)
+                return FetchResult(private, entry["size"], entry["hasher"].copy(), 304, True,
+                                   round((time.perf_counter() - started) * 1000, 2))
+            r.raise_for_status()
+            declared = r.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise FetchTooLarge(f"document exceeds {self.max_bytes} bytes")
+
+            hasher = hashlib.sha256()
+            size = 0
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=1 << 16):
+                        if not chunk:
+                            continue
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise FetchTooLarge(f"document exceeds {self.max_bytes} bytes")
+                        f.write(chunk)
+                        hasher.update(chunk)
+            except BaseException:
+                _unlink(tmp)
+                raise
+            etag = r.headers.get("ETag")
+            last_modified = r.headers.get("Last-Modified")
+            status = r.status_code
+
+        # The request keeps ``tmp``; a cacheable body also gets a separate link owned by the cache
+        cached = None
+        if etag or last_modified:
+            try:
+                cached = self._link(tmp)
+            except OSError:
+                cached = None
+        stale = []
+        with self._lock:
+            self.downloaded_bytes += size
+            old = self._entries.pop(url, None)
+            if old is not None:
+                stale.append(old["path"])
+            if cached is not None:
+                self._entries[url] = {
+                    "path": cached, "size": size, "hasher": hasher.copy(),
+                    "etag": etag, "last_modified": last_modified,
+                }
+                while len(self._entries) > self.max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    stale.append(evicted["path"])
+        for path in stale:
+            _unlink(path)
+        return FetchResult(tmp, size, hasher, status, False, round((time.perf_counter() - started) * 1000, 2))
+
+    def release(self, result: FetchResult, url: str | None = None):
+        """Delete this result's copy of the body; the cached copy, if any, is unaffected."""
+        _unlink(result.path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "revalidated": self.revalidated,
+                "downloadedBytes": self.downloaded_bytes,
+                "cachedUrls": len(self._entries),
+                "maxBytes": self.max_bytes,
+            }
+
+
+def _unlink(path: str | None):
+    if path is None:
+        return
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by another user
+    return True
+
+
+def _sweep(base_dir: str):
+    """Remove this process's leftover directory (a reused pid) and those of processes that have exited."""
+    try:
+        names = os.listdir(base_dir)
+    except OSError:
+        return
+    for name in names:
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        if pid == os.getpid() or not _pid_alive(pid):
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+
+
+_FETCHER: PdfFetcher | None = None
+_FETCHER_LOCK = threading.Lock()
+
+
+def get_fetcher() -> PdfFetcher | None:
+    global _FETCHER
+    if _FETCHER is None and REQUESTS.available() and REQUESTS.load() is not None:
+        with _FETCHER_LOCK:
+            if _FETCHER is None:
+                _FETCHER = PdfFetcher(
+                    max_bytes=settings.FETCH_MAX_BYTES,
+                    timeout_s=settings.FETCH_TIMEOUT_S,
+                    pool_size=settings.FETCH_POOL_SIZE,
+                    cache_dir=settings.FETCH_CACHE_DIR,
+                    max_entries=settings.FETCH_CACHE_ENTRIES,
+                )
+    return _FETCHER
+
+
+def active_fetcher() -> PdfFetcher | None:
+    """The fetcher if one has been built, without building it (and importing requests) for health and metrics."""
+    return _FETCHER
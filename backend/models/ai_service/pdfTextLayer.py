@@ -0,0 +1,104 @@
+# Per-page pdfminer text extraction with a text-density test for which pages need OCR
+import io
+import sys
+from typing import Any, Dict, Iterator
+
+try:
+    from backend.models.ai_service import settings
+    from backend.models.optionalDeps import optional
+except Exception:
+    from . import settings
+    from ..optionalDeps import optional
+
+POINTS_PER_INCH = 72.0
+# Imported on the first parse; pdfminer.high_level loads pdfminer.layout with it
+PDFMINER = optional("pdfminer", "pdfminer.high_level")
+
+
+def text_layer_available() -> bool:
+    return PDFMINER.available()
+
+
+def _walk(layout, texts, image_boxes):
+    from pdfminer.layout import LTFigure, LTImage, LTTextContainer
+
+    for element in layout:
+        if isinstance(element, LTTextContainer):
+            texts.append(element.get_text())
+        elif isinstance(element, (LTImage, LTFigure)):
+            image_boxes.append(element.bbox)
+
+
+def _coverage(boxes, page_bbox) -> float:
+    """Fraction of the page covered by image/figure boxes, clipped to the page and capped at 1."""
+    x0, y0, x1, y1 = page_bbox
+    area = max((x1 - x0) * (y1 - y0), 1e-9)
+    covered = 0.0
+    for bx0, by0, bx1, by1 in boxes:
+        w = min(bx1, x1) - max(bx0, x0)
+        h = min(by1, y1) - max(by0, y0)
+        if w > 0 and h > 0:
+            covered += w * h
+    return min(1.0, covered / area)
+
+
+def page_needs_ocr(chars: int, density: float, image_coverage: float) -> bool:
+    """Text-layer density test for one page.
+
+    A page is OCR'd when its text layer is sparse (fewer than
+    AI_OCR_PAGE_MIN_DENSITY non-space characters per square inch), or when
+    images cover most of it and it carries fewer than AI_OCR_IMAGE_PAGE_MIN_CHARS
+    characters. The second case catches scans whose only text layer is a
+    stamp, fax header or page number.
+    """
+    if density < settings.OCR_PAGE_MIN_DENSITY:
+        return True
+    return image_coverage >= settings.OCR_PAGE_IMAGE_COVERAGE and chars < settings.OCR_IMAGE_PAGE_MIN_CHARS
+
+
+def text_page_count(source) -> int | None:
+    """Page count from the PDF page tree, without laying out any page; None when it cannot be read."""
+    if PDFMINER.load() is None:
+        return None
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    try:
+        with (open(source, "rb") if isinstance(source, str) else io.BytesIO(source)) as fp:
+            return sum(1 for _ in PDFPage.create_pages(PDFDocument(PDFParser(fp))))
+    except Exception:
+        return None
+
+
+def iter_text_pages(source, first_page: int | None = None, last_page: int | None = None) -> Iterator[Dict[str, Any]]:
+    """Yield one record per PDF page, in order, as pdfminer finishes laying it out.
+
+    ``source`` is a path or the document bytes. Each record is
+    ``{"page", "text", "chars", "density", "imageCoverage", "needsOcr"}``, so
+    callers can start OCR on a page while later pages are still being parsed.
+    """
+    high_level = PDFMINER.load()
+    if high_level is None:
+        raise RuntimeError(f"pdfminer is not available: {PDFMINER.error or 'not installed'}")
+    first = max(1, int(first_page or 1))
+    last = int(last_page) if last_page else None
+    pages = range(first - 1, last if last else sys.maxsize)
+    fp = source if isinstance(source, str) else io.BytesIO(source)
+    for offset, layout in enumerate(high_level.extract_pages(fp, page_numbers=pages, maxpages=last or 0)):
+        texts, image_boxes = [], []
+        _walk(layout, texts, image_boxes)
+        text = "".join(texts).strip()
+        chars = sum(1 for c in text if not c.isspace())
+        x0, y0, x1, y1 = layout.bbox
+        area_in2 = max(abs((x1 - x0) * (y1 - y0)) / (POINTS_PER_INCH * POINTS_PER_INCH), 1e-6)
+        density = chars / area_in2
+        coverage = _coverage(image_boxes, layout.bbox)
+        yield {
+            "page": first + offset,
+            "text": text,
+            "chars": chars,
+            "density": round(density, 3),
+            "imageCoverage": round(coverage, 3),
+            "needsOcr": page_needs_ocr(chars, density, coverage),
+        }
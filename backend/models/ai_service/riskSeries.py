@@ -0,0 +1,126 @@
+# Memoized per-check-in risk scores and vectorized trend features for /risk_series
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Payload fields that feed the score; anything else (date, answers) does not invalidate it
+SCORED_FIELDS = ("notes", "vitals", "labs")
+
+
+def checkin_fingerprint(checkin: Dict[str, Any]) -> str:
+    """Short digest of the scored fields, so an edited check-in is rescored under the same ID."""
+    body = json.dumps({k: checkin.get(k) for k in SCORED_FIELDS}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(body.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class RiskScoreCache:
+    """Thread-safe LRU of per-check-in risk scores.
+
+    Keys are ``(model hash, featurizer version, check-in ID, fingerprint)``.
+    Past check-ins do not change, so a dashboard refresh only scores the
+    check-ins added since the last view. A model swap changes the hash, which
+    keeps old scores from being served; ``invalidate`` drops them eagerly.
+    """
+
+    def __init__(self, max_size: int = 100_000, enabled: bool = True):
+        self.max_size = max(1, int(max_size))
+        self.enabled = bool(enabled)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(model_hash: str, featurizer_version: str, checkin_id: str, fingerprint: str) -> Tuple:
+        return (model_hash, featurizer_version, str(checkin_id), fingerprint)
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Any]:
+        """Look up all keys under one lock acquisition; misses are None."""
+        if not self.enabled:
+            return [None] * len(keys)
+        out: List[Any] = []
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key)
+                if value is None:
+                    self.misses += 1
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                out.append(value)
+        return out
+
+    def set_many(self, items: Sequence[Tuple[Hashable, Any]]):
+        if not self.enabled:
+            return
+        with self._lock:
+            for key, value in items:
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_hash: str | None = None):
+        """Drop all entries, or only those scored by ``model_hash``."""
+        with self._lock:
+            if model_hash is None:
+                self._data.clear()
+            else:
+                for key in [k for k in self._data if k[0] == model_hash]:
+                    del self._data[key]
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxSize": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def rolling_trends(points: Sequence[float], windows: Sequence[int] = (3, 7)) -> Dict[str, Any]:
+    """Trend features over a chronological score series, computed with array ops.
+
+    - ``delta``: change from the previous point (0 for the first)
+    - ``movingAverages``: trailing mean per window; the first ``w - 1`` points
+      average over what is available
+    - ``slope``: least-squares slope per step over the last ``max(windows)`` points
+    """
+    windows = sorted({int(w) for w in windows if int(w) > 0})
+    n = len(points)
+    if n == 0:
+        return {"delta": [], "movingAverages": {str(w): [] for w in windows}, "slope": 0.0}
+    y = np.asarray(points, dtype=np.float64)
+    delta = np.diff(y, prepend=y[0])
+    # One cumulative sum serves every window: mean = (c[i] - c[i - w]) / min(i + 1, w)
+    csum = np.concatenate(([0.0], np.cumsum(y)))
+    idx = np.arange(1, n + 1)
+    moving = {}
+    for w in windows:
+        lo = np.maximum(idx - w, 0)
+        moving[str(w)] = ((csum[idx] - csum[lo]) / (idx - lo)).round(6).tolist()
+    tail = y[-max(windows or [n]):]
+    if len(tail) > 1:
+        t = np.arange(len(tail), dtype=np.float64)
+        t -= t.mean()
+        slope = float((t * (tail - tail.mean())).sum() / (t * t).sum())
+    else:
+        slope = 0.0
+    return {"delta": delta.round(6).tolist(), "movingAverages": moving, "slope": round(slope, 6)}
@@ -0,0 +1,64 @@
+# CPU thread budgeting and the effective-configuration report for service processes
+import os
+import platform
+from typing import Any, Dict
+
+try:  # optional: caps BLAS pools when the env vars were not set before numpy loaded
+    from threadpoolctl import threadpool_limits
+except Exception:
+    threadpool_limits = None
+
+try:
+    from backend.models.ai_service import settings
+    from backend.models.ai_service.settings import THREAD_ENV_VARS
+    from backend.models.optionalDeps import optional
+except Exception:
+    from . import settings
+    from .settings import THREAD_ENV_VARS
+    from ..optionalDeps import optional
+
+TORCH = optional("torch")
+
+
+def _size_torch_pools(torch):
+    torch.set_num_threads(settings.INFERENCE_THREADS)
+    try:
+        # Inference runs one batch at a time under the model lock; inter-op parallelism only oversubscribes
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set, or inter-op work has started in this process
+
+
+def apply_thread_budget():
+    """Size this process's BLAS thread pools from AI_INFERENCE_THREADS, and torch's once it is imported."""
+    TORCH.on_load(_size_torch_pools)
+    if threadpool_limits is not None:
+        threadpool_limits(limits=settings.INFERENCE_THREADS)
+
+
+def config_report(**extra) -> Dict[str, Any]:
+    """Effective CPU, thread and worker configuration of this process."""
+    torch = TORCH.load() if TORCH.loaded else None  # reported, never imported, from here
+    report = {
+        "pid": os.getpid(),
+        "python": platform.python_version(),
+        "cpuCount": os.cpu_count(),
+        "cpuBudget": settings.CPU_BUDGET,
+        "workers": settings.WORKERS,
+        "workerCpuShare": settings.WORKER_CPU_SHARE,
+        "inferenceThreads": settings.INFERENCE_THREADS,
+        "torchThreads": torch.get_num_threads() if torch is not None else None,
+        "torchInteropThreads": torch.get_num_interop_threads() if torch is not None else None,
+        "ocrWorkers": settings.OCR_WORKERS,
+        "extractWorkers": settings.EXTRACT_WORKERS,
+        "inferencePoolThreads": settings.INFERENCE_POOL_THREADS,
+        # Extraction processes OCR in-process when the OCR budget leaves them no pool of their own
+        "plannedCpuThreads": settings.WORKERS * (settings.INFERENCE_THREADS + max(settings.OCR_WORKERS, settings.EXTRACT_WORKERS)),
+        "threadEnv": {name: os.environ.get(name) for name in THREAD_ENV_VARS},
+        "preload": settings.PRELOAD,
+        "inferenceBackend": settings.INFERENCE_BACKEND,
+        "modelDir": settings.MODEL_DIR,
+        "modelVersion": settings.MODEL_VERSION,
+    }
+    report.update(extra)
+    return report
@@ -0,0 +1,124 @@
+# Multi-worker launcher: python -m backend.models.ai_service.serve --workers 4
+#
+# The parent sets the thread budget, imports the service and preloads model
+# weights (importing torch and captum for a .pt checkpoint), featurizer and
+# red-flag rules. It then binds the listening socket and forks the workers.
+# Workers share that state copy-on-write instead of each importing and loading
+# their own copy. Each worker runs its own warmup, because native thread pools
+# do not survive fork.
+import argparse
+import gc
+import json
+import os
+import signal
+import sys
+import time
+
+# A worker that dies sooner than this after starting is respawned after a pause, not in a tight loop
+RESPAWN_BACKOFF_S = 1.0
+
+
+def _run_server(config, sockets=None):
+    import uvicorn
+
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def _supervise(config, sock, workers: int) -> int:
+    """Fork ``workers`` servers on the shared socket and respawn any that die until signalled."""
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_server(config, sockets=[sock])
+            except BaseException:
+                code = 1
+            os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, _status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        if time.monotonic() - started < RESPAWN_BACKOFF_S:
+            time.sleep(RESPAWN_BACKOFF_S)
+        spawn()
+    sock.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the AI service with N pre-forked workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, help="server processes (AI_WORKERS, default 1)")
+    parser.add_argument("--cpu-budget", type=int, help="cores shared by all workers (AI_CPU_BUDGET, default: all)")
+    parser.add_argument("--no-preload", action="store_true", help="let each worker load the model itself")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Settings and native thread pools read the environment at import time, so set it first
+    if args.workers:
+        os.environ["AI_WORKERS"] = str(args.workers)
+    if args.cpu_budget:
+        os.environ["AI_CPU_BUDGET"] = str(args.cpu_budget)
+    if args.no_preload:
+        os.environ["AI_PRELOAD"] = "0"
+    from backend.models.ai_service import settings
+
+    for name, value in settings.thread_env().items():
+        os.environ.setdefault(name, value)
+
+    # Import the service module by module so the startup report shows where cold-start time goes
+    from backend.models.ai_service.startup import profile_imports, startup_report
+
+    profile_imports()
+    import uvicorn
+    from backend.models.ai_service import main as service
+    from backend.models.ai_service.runtime import config_report
+
+    preload_ms = None
+    if settings.PRELOAD:
+        started = time.perf_counter()
+        service.preload()
+        preload_ms = round((time.perf_counter() - started) * 1000, 2)
+    fork = settings.WORKERS > 1 and hasattr(os, "fork")
+    report = config_report(preloadMs=preload_ms, forked=fork, **startup_report())
+    print(json.dumps({"startup": report}), file=sys.stderr, flush=True)
+
+    config = uvicorn.Config(service.app, host=args.host, port=args.port, log_level=args.log_level)
+    if not fork:
+        _run_server(config)
+        return 0
+    sock = config.bind_socket()
+    # Move everything loaded so far out of the collector's reach so GC passes don't dirty shared pages
+    gc.collect()
+    gc.freeze()
+    return _supervise(config, sock, settings.WORKERS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
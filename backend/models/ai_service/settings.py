@@ -0,0 +1,145 @@
+# Environment-driven settings for the Python AI service
+import os
+
+
+def env_bool(name: str, default: bool) -> bool:
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_str(name: str, default: str | None = None) -> str | None:
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip()
+
+
+def env_list(name: str, default: str = "") -> tuple:
+    """Comma-separated names; an explicitly empty variable yields an empty tuple."""
+    raw = os.environ.get(name, default)
+    return tuple(part.strip() for part in raw.split(",") if part.strip())
+
+
+# Dynamic micro-batching in front of DiagnosisModel inference
+BATCHING_ENABLED = env_bool("AI_BATCHING_ENABLED", True)
+BATCH_MAX_SIZE = env_int("AI_BATCH_MAX_SIZE", 32)
+BATCH_MAX_WAIT_US = env_int("AI_BATCH_MAX_WAIT_US", 2000)
+
+# Attribution (explainability) result cache
+EXPLAIN_CACHE_ENABLED = env_bool("AI_EXPLAIN_CACHE_ENABLED", True)
+EXPLAIN_CACHE_SIZE = env_int("AI_EXPLAIN_CACHE_SIZE", 4096)
+EXPLAIN_CACHE_TTL_S = env_float("AI_EXPLAIN_CACHE_TTL_S", 3600.0)
+EXPLAIN_CACHE_DECIMALS = env_int("AI_EXPLAIN_CACHE_DECIMALS", 3)
+
+# CPU budget split between server workers, per-worker inference threads and OCR processes
+CPU_BUDGET = max(1, env_int("AI_CPU_BUDGET", os.cpu_count() or 1))
+WORKERS = max(1, env_int("AI_WORKERS", 1))
+WORKER_CPU_SHARE = max(1, CPU_BUDGET // WORKERS)
+INFERENCE_THREADS = max(1, env_int("AI_INFERENCE_THREADS", WORKER_CPU_SHARE // 2))
+PRELOAD = env_bool("AI_PRELOAD", True)  # multi-worker launcher: load model state once, before forking
+# Optional dependencies are imported on first use; these are imported at startup instead (see optionalDeps.py)
+# Server process: empty by default, since torch and captum come with a .pt model (see main.preload) and NumPy-only
+# serving needs neither
+PRELOAD_IMPORTS = env_list("AI_PRELOAD_IMPORTS", "")
+EXTRACT_PRELOAD_IMPORTS = env_list("AI_EXTRACT_PRELOAD_IMPORTS", "pdfminer,pdf2image,pytesseract,PIL")  # extraction workers
+
+# Native pools read these once, when their library loads; serve.py exports them before importing numpy/torch
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def thread_env(inference_threads: int | None = None) -> dict:
+    """Environment that pins OpenMP/BLAS pools to the per-worker inference thread count."""
+    n = str(inference_threads or INFERENCE_THREADS)
+    return {name: n for name in THREAD_ENV_VARS}
+
+# OCR pipeline (pdf2image rasterization + tesseract)
+OCR_WORKERS = env_int("AI_OCR_WORKERS", max(1, WORKER_CPU_SHARE - INFERENCE_THREADS))
+OCR_DPI = env_int("AI_OCR_DPI", 200)
+OCR_MP_CONTEXT = env_str("AI_OCR_MP_CONTEXT", "spawn")
+OCR_PROFILE = env_str("AI_OCR_PROFILE", "default")  # preprocessing + tesseract profile, see ocrPreprocess.PROFILES
+# Auto mode OCRs only the PDF pages whose text layer fails the density test (pdfTextLayer.page_needs_ocr)
+OCR_PAGE_MIN_DENSITY = env_float("AI_OCR_PAGE_MIN_DENSITY", 1.0)  # non-space chars per square inch
+OCR_PAGE_IMAGE_COVERAGE = env_float("AI_OCR_PAGE_IMAGE_COVERAGE", 0.5)  # page fraction covered by images
+OCR_IMAGE_PAGE_MIN_CHARS = env_int("AI_OCR_IMAGE_PAGE_MIN_CHARS", 200)
+
+# Content-addressed cache for OCR/pdfminer extraction results
+EXTRACT_CACHE_ENABLED = env_bool("AI_EXTRACT_CACHE_ENABLED", True)
+EXTRACT_CACHE_SIZE = env_int("AI_EXTRACT_CACHE_SIZE", 256)
+EXTRACT_CACHE_DIR = env_str("AI_EXTRACT_CACHE_DIR")  # unset: memory tier only
+EXTRACT_CACHE_DISK_MAX_MB = env_float("AI_EXTRACT_CACHE_DISK_MAX_MB", 512.0)
+
+# Upload ingestion limits
+UPLOAD_MAX_MB = env_float("AI_UPLOAD_MAX_MB", 50.0)
+UPLOAD_MAX_BYTES = int(UPLOAD_MAX_MB * 1024 * 1024)
+
+# Report fetching for /extract_from_pdf
+FETCH_TIMEOUT_S = env_float("AI_FETCH_TIMEOUT_S", 15.0)
+FETCH_POOL_SIZE = env_int("AI_FETCH_POOL_SIZE", 16)
+FETCH_MAX_BYTES = int(env_float("AI_FETCH_MAX_MB", UPLOAD_MAX_MB) * 1024 * 1024)
+FETCH_CACHE_DIR = env_str("AI_FETCH_CACHE_DIR")  # unset: a directory under the system temp dir
+FETCH_CACHE_ENTRIES = env_int("AI_FETCH_CACHE_ENTRIES", 128)
+
+# Per-check-in risk scores for /risk_series, keyed by check-in ID and model version
+RISK_CACHE_ENABLED = env_bool("AI_RISK_CACHE_ENABLED", True)
+RISK_CACHE_SIZE = env_int("AI_RISK_CACHE_SIZE", 100_000)
+
+# Model registry: versioned checkpoints, warmup and hot-swap
+MODEL_DIR = env_str(
+    "AI_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "checkpoints"),
+)
+MODEL_VERSION = env_str("AI_MODEL_VERSION")  # unset: newest checkpoint in MODEL_DIR
+MODEL_WATCH_INTERVAL_S = env_float("AI_MODEL_WATCH_INTERVAL_S", 0.0)  # 0 disables the file watcher
+MODEL_WARMUP = env_bool("AI_MODEL_WARMUP", True)
+# Instrumentation: per-stage histograms at /metrics; per-response stage breakdowns
+METRICS_ENABLED = env_bool("AI_METRICS_ENABLED", True)
+DEBUG_TIMINGS = env_bool("AI_DEBUG_TIMINGS", False)  # also per request via the X-Debug-Timings: 1 header
+
+# auto | eager | torchscript | numpy; torch backends fall back to numpy when torch is missing
+INFERENCE_BACKEND = env_str("AI_INFERENCE_BACKEND", "auto")
+ADMIN_TOKEN = env_str("AI_ADMIN_TOKEN")  # unset: admin endpoints are disabled
+
+# Workload isolation: extraction runs in its own process pool, inference requests in their own thread pool
+EXTRACT_WORKERS = env_int("AI_EXTRACT_WORKERS", 2)  # extraction processes per server worker; 0: run in-process
+EXTRACT_POOL_QUEUE = env_int("AI_EXTRACT_POOL_QUEUE", 32)  # documents waiting for an extraction process
+INFERENCE_POOL_THREADS = env_int("AI_INFERENCE_POOL_THREADS", BATCH_MAX_SIZE)  # at least the batch size, so batches fill
+INFERENCE_POOL_QUEUE = env_int("AI_INFERENCE_POOL_QUEUE", 1024)
+
+# Request deadlines (X-Request-Timeout-Ms / X-Request-Deadline headers) and per-endpoint admission control
+REQUEST_TIMEOUT_S = env_float("AI_REQUEST_TIMEOUT_S", 0.0)  # deadline for requests without a header; 0: none
+ADMISSION_ENABLED = env_bool("AI_ADMISSION_ENABLED", True)
+ANALYZE_MAX_CONCURRENCY = env_int("AI_ANALYZE_MAX_CONCURRENCY", 64)  # /analyze, /analyze_batch, /risk_series
+ANALYZE_MAX_QUEUE = env_int("AI_ANALYZE_MAX_QUEUE", 256)
+EXTRACT_MAX_CONCURRENCY = env_int("AI_EXTRACT_MAX_CONCURRENCY", max(2, OCR_WORKERS))  # /extract_*
+EXTRACT_MAX_QUEUE = env_int("AI_EXTRACT_MAX_QUEUE", 16)
+# Explanations on a short remaining budget: below DEGRADE, skip SHAP and run IG with fewer steps; below MIN, skip
+EXPLAIN_DEGRADE_BUDGET_MS = env_float("AI_EXPLAIN_DEGRADE_BUDGET_MS", 500.0)
+EXPLAIN_MIN_BUDGET_MS = env_float("AI_EXPLAIN_MIN_BUDGET_MS", 50.0)
+EXPLAIN_DEGRADED_IG_STEPS = env_int("AI_EXPLAIN_DEGRADED_IG_STEPS", 8)
+
+# Background extraction jobs (/jobs/*): a SQLite queue shared by the server workers, run on the extraction pool
+JOBS_ENABLED = env_bool("AI_JOBS_ENABLED", True)
+JOBS_DIR = env_str("AI_JOBS_DIR")  # database and pending uploads; unset: a directory under the system temp dir
+JOBS_CONCURRENCY = env_int("AI_JOBS_CONCURRENCY", 1)  # jobs running at once per server worker
+JOBS_MAX_QUEUED = env_int("AI_JOBS_MAX_QUEUED", 1000)  # submissions beyond this are rejected with 429
+JOBS_MAX_ATTEMPTS = env_int("AI_JOBS_MAX_ATTEMPTS", 3)
+JOBS_TIMEOUT_S = env_float("AI_JOBS_TIMEOUT_S", 0.0)  # deadline per job attempt; 0: none
+JOBS_POLL_S = env_float("AI_JOBS_POLL_S", 1.0)
+JOBS_LEASE_S = env_float("AI_JOBS_LEASE_S", 30.0)  # running jobs not renewed for this long are requeued
+JOBS_RETENTION_S = env_float("AI_JOBS_RETENTION_S", 7 * 24 * 3600.0)  # finished jobs kept this long
@@ -0,0 +1,93 @@
+# Cold-start profile: import cost per module of the AI service, in import order
+#
+#   python -m backend.models.ai_service.startup [--budget-ms 4000]
+#
+# Run it in a fresh interpreter. It prints the breakdown as JSON and exits 1
+# when the total exceeds --budget-ms, so CI can catch cold-start regressions.
+import argparse
+import importlib
+import json
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+try:
+    from backend.models.optionalDeps import capabilities
+except Exception:
+    from ..optionalDeps import capabilities
+
+# Roughly the order main.py pulls them in; each row only pays for modules not imported by earlier rows
+SERVICE_IMPORTS = (
+    "numpy",
+    "pydantic",
+    "fastapi",
+    "backend.models.instrumentation",
+    "backend.models.diagnosisModel",
+    "backend.models.explainabilityUtils",
+    "backend.models.redFlagModel",
+    "backend.models.ai_service.extraction",
+    "backend.models.ai_service.main",
+)
+
+_LAST_PROFILE: List[Dict[str, Any]] = []
+
+
+def profile_imports(modules: Sequence[str] = SERVICE_IMPORTS) -> List[Dict[str, Any]]:
+    """Import ``modules`` in order and time each one.
+
+    Each row records ``ms`` and ``newModules``, the number of modules that
+    import added to ``sys.modules``. Modules that were already imported are
+    marked ``cached``. A failed import is recorded and does not stop the run.
+    """
+    rows = []
+    for name in modules:
+        cached = name in sys.modules
+        before = len(sys.modules)
+        started = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        row: Dict[str, Any] = {
+            "module": name,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "newModules": len(sys.modules) - before,
+        }
+        if cached:
+            row["cached"] = True
+        if error:
+            row["error"] = error
+        rows.append(row)
+    _LAST_PROFILE[:] = rows
+    return rows
+
+
+def startup_report() -> Dict[str, Any]:
+    """The last import profile of this process (empty unless the launcher ran one) and optional-dependency state."""
+    return {
+        "imports": list(_LAST_PROFILE),
+        "importMs": round(sum(r["ms"] for r in _LAST_PROFILE), 2),
+        "loadedModules": len(sys.modules),
+        "optional": capabilities(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Per-module import cost of the AI service.")
+    parser.add_argument("--modules", help="comma-separated modules to import in order (default: the service)")
+    parser.add_argument("--budget-ms", type=float, help="exit 1 when the total import time exceeds this")
+    args = parser.parse_args(argv)
+
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()] if args.modules else SERVICE_IMPORTS
+    profile_imports(modules)
+    report = startup_report()
+    print(json.dumps(report, indent=2))
+    if args.budget_ms is not None and report["importMs"] > args.budget_ms:
+        print(f"import time {report['importMs']} ms exceeds budget {args.budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+# Streaming upload ingestion: spool request bodies to disk without buffering them in memory
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import Dict
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except Exception:
+    try:
+        from multipart.multipart import MultipartParser, parse_options_header
+    except Exception:
+        MultipartParser = None
+        parse_options_header = None
+
+try:
+    from backend.models.ai_service.deadlines import check_deadline
+except Exception:
+    from .deadlines import check_deadline
+
+# Non-file multipart fields (lang, use_ocr, ...) are tiny; cap them independently
+_MAX_FIELD_BYTES = 64 * 1024
+# Received chunks are batched up to this size before the file write and hashing
+# run in a worker thread, keeping disk I/O off the event loop without a thread hop per chunk
+_FLUSH_BYTES = 256 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SpooledUpload:
+    """An uploaded document spooled to a temp file.
+
+    ``hasher`` is a SHA-256 over the document bytes, filled while streaming so
+    the extraction cache key needs no second read.
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="upload-")
+        self._file = os.fdopen(fd, "wb")
+        self.size = 0
+        self.mime: str | None = None
+        self.filename: str | None = None
+        self.fields: Dict[str, str] = {}
+        self.hasher = hashlib.sha256()
+
+    def write(self, data):
+        self._file.write(data)
+        self.hasher.update(data)
+        self.size += len(data)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def cleanup(self):
+        self.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _multipart_parser(upload: SpooledUpload, boundary: bytes):
+    state = {"headers": {}, "field": b"", "value": b"", "name": None, "is_file": False, "buf": bytearray()}
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["buf"] = bytearray()
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"] = b""
+        state["value"] = b""
+
+    def on_headers_finished():
+        _, params = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["name"] = (params.get(b"name") or b"").decode("utf-8", "replace")
+        filename = params.get(b"filename")
+        # Only the first file part is treated as the document
+        state["is_file"] = filename is not None and upload.filename is None
+        if state["is_file"]:
+            upload.filename = filename.decode("utf-8", "replace")
+            ctype = state["headers"].get(b"content-type")
+            upload.mime = ctype.decode("latin-1").split(";")[0].strip() if ctype else None
+
+    def on_part_data(data, start, end):
+        if state["is_file"]:
+            upload.write(memoryview(data)[start:end])
+        else:
+            state["buf"] += data[start:end]
+            if len(state["buf"]) > _MAX_FIELD_BYTES:
+                raise UploadTooLarge("form field too large")
+
+    def on_part_end():
+        if not state["is_file"] and state["name"]:
+            upload.fields[state["name"]] = state["buf"].decode("utf-8", "replace")
+
+    return MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+
+async def receive_upload(request, max_bytes: int) -> SpooledUpload:
+    """Stream a raw binary or multipart/form-data request body to a temp file.
+
+    Rejects with ``UploadTooLarge`` as soon as the declared Content-Length or
+    the bytes received so far exceed ``max_bytes``, and raises
+    ``DeadlineExceeded`` when the request deadline passes mid-body. Writes and
+    hashing run in a worker thread; the caller owns cleanup of the returned upload.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+
+    content_type = request.headers.get("content-type") or "application/octet-stream"
+    upload = SpooledUpload()
+    try:
+        parser = None
+        if content_type.startswith("multipart/form-data"):
+            if MultipartParser is None:
+                raise ValueError("python-multipart is required for multipart uploads")
+            _, params = parse_options_header(content_type)
+            boundary = params.get(b"boundary")
+            if not boundary:
+                raise ValueError("missing multipart boundary")
+            parser = _multipart_parser(upload, boundary)
+        else:
+            upload.mime = content_type.split(";")[0].strip()
+
+        sink = parser.write if parser is not None else upload.write
+        received = 0
+        pending = bytearray()
+        async for chunk in request.stream():
+            check_deadline("receive_upload")
+            received += len(chunk)
+            if received > max_bytes:
+                raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+            pending += chunk
+            if len(pending) >= _FLUSH_BYTES:
+                await asyncio.to_thread(sink, bytes(pending))
+                pending.clear()
+        if pending:
+            await asyncio.to_thread(sink, bytes(pending))
+        if parser is not None:
+            parser.finalize()
+        await asyncio.to_thread(upload.close)
+        return upload
+    except BaseException:
+        upload.cleanup()
+        raise
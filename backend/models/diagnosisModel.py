@@ -1,110 +1,304 @@
 # Placeholder PyTorch model definition
-try:
-    import torch
-    import torch.nn as nn
-    import torch.nn.functional as F
-except Exception:  # keep repo runnable without python deps
-    torch = None
-    nn = None
-    F = None
+import json
+import os
+import threading
 
 try:
-    import scipy
     import numpy as _np
 except Exception:
-    scipy = None
     _np = None
 
+try:
+    from backend.models.instrumentation import span
+    from backend.models.optionalDeps import optional
+except Exception:
+    from instrumentation import span
+    from optionalDeps import optional
 
-class DiagnosisModel(nn.Module if nn else object):
-    """A minimal feed-forward model for triaging 3 conditions from 8 numeric inputs.
+# Imported when the first model is built; NumPy-only serving and featurization never load it
+TORCH = optional("torch")
+# Only gates the optional winsorize step (which runs on NumPy), so it is probed, never imported
+SCIPY = optional("scipy")
 
-    The model shape is intentionally small for demo purposes. It exposes a
-    predict helper that returns softmax probabilities.
-    """
 
-    def __init__(self, input_dim: int = 8, num_classes: int = 3, device: str | None = None):
-        if nn:
-            super().__init__()
-            hidden_dim = 16
-            self.net = nn.Sequential(
-                nn.Linear(input_dim, hidden_dim),
-                nn.ReLU(),
-                nn.Linear(hidden_dim, num_classes),
-            )
-
-        # runtime attributes even if torch is missing (for safer access)
-        self._has_torch = torch is not None and nn is not None and F is not None
-        self.input_dim = input_dim
-        self.num_classes = num_classes
-        self.device = device or ("cuda" if self._has_torch and torch.cuda.is_available() else "cpu")
-
-        if self._has_torch and nn:
-            self.to(self.device)
-
-    def forward(self, x):
-        if self._has_torch:
-            return self.net(x)
-        return None
+def _define_model_class():
+    torch = TORCH.load()
+    nn = torch.nn if torch is not None else None
+    F = torch.nn.functional if torch is not None else None
 
-    def predict_proba(self, x_tensor):
-        """Return softmax probabilities for a batch of inputs.
+    class DiagnosisModel(nn.Module if nn else object):
+        """A minimal feed-forward model for triaging 3 conditions from 8 numeric inputs.
 
-        x_tensor must be a torch.Tensor of shape (N, input_dim).
+        The model shape is intentionally small for demo purposes. It exposes a
+        predict helper that returns softmax probabilities.
         """
-        if not self._has_torch:
+
+        def __init__(self, input_dim: int = 8, num_classes: int = 3, device: str | None = None):
+            if nn:
+                super().__init__()
+                hidden_dim = 16
+                self.net = nn.Sequential(
+                    nn.Linear(input_dim, hidden_dim),
+                    nn.ReLU(),
+                    nn.Linear(hidden_dim, num_classes),
+                )
+
+            # runtime attributes even if torch is missing (for safer access)
+            self._has_torch = torch is not None and nn is not None and F is not None
+            self.input_dim = input_dim
+            self.num_classes = num_classes
+            self.device = device or ("cuda" if self._has_torch and torch.cuda.is_available() else "cpu")
+
+            if self._has_torch and nn:
+                self.to(self.device)
+
+        def forward(self, x):
+            if self._has_torch:
+                return self.net(x)
             return None
-        self.eval()
-        with torch.no_grad():
-            logits = self.forward(x_tensor)
-            probs = F.softmax(logits, dim=-1)
-        return probs
+
+        def predict_proba(self, x_tensor):
+            """Return softmax probabilities for a batch of inputs.
+
+            x_tensor must be a torch.Tensor of shape (N, input_dim).
+            """
+            if not self._has_torch:
+                return None
+            self.eval()
+            with torch.no_grad():
+                logits = self.forward(x_tensor)
+                probs = F.softmax(logits, dim=-1)
+            return probs
+
+    DiagnosisModel.__module__ = __name__
+    DiagnosisModel.__qualname__ = "DiagnosisModel"
+    return DiagnosisModel
+
+
+_MODEL_CLASS = None
+_MODEL_CLASS_LOCK = threading.Lock()
+
+
+def model_class():
+    """The ``DiagnosisModel`` class, importing torch the first time it is needed."""
+    global _MODEL_CLASS
+    if _MODEL_CLASS is None:
+        with _MODEL_CLASS_LOCK:
+            if _MODEL_CLASS is None:
+                _MODEL_CLASS = _define_model_class()
+    return _MODEL_CLASS
+
+
+def create_model(input_dim: int = 8, num_classes: int = 3, device: str | None = None):
+    """A new, untrained ``DiagnosisModel``."""
+    return model_class()(input_dim=input_dim, num_classes=num_classes, device=device)
+
+
+def __getattr__(name):
+    # ``from ...diagnosisModel import DiagnosisModel`` keeps working; it is what imports torch
+    if name == "DiagnosisModel":
+        return model_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+FEATURE_SPEC = (
+    ("vitals", "heartRate"),
+    ("vitals", "systolicBP"),
+    ("vitals", "diastolicBP"),
+    ("vitals", "respiratoryRate"),
+    ("vitals", "temperature"),
+    ("labs", "wbc"),
+    ("labs", "crp"),
+    ("labs", "glucose"),
+)
+FEATURE_NAMES = [key for _, key in FEATURE_SPEC]
+
+# Output classes in model order; training data labels are mapped onto these indices
+LABELS = ["Condition A", "Condition B", "Condition C"]
+
+# Rough demo normalization statistics; overridden by a stats file when present
+DEFAULT_FEATURE_STATS = {
+    "version": "demo-v1",
+    "features": FEATURE_NAMES,
+    "means": [75.0, 120.0, 80.0, 16.0, 36.8, 7.0, 5.0, 95.0],
+    "stds": [12.0, 15.0, 10.0, 3.0, 0.5, 2.0, 3.0, 15.0],
+    "fill": [0.0] * len(FEATURE_NAMES),
+}
+DEFAULT_FEATURE_STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "featureStats.json")
 
 
 def _winsorize(values, lower_pct: float = 0.01, upper_pct: float = 0.99):
-    if _np is None or scipy is None:
+    """Clamp each row to its own [lower_pct, upper_pct] quantiles.
+
+    Accepts a 1-D vector or a 2-D (N, F) array; 2-D input is clipped in place.
+    """
+    if _np is None or not SCIPY.available():
         return values
     try:
-        lo = _np.quantile(values, lower_pct)
-        hi = _np.quantile(values, upper_pct)
-        return [max(lo, min(v, hi)) for v in values]
+        arr = _np.asarray(values, dtype=_np.float32)
+        if arr.ndim == 1:
+            lo, hi = _np.quantile(arr, [lower_pct, upper_pct])
+            return _np.clip(arr, lo, hi)
+        lo, hi = _np.quantile(arr, [lower_pct, upper_pct], axis=1, keepdims=True)
+        return _np.clip(arr, lo.astype(_np.float32), hi.astype(_np.float32), out=arr)
     except Exception:
         return values
 
 
-def featurize_payload_to_tensor(payload, use_scipy_winsorize: bool = False) -> "torch.Tensor | None":
+class Featurizer:
+    """Precomputed featurization state shared by every inference call.
+
+    Holds the feature index and the mean/std/fill vectors as contiguous float32
+    arrays so a list of payloads is written straight into one (N, F) buffer and
+    normalized with a couple of array operations. Statistics are versioned and
+    can be loaded from a JSON file (see ``featureStats.json``).
+    """
+
+    def __init__(self, means, stds, fill=None, features=None, version: str = "unversioned"):
+        if _np is None:
+            raise RuntimeError("numpy is required for featurization")
+        self.features = list(features or FEATURE_NAMES)
+        spec = dict((key, src) for src, key in FEATURE_SPEC)
+        # Unknown feature names are read from vitals first, then labs
+        self._index = tuple((spec.get(name), name) for name in self.features)
+        self.num_features = len(self.features)
+        self.version = str(version)
+        self.means = _np.ascontiguousarray(means, dtype=_np.float32)
+        stds = _np.ascontiguousarray(stds, dtype=_np.float32)
+        self.stds = _np.where(stds != 0, stds, _np.float32(1.0)).astype(_np.float32)
+        self.inv_stds = (1.0 / self.stds).astype(_np.float32)
+        fill = _np.zeros(self.num_features, dtype=_np.float32) if fill is None else fill
+        self.fill = _np.ascontiguousarray(fill, dtype=_np.float32)
+        if not (self.means.shape == self.stds.shape == self.fill.shape == (self.num_features,)):
+            raise ValueError("feature stats must have one mean/std/fill per feature")
+
+    @classmethod
+    def from_stats(cls, stats: dict) -> "Featurizer":
+        return cls(
+            means=stats["means"],
+            stds=stats["stds"],
+            fill=stats.get("fill"),
+            features=stats.get("features"),
+            version=stats.get("version", "unversioned"),
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "Featurizer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_stats(json.load(f))
+
+    @classmethod
+    def load_default(cls) -> "Featurizer":
+        """Load stats from AI_FEATURE_STATS_PATH, the bundled file, or built-in constants."""
+        path = os.environ.get("AI_FEATURE_STATS_PATH") or DEFAULT_FEATURE_STATS_PATH
+        try:
+            return cls.from_file(path)
+        except Exception:
+            return cls.from_stats(DEFAULT_FEATURE_STATS)
+
+    def to_stats(self) -> dict:
+        return {
+            "version": self.version,
+            "features": list(self.features),
+            "means": self.means.tolist(),
+            "stds": self.stds.tolist(),
+            "fill": self.fill.tolist(),
+        }
+
+    def fill_raw(self, payloads, out=None, strict: bool = True):
+        """Write raw feature values for each payload into an (N, F) float32 buffer.
+
+        Missing values are left as NaN and filled in one vectorized pass. With
+        ``strict=False`` a malformed payload does not raise; its row is marked
+        NaN and the error message is returned in the per-row error list.
+        """
+        n = len(payloads)
+        buf = out if out is not None else _np.empty((n, self.num_features), dtype=_np.float32)
+        buf[:n].fill(_np.nan)
+        errors = [None] * n
+        index = self._index
+        for i, payload in enumerate(payloads):
+            payload = payload or {}
+            vitals = payload.get("vitals") or {}
+            labs = payload.get("labs") or {}
+            row = buf[i]
+            try:
+                for j, (src, key) in enumerate(index):
+                    if src == "labs":
+                        v = labs.get(key)
+                    elif src == "vitals":
+                        v = vitals.get(key)
+                    else:
+                        v = vitals.get(key, labs.get(key))
+                    if v is not None:
+                        row[j] = float(v)
+            except Exception as e:
+                if strict:
+                    raise
+                row.fill(_np.nan)
+                errors[i] = str(e)
+        missing = _np.isnan(buf[:n])
+        if missing.any():
+            _np.copyto(buf[:n], _np.broadcast_to(self.fill, buf[:n].shape), where=missing)
+        return buf[:n], errors
+
+    def normalize(self, raw, winsorize_mask=None):
+        """Normalize an (N, F) raw buffer in place; optionally winsorize selected rows first."""
+        if winsorize_mask is not None:
+            mask = _np.asarray(winsorize_mask, dtype=bool)
+            if mask.any():
+                raw[mask] = _winsorize(raw[mask])
+        raw -= self.means
+        raw *= self.inv_stds
+        return raw
+
+    def featurize(self, payloads, use_scipy_winsorize=False, out=None, strict: bool = True):
+        """Featurize a list of payloads into a normalized (N, F) float32 array.
+
+        ``use_scipy_winsorize`` may be a single bool or one bool per payload.
+        Returns ``(array, errors)``.
+        """
+        with span("featurize"):
+            return self._featurize(payloads, use_scipy_winsorize, out, strict)
+
+    def _featurize(self, payloads, use_scipy_winsorize, out, strict):
+        raw, errors = self.fill_raw(payloads, out=out, strict=strict)
+        if isinstance(use_scipy_winsorize, (list, tuple)) or (_np is not None and isinstance(use_scipy_winsorize, _np.ndarray)):
+            mask = use_scipy_winsorize
+        else:
+            mask = [bool(use_scipy_winsorize)] * len(payloads) if use_scipy_winsorize else None
+        return self.normalize(raw, winsorize_mask=mask), errors
+
+    def to_tensor(self, payloads, use_scipy_winsorize=False, strict: bool = True):
+        """Like ``featurize`` but returns a torch tensor sharing the NumPy buffer."""
+        torch = TORCH.load()
+        if torch is None:
+            return None, [None] * len(payloads)
+        arr, errors = self.featurize(payloads, use_scipy_winsorize=use_scipy_winsorize, strict=strict)
+        return torch.from_numpy(arr), errors
+
+
+_FEATURIZER: Featurizer | None = None
+
+
+def get_featurizer() -> Featurizer | None:
+    """Return the process-wide featurizer, building it on first use."""
+    global _FEATURIZER
+    if _FEATURIZER is None and _np is not None:
+        _FEATURIZER = Featurizer.load_default()
+    return _FEATURIZER
+
+
+def featurize_payload_to_tensor(payload, use_scipy_winsorize: bool = False, featurizer: Featurizer | None = None) -> "torch.Tensor | None":
     """Map request payload into a fixed-size numeric tensor of shape (1, 8).
 
     This is a simple, deterministic featurization over common vitals/labs.
     It is only for demo purposes; real systems will use trained pipelines.
     """
-    if torch is None:
+    if TORCH.load() is None:
         return None
-
-    vitals = (payload or {}).get("vitals", {})
-    labs = (payload or {}).get("labs", {})
-
-    # Eight demo features (fill missing as 0.0)
-    raw = [
-        float(vitals.get("heartRate", 0.0)),
-        float(vitals.get("systolicBP", 0.0)),
-        float(vitals.get("diastolicBP", 0.0)),
-        float(vitals.get("respiratoryRate", 0.0)),
-        float(vitals.get("temperature", 0.0)),
-        float(labs.get("wbc", 0.0)),
-        float(labs.get("crp", 0.0)),
-        float(labs.get("glucose", 0.0)),
-    ]
-
-    # Optional SciPy-backed winsorization to reduce outlier impact in demo
-    if use_scipy_winsorize:
-        raw = _winsorize(raw)
-
-    # Simple normalization with rough means/stds (demo only)
-    means = [75.0, 120.0, 80.0, 16.0, 36.8, 7.0, 5.0, 95.0]
-    stds = [12.0, 15.0, 10.0, 3.0, 0.5, 2.0, 3.0, 15.0]
-    norm = [(raw[i] - means[i]) / (stds[i] if stds[i] != 0 else 1.0) for i in range(8)]
-
-    x = torch.tensor([norm], dtype=torch.float32)
+    featurizer = featurizer or get_featurizer()
+    if featurizer is None:
+        return None
+    x, _ = featurizer.to_tensor([payload], use_scipy_winsorize=use_scipy_winsorize)
     return x
-
@@ -1,53 +1,38 @@
 # Placeholder for SHAP/Captum helpers
 try:
-    import torch
+    import numpy as _np
 except Exception:
-    torch = None
+    _np = None
 
-try:  # optional
-    from captum.attr import IntegratedGradients
+try:
+    from backend.models.instrumentation import span
+    from backend.models.optionalDeps import optional
 except Exception:
-    IntegratedGradients = None
+    from instrumentation import span
+    from optionalDeps import optional
 
-try:  # optional
-    import shap
-except Exception:
-    shap = None
+# Imported on first use: torch only once a torch model is explained (NumPy-only serving never needs it),
+# shap pulls in numba and scikit-learn, and only KernelExplainer needs it
+TORCH = optional("torch")
+CAPTUM = optional("captum", "captum.attr")
+SHAP = optional("shap")
+
+# Exact Shapley enumeration is 2^F coalitions; beyond this fall back to KernelExplainer
+EXACT_SHAP_MAX_FEATURES = 12
 
 
 def summarize_attributions(attribs):
     return attribs or {}
 
 
-def _captum_or_gradient_input(model, x_tensor, target_index: int | None = None):
-    if torch is None or x_tensor is None or not hasattr(model, "forward"):
-        return None
-    model.eval()
-    x = x_tensor.detach().clone()
-    x.requires_grad_(True)
-    try:
-        if IntegratedGradients is not None:
-            ig = IntegratedGradients(model)
-            attributions = ig.attribute(x, target=target_index, n_steps=32)
-        else:
-            logits = model(x)
-            if target_index is None:
-                target_index = int(torch.argmax(logits[0]).item())
-            selected = logits[:, target_index]
-            selected.backward(torch.ones_like(selected))
-            attributions = x.grad * x
-        first = attributions[0].detach().cpu().tolist()
-        return first
-    except Exception:
-        return None
-
-
 def _shap_kernel_explainer(model, x_tensor, target_index: int | None = None):
     """Compute SHAP values using KernelExplainer on the first item.
 
     Note: This is a lightweight integration suitable for small feature count.
     Returns a list of attributions for the selected class or None if unsupported.
     """
+    shap = SHAP.load()
+    torch = TORCH.load()
     if shap is None or torch is None or x_tensor is None or not hasattr(model, "forward"):
         return None
     try:
@@ -91,28 +76,213 @@ def _shap_kernel_explainer(model, x_tensor, target_index: int | None = None):
         return None
 
 
-def compute_attributions(model, x_tensor, target_index: int | None = None, method: str | None = None):
-    """Compute feature attributions for the first sample in x_tensor.
+def _resolve_targets(model, x, target_indices):
+    """Return a LongTensor of per-row targets, defaulting to each row's argmax."""
+    torch = TORCH.load()
+    n = x.shape[0]
+    if target_indices is None:
+        with torch.no_grad():
+            return torch.argmax(model(x), dim=-1)
+    if isinstance(target_indices, int):
+        return torch.full((n,), int(target_indices), dtype=torch.long, device=x.device)
+    return torch.as_tensor(list(target_indices), dtype=torch.long, device=x.device)
 
-    method: one of {"auto", "captum", "shap", "none"}. Defaults to "auto".
-    In auto mode, prefer Captum, then SHAP, then gradients×input.
-    Returns a list of floats or None.
+
+def _gauss_legendre(n_steps: int):
+    """Gauss-Legendre nodes/weights mapped onto [0, 1] (Captum's default IG rule)."""
+    if _np is not None:
+        nodes, weights = _np.polynomial.legendre.leggauss(n_steps)
+        return ((nodes + 1.0) / 2.0).tolist(), (weights / 2.0).tolist()
+    alphas = [(k + 0.5) / n_steps for k in range(n_steps)]
+    return alphas, [1.0 / n_steps] * n_steps
+
+
+def _integrated_gradients_batch(model, x_tensor, target_indices=None, n_steps: int = 32):
+    """Integrated Gradients for every row of an (N, F) batch.
+
+    All N x n_steps interpolation points go through one forward and one
+    backward pass (Captum when installed, otherwise the native path below).
+    Uses a zero baseline, matching Captum's default.
+    """
+    torch = TORCH.load()
+    if torch is None or x_tensor is None or not hasattr(model, "forward"):
+        return None
+    model.eval()
+    x = x_tensor.detach()
+    n, f = x.shape
+    targets = _resolve_targets(model, x, target_indices)
+    captum = CAPTUM.load()
+    if captum is not None:
+        attributions = captum.IntegratedGradients(model).attribute(x.clone(), target=targets, n_steps=n_steps)
+        return attributions.detach().cpu().tolist()
+    alphas, weights = _gauss_legendre(n_steps)
+    alphas_t = torch.tensor(alphas, dtype=x.dtype, device=x.device).view(-1, 1, 1)
+    weights_t = torch.tensor(weights, dtype=x.dtype, device=x.device).view(-1, 1, 1)
+
+    baseline = torch.zeros_like(x)
+    delta = x - baseline
+    points = (baseline.unsqueeze(0) + alphas_t * delta.unsqueeze(0)).reshape(-1, f)
+    points.requires_grad_(True)
+    logits = model(points)
+    selected = logits.gather(1, targets.repeat(n_steps).view(-1, 1))
+    grads = torch.autograd.grad(selected.sum(), points)[0].view(n_steps, n, f)
+    avg_grads = (grads * weights_t).sum(dim=0)
+    return (delta * avg_grads).detach().cpu().tolist()
+
+
+def _gradient_x_input_batch(model, x_tensor, target_indices=None):
+    torch = TORCH.load()
+    if torch is None or x_tensor is None or not hasattr(model, "forward"):
+        return None
+    model.eval()
+    x = x_tensor.detach().clone()
+    x.requires_grad_(True)
+    targets = _resolve_targets(model, x.detach(), target_indices)
+    logits = model(x)
+    selected = logits.gather(1, targets.view(-1, 1))
+    grads = torch.autograd.grad(selected.sum(), x)[0]
+    return (grads * x).detach().cpu().tolist()
+
+
+_SHAP_BACKGROUND = None
+_COALITION_CACHE: dict = {}
+
+
+def set_shap_background(background):
+    """Set the persistent SHAP background set, an (B, F) tensor in normalized feature space.
+
+    Defaults to a single all-zeros row, i.e. the population means used for normalization.
+    """
+    global _SHAP_BACKGROUND
+    _SHAP_BACKGROUND = None if background is None else background.detach().cpu()
+
+
+def _coalitions(num_features: int):
+    """Cached (2^F, F) coalition masks and the (2^F, F) Shapley weight matrix W.
+
+    For a value table v of shape (N, 2^F), exact Shapley values are ``v @ W``.
+    """
+    cached = _COALITION_CACHE.get(num_features)
+    if cached is not None:
+        return cached
+    from math import factorial
+
+    torch = TORCH.load()
+    f = num_features
+    m = 1 << f
+    codes = torch.arange(m).view(-1, 1)
+    bits = (1 << torch.arange(f)).view(1, -1)
+    masks = (codes & bits) != 0
+    sizes = masks.sum(dim=1)
+    fact = [factorial(k) for k in range(f + 1)]
+    # weight for adding feature i to a coalition S (i not in S) of size s
+    w = torch.tensor([fact[s] * fact[f - s - 1] / fact[f] if s < f else 0.0 for s in range(f + 1)], dtype=torch.float64)
+    weights = torch.where(masks, w[(sizes - 1).clamp(min=0)].view(-1, 1), -w[sizes].view(-1, 1))
+    _COALITION_CACHE[num_features] = (masks, weights)
+    return masks, weights
+
+
+def _exact_shap_batch(model, x_tensor, target_indices=None):
+    """Exact interventional Shapley values of class probabilities for every row.
+
+    Enumerates all 2^F coalitions against the cached background set in one
+    forward pass, which is cheap for this 8-feature model (256 coalitions).
+    """
+    torch = TORCH.load()
+    if torch is None or x_tensor is None or not hasattr(model, "predict_proba"):
+        return None
+    x = x_tensor.detach()
+    n, f = x.shape
+    if f > EXACT_SHAP_MAX_FEATURES:
+        return None
+    masks, weights = _coalitions(f)
+    masks = masks.to(x.device)
+    background = _SHAP_BACKGROUND if _SHAP_BACKGROUND is not None else torch.zeros(1, f)
+    background = background.to(device=x.device, dtype=x.dtype)
+    b = background.shape[0]
+    m = masks.shape[0]
+
+    # (N, M, B, F): feature from x where the coalition includes it, else from the background row
+    inputs = torch.where(
+        masks.view(1, m, 1, f),
+        x.view(n, 1, 1, f),
+        background.view(1, 1, b, f),
+    ).reshape(-1, f)
+    probs = model.predict_proba(inputs)
+    if probs is None:
+        return None
+    probs = probs.view(n, m, b, -1).mean(dim=2)
+    if target_indices is None:
+        targets = probs[:, -1, :].argmax(dim=-1)
+    elif isinstance(target_indices, int):
+        targets = torch.full((n,), int(target_indices), dtype=torch.long, device=x.device)
+    else:
+        targets = torch.as_tensor(list(target_indices), dtype=torch.long, device=x.device)
+    values = probs.gather(2, targets.view(n, 1, 1).expand(n, m, 1)).squeeze(-1)
+    phi = values.to(torch.float64).cpu() @ weights
+    return phi.to(torch.float32).tolist()
+
+
+def compute_attributions_batch(model, x_tensor, target_indices=None, method: str | None = None, n_steps: int = 32):
+    """Compute per-row feature attributions for an (N, F) batch.
+
+    target_indices: None (each row's argmax), a single int, or one int per row.
+    method: one of {"auto", "captum", "shap", "none"}. "captum" runs batched
+    Integrated Gradients, "shap" runs exact Shapley values over the cached
+    background set (KernelExplainer per row for wide inputs). Auto prefers
+    IG → SHAP → gradients×input. Returns a list with one list of floats per
+    row, or None.
     """
     chosen = (method or "auto").lower()
-    if chosen == "none":
+    if chosen == "none" or x_tensor is None or TORCH.load() is None:
         return None
 
+    def _ig():
+        try:
+            with span("explain.integrated_gradients"):
+                return _integrated_gradients_batch(model, x_tensor, target_indices, n_steps=n_steps)
+        except Exception:
+            return None
+
+    def _shap():
+        with span("explain.shap"):
+            try:
+                attrs = _exact_shap_batch(model, x_tensor, target_indices)
+            except Exception:
+                attrs = None
+            if attrs is None and SHAP.available():
+                targets = target_indices
+                rows = []
+                for i in range(x_tensor.shape[0]):
+                    t = targets if (targets is None or isinstance(targets, int)) else int(list(targets)[i])
+                    rows.append(_shap_kernel_explainer(model, x_tensor[i:i + 1], t))
+                attrs = rows if all(r is not None for r in rows) else None
+            return attrs
+
+    def _gxi():
+        try:
+            with span("explain.grad_x_input"):
+                return _gradient_x_input_batch(model, x_tensor, target_indices)
+        except Exception:
+            return None
+
     if chosen == "captum":
-        return _captum_or_gradient_input(model, x_tensor, target_index)
+        return _ig() or _gxi()
     if chosen == "shap":
-        return _shap_kernel_explainer(model, x_tensor, target_index)
+        return _shap()
 
-    # auto: captum → shap → grad×input
-    attrs = _captum_or_gradient_input(model, x_tensor, target_index)
-    if attrs is not None:
-        return attrs
-    attrs = _shap_kernel_explainer(model, x_tensor, target_index)
-    if attrs is not None:
-        return attrs
-    return _captum_or_gradient_input(model, x_tensor, target_index)
+    # auto: IG → SHAP → grad×input
+    return _ig() or _shap() or _gxi()
 
+
+def compute_attributions(model, x_tensor, target_index: int | None = None, method: str | None = None):
+    """Compute feature attributions for the first sample in x_tensor.
+
+    method: one of {"auto", "captum", "shap", "none"}. Defaults to "auto".
+    In auto mode, prefer Integrated Gradients, then SHAP, then gradients×input.
+    Returns a list of floats or None.
+    """
+    if x_tensor is None:
+        return None
+    rows = compute_attributions_batch(model, x_tensor[0:1], target_index, method=method)
+    return rows[0] if rows else None
@@ -0,0 +1,214 @@
+# Pluggable inference backends for DiagnosisModel (torch eager, TorchScript, NumPy)
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+try:
+    import numpy as _np
+except Exception:
+    _np = None
+
+try:
+    from backend.models.optionalDeps import optional
+except Exception:
+    from optionalDeps import optional
+
+# Imported only when a torch backend is built; the numpy backend never pays for it
+TORCH = optional("torch")
+
+BACKEND_NAMES = ("eager", "torchscript", "numpy")
+
+
+def export_weights(model) -> Dict[str, Any]:
+    """Export DiagnosisModel's Linear→ReLU→Linear weights as float32 NumPy arrays."""
+    state = model.state_dict()
+    return {
+        "w0": state["net.0.weight"].detach().cpu().numpy().astype(_np.float32),
+        "b0": state["net.0.bias"].detach().cpu().numpy().astype(_np.float32),
+        "w1": state["net.2.weight"].detach().cpu().numpy().astype(_np.float32),
+        "b1": state["net.2.bias"].detach().cpu().numpy().astype(_np.float32),
+    }
+
+
+def save_weights(weights: Dict[str, Any], path: str, **meta):
+    """Write exported weights (plus scalar/string metadata) to an .npz file."""
+    extra = {k: _np.asarray(json.dumps(v)) for k, v in meta.items()}
+    _np.savez(path, **weights, **{f"meta_{k}": v for k, v in extra.items()})
+
+
+def load_weights(path: str):
+    """Read an .npz written by ``save_weights``; returns ``(weights, meta)``."""
+    with _np.load(path, allow_pickle=False) as data:
+        weights = {k: _np.ascontiguousarray(data[k], dtype=_np.float32) for k in ("w0", "b0", "w1", "b1")}
+        meta = {k[len("meta_"):]: json.loads(str(data[k])) for k in data.files if k.startswith("meta_")}
+    return weights, meta
+
+
+class InferenceBackend:
+    """Maps a float32 (N, F) NumPy array to (N, C) class probabilities."""
+
+    name = "base"
+
+    def predict_proba(self, x):
+        raise NotImplementedError
+
+
+class TorchEagerBackend(InferenceBackend):
+    name = "eager"
+
+    def __init__(self, model):
+        self.model = model.eval()
+        self.device = getattr(model, "device", "cpu")
+
+    def predict_proba(self, x):
+        torch = TORCH.load()
+        with torch.inference_mode():
+            t = torch.from_numpy(x).to(self.device)
+            return torch.softmax(self.model.net(t), dim=-1).cpu().numpy()
+
+
+class TorchScriptBackend(InferenceBackend):
+    """The model traced to TorchScript and frozen, which skips Python module dispatch."""
+
+    name = "torchscript"
+
+    def __init__(self, model):
+        self.device = getattr(model, "device", "cpu")
+        torch = TORCH.load()
+        example = torch.zeros(1, model.input_dim, device=self.device)
+        with torch.no_grad():
+            traced = torch.jit.trace(model.net.eval(), example)
+        try:
+            traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+        except Exception:
+            pass
+        self.module = traced
+
+    def predict_proba(self, x):
+        torch = TORCH.load()
+        with torch.inference_mode():
+            t = torch.from_numpy(x).to(self.device)
+            return torch.softmax(self.module(t), dim=-1).cpu().numpy()
+
+
+class NumpyBackend(InferenceBackend):
+    """Pure NumPy matmuls over exported weights; needs no torch import at all."""
+
+    name = "numpy"
+
+    def __init__(self, weights: Dict[str, Any]):
+        # Pre-transpose once so the hot path is two contiguous matmuls
+        self.w0t = _np.ascontiguousarray(weights["w0"].T, dtype=_np.float32)
+        self.b0 = _np.ascontiguousarray(weights["b0"], dtype=_np.float32)
+        self.w1t = _np.ascontiguousarray(weights["w1"].T, dtype=_np.float32)
+        self.b1 = _np.ascontiguousarray(weights["b1"], dtype=_np.float32)
+        self.input_dim = self.w0t.shape[0]
+
+    def predict_proba(self, x):
+        h = x @ self.w0t
+        h += self.b0
+        _np.maximum(h, 0.0, out=h)
+        logits = h @ self.w1t
+        logits += self.b1
+        logits -= logits.max(axis=1, keepdims=True)
+        _np.exp(logits, out=logits)
+        logits /= logits.sum(axis=1, keepdims=True)
+        return logits
+
+
+def create_backend(name: str | None, model=None, weights: Dict[str, Any] | None = None) -> InferenceBackend:
+    """Build the configured backend, degrading to what the environment supports.
+
+    ``auto`` (or None) picks eager torch when a torch model is available and
+    NumPy otherwise. A torch backend requested without torch falls back to NumPy.
+    """
+    chosen = (name or "auto").lower()
+    # A model with _has_torch was built after torch was imported, so this never imports torch itself
+    has_torch_model = model is not None and getattr(model, "_has_torch", False)
+    if chosen == "auto":
+        chosen = "eager" if has_torch_model else "numpy"
+    if chosen in ("eager", "torchscript") and not has_torch_model:
+        chosen = "numpy"
+    if chosen == "torchscript":
+        try:
+            return TorchScriptBackend(model)
+        except Exception:
+            return TorchEagerBackend(model)
+    if chosen == "eager":
+        return TorchEagerBackend(model)
+    if chosen == "numpy":
+        if weights is None and has_torch_model:
+            weights = export_weights(model)
+        if weights is None or _np is None:
+            raise RuntimeError("numpy backend needs numpy and exported weights")
+        return NumpyBackend(weights)
+    raise ValueError(f"unknown inference backend: {name}")
+
+
+def check_parity(reference: InferenceBackend, candidates: List[InferenceBackend], num_features: int = 8,
+                 n: int = 512, seed: int = 0, atol: float = 1e-5) -> Dict[str, Any]:
+    """Compare candidates against a reference backend on random normalized inputs.
+
+    Returns per-backend max absolute difference, argmax agreement and timing.
+    """
+    rng = _np.random.default_rng(seed)
+    x = rng.standard_normal((n, num_features), dtype=_np.float32) * 2.0
+    ref = reference.predict_proba(x)
+    report: Dict[str, Any] = {"reference": reference.name, "n": n, "atol": atol, "backends": {}, "ok": True}
+    for backend in candidates:
+        started = time.perf_counter()
+        out = backend.predict_proba(x)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        diff = float(_np.abs(out - ref).max())
+        agree = float((out.argmax(axis=1) == ref.argmax(axis=1)).mean())
+        ok = diff <= atol
+        report["backends"][backend.name] = {"maxAbsDiff": diff, "argmaxAgreement": agree, "ms": round(elapsed_ms, 3), "ok": ok}
+        report["ok"] = report["ok"] and ok
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check parity between DiagnosisModel inference backends.")
+    parser.add_argument("--checkpoint", help="checkpoint .pt or exported .npz (default: randomly initialised model)")
+    parser.add_argument("-n", type=int, default=512)
+    parser.add_argument("--atol", type=float, default=1e-5)
+    parser.add_argument("--export", metavar="NPZ", help="also write the checkpoint's weights for the numpy backend")
+    args = parser.parse_args(argv)
+
+    try:
+        from backend.models.diagnosisModel import DiagnosisModel
+        from backend.models.ai_service.modelRegistry import load_checkpoint
+    except Exception:
+        from diagnosisModel import DiagnosisModel
+        from ai_service.modelRegistry import load_checkpoint
+
+    if args.checkpoint and args.checkpoint.endswith(".npz"):
+        weights, _ = load_weights(args.checkpoint)
+        reference = NumpyBackend(weights)
+        candidates = []
+        num_features = reference.input_dim
+    else:
+        if TORCH.load() is None:
+            print("torch is required unless --checkpoint points at an .npz export", file=sys.stderr)
+            return 2
+        if args.checkpoint:
+            model, version, featurizer = load_checkpoint(args.checkpoint)
+        else:
+            model, version, featurizer = DiagnosisModel(), "untrained", None
+        if args.export:
+            meta = {"version": version, "input_dim": model.input_dim, "num_classes": model.num_classes}
+            if featurizer is not None:
+                meta["featureStats"] = featurizer.to_stats()
+            save_weights(export_weights(model), args.export, **meta)
+        reference = create_backend("eager", model)
+        candidates = [create_backend("torchscript", model), create_backend("numpy", model)]
+        num_features = model.input_dim
+    report = check_parity(reference, candidates, num_features=num_features, n=args.n, atol=args.atol)
+    print(json.dumps(report, indent=2))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
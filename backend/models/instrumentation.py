@@ -0,0 +1,230 @@
+# Lightweight perf_counter spans feeding in-process Prometheus-style histograms and counters
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+# Seconds; spans range from ~50µs featurization to multi-second OCR
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_METRIC = "ai_stage_duration_seconds"
+
+_ENABLED = True
+_TRACE: ContextVar = ContextVar("ai_stage_trace", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect plus three adds under a lock."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Cumulative bucket counts (last entry is +Inf), sum and count."""
+        with self._lock:
+            counts = list(self._counts)
+            total, n = self._sum, self._count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, n
+
+
+class MetricsRegistry:
+    """Process-wide histograms, counters and pull-time collectors rendered as Prometheus text.
+
+    Collectors are callables returning ``(name, type, help, [(labels, value), ...])``
+    tuples and are evaluated only when ``/metrics`` is scraped.
+    """
+
+    def __init__(self):
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help.setdefault(name, (kind, help_text))
+
+    def histogram(self, name: str, buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram(buckets))
+        return hist
+
+    def observe(self, name: str, value: float, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def register_collector(self, fn):
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            collectors = list(self._collectors)
+
+        def header(name, kind, default_help):
+            kind_, help_text = self._help.get(name, (kind, default_help))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind_}")
+
+        last = None
+        for (name, labels), hist in histograms:
+            if name != last:
+                header(name, "histogram", name)
+                last = name
+            cumulative, total, n = hist.snapshot()
+            bounds = [_fmt(b) for b in hist.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, cumulative):
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_fmt(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {n}")
+
+        last = None
+        for (name, labels), value in counters:
+            if name != last:
+                header(name, "counter", name)
+                last = name
+            lines.append(f"{name}{_labels(labels)} {_fmt(value)}")
+
+        for fn in collectors:
+            try:
+                families = list(fn())
+            except Exception:
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {_fmt(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Tuple, **extra) -> str:
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe(STAGE_METRIC, "histogram", "Wall time spent in each AI service stage.")
+
+# Per-stage histograms resolved once so the hot path is a dict lookup plus observe
+_STAGE_HISTOGRAMS: Dict[str, Histogram] = {}
+
+
+def set_enabled(enabled: bool):
+    global _ENABLED
+    _ENABLED = bool(enabled)
+
+
+def record(stage: str, seconds: float):
+    """Feed one stage duration to its histogram and the current request trace, if any."""
+    if _ENABLED:
+        hist = _STAGE_HISTOGRAMS.get(stage)
+        if hist is None:
+            hist = _STAGE_HISTOGRAMS.setdefault(stage, REGISTRY.histogram(STAGE_METRIC, stage=stage))
+        hist.observe(seconds)
+    trace = _TRACE.get()
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + seconds * 1000
+
+
+class span:
+    """Context manager timing one stage with ``time.perf_counter``.
+
+    ``elapsed_ms`` is available after exit for callers that also report the value.
+    """
+
+    __slots__ = ("stage", "_t0", "elapsed_ms")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.elapsed_ms = 0.0
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._t0
+        self.elapsed_ms = seconds * 1000
+        record(self.stage, seconds)
+        return False
+
+
+def timed(stage: str):
+    """Decorator form of ``span``."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+class trace_stages:
+    """Collect per-stage milliseconds for the current request (contextvar-scoped).
+
+    Spans recorded on other threads (e.g. the micro-batching worker) are not
+    included; the caller's own span around the hand-off covers that time.
+    """
+
+    __slots__ = ("stages", "_token")
+
+    def __enter__(self) -> Dict[str, float]:
+        self.stages = {}
+        self._token = _TRACE.set(self.stages)
+        return self.stages
+
+    def __exit__(self, *exc):
+        _TRACE.reset(self._token)
+        return False
+
+
+def format_stages(stages: Dict[str, float]) -> Dict[str, float]:
+    return {k: round(v, 3) for k, v in stages.items()}
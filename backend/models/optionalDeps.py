@@ -0,0 +1,107 @@
+# Optional heavy dependencies, imported on first use, with cached availability probes and import timings
+import importlib
+import importlib.util
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List
+
+
+class OptionalDependency:
+    """One optional module, imported the first time ``load`` is called.
+
+    ``available`` answers from the module spec without importing anything and
+    is cached, so health checks stay cheap. It turns False once an import has
+    actually failed. ``load`` imports once and records how long that took. It
+    returns the module, or None when it is missing or broken. Callbacks passed
+    to ``on_load`` run once, right after a successful import.
+    """
+
+    def __init__(self, name: str, module: str | None = None):
+        self.name = name
+        self.module = module or name
+        self._lock = threading.Lock()
+        self._installed: bool | None = None
+        self._loaded = False
+        self._value: Any = None
+        self.error: str | None = None
+        self.import_ms: float | None = None
+        self._hooks: List[Callable[[Any], None]] = []
+
+    def installed(self) -> bool:
+        if self._installed is None:
+            try:
+                self._installed = importlib.util.find_spec(self.module) is not None
+            except (ImportError, ValueError):
+                self._installed = False
+        return self._installed
+
+    def available(self) -> bool:
+        return self.installed() and self.error is None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded and self._value is not None
+
+    def on_load(self, callback: Callable[[Any], None]):
+        """Run ``callback(module)`` after the import, or now if it already happened."""
+        with self._lock:
+            if not self._loaded:
+                self._hooks.append(callback)
+                return
+        if self._value is not None:
+            callback(self._value)
+
+    def load(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                try:
+                    self._value = importlib.import_module(self.module) if self.installed() else None
+                except Exception as e:  # installed but broken (missing native libs, version clashes)
+                    self._value = None
+                    self.error = f"{type(e).__name__}: {e}"
+                self.import_ms = round((time.perf_counter() - started) * 1000, 2)
+                if self._value is not None:
+                    for hook in self._hooks:
+                        hook(self._value)
+                self._hooks.clear()
+                self._loaded = True
+        return self._value
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "installed": self.installed(),
+            "loaded": self.loaded,
+            "importMs": self.import_ms,
+            "error": self.error,
+        }
+
+
+_DEPENDENCIES: Dict[str, OptionalDependency] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def optional(name: str, module: str | None = None) -> OptionalDependency:
+    """The shared handle for dependency ``name`` (importing ``module``, default ``name``)."""
+    dep = _DEPENDENCIES.get(name)
+    if dep is None:
+        with _REGISTRY_LOCK:
+            dep = _DEPENDENCIES.setdefault(name, OptionalDependency(name, module))
+    return dep
+
+
+def preload(names: Iterable[str]) -> Dict[str, float | None]:
+    """Import the named dependencies now (e.g. the latency-critical ones); returns import ms per name."""
+    timings = {}
+    for name in names:
+        dep = _DEPENDENCIES.get(name) or optional(name)
+        dep.load()
+        timings[name] = dep.import_ms
+    return timings
+
+
+def capabilities() -> Dict[str, Dict[str, Any]]:
+    """Availability and import state of every registered optional dependency."""
+    return {name: dep.describe() for name, dep in sorted(_DEPENDENCIES.items())}
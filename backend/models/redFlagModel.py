@@ -1,12 +1,209 @@
-# Placeholder for urgent condition detection
+# Declarative red-flag rules compiled into vectorized predicates over check-in batches
+import json
+import os
 
-def detect_red_flags(payload):
-    # naive example
-    vitals = (payload or {}).get('vitals', {})
-    temperature = vitals.get('temperature')
-    flags = []
-    if temperature and temperature >= 39.0:
-        flags.append({ 'condition': 'Hyperpyrexia', 'triggered': True, 'rationale': ['temperature >= 39C'] })
-    return flags
+try:
+    import numpy as _np
+except Exception:
+    _np = None
+
+try:
+    from backend.models.diagnosisModel import FEATURE_SPEC
+except Exception:
+    from diagnosisModel import FEATURE_SPEC
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "redFlagRules.json")
+
+_OPS = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+def _predicate_label(pred) -> str:
+    return pred.get("label") or f"{pred['field']} {pred['op']} {float(pred['value']):g}"
+
+
+class RedFlagEngine:
+    """Red-flag rules compiled once into array operations over an (N, F) raw-value batch.
+
+    A rule is a list of criteria plus a threshold: ``all`` needs every criterion,
+    ``any`` needs one, and ``atLeast``/``of`` needs k of them (qSOFA, SIRS). A
+    criterion is a single ``{field, op, value}`` predicate or an ``any`` group of
+    them. Evaluation is one comparison per operator over all predicates, then two
+    small matrix products (predicates → criteria → rules), so the cost per batch
+    grows with array width, not with Python branching per rule. Missing values
+    never satisfy a predicate. ``aliases`` maps a field to alternate payload keys
+    read when the field itself is absent.
+    """
+
+    def __init__(self, rules, aliases=None, version: str = "unversioned"):
+        if _np is None:
+            raise RuntimeError("numpy is required for the red-flag engine")
+        self.version = str(version)
+        self.conditions = []
+        fields, pred_field, pred_op, pred_value = [], [], [], []
+        crit_preds, crit_labels, rule_crits, required = [], [], [], []
+
+        def field_index(name):
+            if name not in fields:
+                fields.append(name)
+            return fields.index(name)
+
+        def add_predicate(pred):
+            if pred.get("op") not in _OPS or "field" not in pred or "value" not in pred:
+                raise ValueError(f"invalid red-flag predicate: {pred}")
+            pred_field.append(field_index(pred["field"]))
+            pred_op.append(pred["op"])
+            pred_value.append(float(pred["value"]))
+            return len(pred_field) - 1
+
+        for rule in rules:
+            if "all" in rule:
+                criteria, need = rule["all"], len(rule["all"])
+            elif "any" in rule:
+                criteria, need = rule["any"], 1
+            elif "of" in rule:
+                criteria, need = rule["of"], int(rule.get("atLeast", 1))
+            else:
+                raise ValueError(f"red-flag rule needs all/any/of: {rule.get('condition')}")
+            crits = []
+            for criterion in criteria:
+                if "any" in criterion:
+                    preds = [add_predicate(p) for p in criterion["any"]]
+                    label = criterion.get("label") or " or ".join(_predicate_label(p) for p in criterion["any"])
+                else:
+                    preds = [add_predicate(criterion)]
+                    label = _predicate_label(criterion)
+                crit_preds.append(preds)
+                crit_labels.append(label)
+                crits.append(len(crit_labels) - 1)
+            self.conditions.append(rule["condition"])
+            rule_crits.append(crits)
+            required.append(need)
+
+        self.fields = list(fields)
+        # Alias columns are appended after the primary fields and coalesced into them
+        self._alias_pairs = []
+        read_fields = list(fields)
+        for name, alternates in (aliases or {}).items():
+            if name not in fields:
+                continue
+            for alt in alternates:
+                read_fields.append(alt)
+                self._alias_pairs.append((fields.index(name), len(read_fields) - 1))
+        # Same lookup as the featurizer: known features from their section, others from vitals, then labs
+        spec = dict((key, src) for src, key in FEATURE_SPEC)
+        self._read_index = tuple((spec.get(name), name) for name in read_fields)
+
+        n_pred, n_crit, n_rule = len(pred_field), len(crit_labels), len(rule_crits)
+        self._pred_field = _np.asarray(pred_field, dtype=_np.intp)
+        self._pred_value = _np.asarray(pred_value, dtype=_np.float32)
+        self._op_groups = [
+            (_OPS[op], _np.flatnonzero(_np.asarray(pred_op) == op)) for op in sorted(set(pred_op))
+        ]
+        self._pred_to_crit = _np.zeros((n_pred, n_crit), dtype=_np.float32)
+        for c, preds in enumerate(crit_preds):
+            self._pred_to_crit[preds, c] = 1.0
+        self._crit_to_rule = _np.zeros((n_crit, n_rule), dtype=_np.float32)
+        for r, crits in enumerate(rule_crits):
+            self._crit_to_rule[crits, r] = 1.0
+        self._required = _np.asarray(required, dtype=_np.float32)
+        self._crit_labels = crit_labels
+        self._rule_crits = [_np.asarray(c, dtype=_np.intp) for c in rule_crits]
 
+    @classmethod
+    def from_config(cls, config: dict) -> "RedFlagEngine":
+        return cls(config.get("rules") or [], aliases=config.get("aliases"), version=config.get("version", "unversioned"))
 
+    @classmethod
+    def from_file(cls, path: str) -> "RedFlagEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_config(json.load(f))
+
+    @classmethod
+    def load_default(cls) -> "RedFlagEngine":
+        """Load rules from AI_RED_FLAG_RULES_PATH or the bundled redFlagRules.json."""
+        return cls.from_file(os.environ.get("AI_RED_FLAG_RULES_PATH") or DEFAULT_RULES_PATH)
+
+    def raw_values(self, payloads):
+        """(N, F) float32 raw values for the rule fields; missing or malformed values are NaN.
+
+        Each value is coerced on its own, so one malformed field never hides the
+        rules that only read other fields.
+        """
+        raw = _np.full((len(payloads), len(self._read_index)), _np.nan, dtype=_np.float32)
+        for i, payload in enumerate(payloads):
+            payload = payload or {}
+            vitals = payload.get("vitals") or {}
+            labs = payload.get("labs") or {}
+            row = raw[i]
+            for j, (src, key) in enumerate(self._read_index):
+                if src == "labs":
+                    v = labs.get(key)
+                elif src == "vitals":
+                    v = vitals.get(key)
+                else:
+                    v = vitals.get(key, labs.get(key))
+                if v is None:
+                    continue
+                try:
+                    row[j] = float(v)
+                except (TypeError, ValueError):
+                    pass
+        for primary, alt in self._alias_pairs:
+            col = raw[:, primary]
+            _np.copyto(col, raw[:, alt], where=_np.isnan(col))
+        return raw[:, : len(self.fields)]
+
+    def evaluate(self, raw):
+        """Triggered-rule matrix (N, R) plus per-criterion hits (N, C) for an (N, F) raw batch."""
+        values = raw[:, self._pred_field]
+        hits = _np.zeros(values.shape, dtype=bool)
+        for op, cols in self._op_groups:
+            hits[:, cols] = op(values[:, cols], self._pred_value[cols])
+        hits &= ~_np.isnan(values)
+        crit_hits = (hits.astype(_np.float32) @ self._pred_to_crit) > 0
+        counts = crit_hits.astype(_np.float32) @ self._crit_to_rule
+        return counts >= self._required, crit_hits
+
+    def detect(self, payloads):
+        """Red flags for each payload, as lists of ``{condition, triggered, rationale}``."""
+        out = [[] for _ in payloads]
+        if not payloads or not self.conditions:
+            return out
+        triggered, crit_hits = self.evaluate(self.raw_values(payloads))
+        for n, r in _np.argwhere(triggered):
+            crits = self._rule_crits[r]
+            out[n].append({
+                "condition": self.conditions[r],
+                "triggered": True,
+                "rationale": [self._crit_labels[c] for c in crits[crit_hits[n, crits]]],
+            })
+        return out
+
+
+_ENGINE = None
+
+
+def get_red_flag_engine():
+    """Process-wide rule engine, compiled on first use."""
+    global _ENGINE
+    if _ENGINE is None and _np is not None:
+        _ENGINE = RedFlagEngine.load_default()
+    return _ENGINE
+
+
+def detect_red_flags_batch(payloads):
+    engine = get_red_flag_engine()
+    if engine is None:
+        return [[] for _ in payloads]
+    return engine.detect([p or {} for p in payloads])
+
+
+def detect_red_flags(payload):
+    return detect_red_flags_batch([payload])[0]
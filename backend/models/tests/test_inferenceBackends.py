@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from backend.models.inferenceBackends import (
+    NumpyBackend, check_parity, create_backend, export_weights, load_weights, save_weights,
+)
+
+
+def _random_weights(num_features=8, hidden=16, num_classes=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "w0": rng.standard_normal((hidden, num_features)).astype(np.float32),
+        "b0": rng.standard_normal(hidden).astype(np.float32),
+        "w1": rng.standard_normal((num_classes, hidden)).astype(np.float32),
+        "b1": rng.standard_normal(num_classes).astype(np.float32),
+    }
+
+
+def _inputs(n=64, num_features=8, seed=1):
+    return np.random.default_rng(seed).standard_normal((n, num_features), dtype=np.float32) * 2.0
+
+
+def test_numpy_probabilities_are_normalized():
+    probs = NumpyBackend(_random_weights()).predict_proba(_inputs())
+    assert probs.shape == (64, 3)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, rtol=1e-5)
+
+
+def test_npz_round_trip_keeps_predictions(tmp_path):
+    weights = _random_weights()
+    path = str(tmp_path / "v1.npz")
+    save_weights(weights, path, version="v1", featureStats={"version": "s1"})
+    loaded, meta = load_weights(path)
+    assert meta == {"version": "v1", "featureStats": {"version": "s1"}}
+    x = _inputs()
+    np.testing.assert_array_equal(NumpyBackend(weights).predict_proba(x), NumpyBackend(loaded).predict_proba(x))
+
+
+def test_torch_backends_without_torch_model_fall_back_to_numpy():
+    for name in ("auto", "eager", "torchscript", "numpy"):
+        assert create_backend(name, None, _random_weights()).name == "numpy"
+
+
+@pytest.fixture
+def torch_model():
+    pytest.importorskip("torch")
+    from backend.models.diagnosisModel import create_model
+
+    return create_model(device="cpu")
+
+
+def test_backends_agree(torch_model):
+    reference = create_backend("eager", torch_model)
+    candidates = [create_backend("torchscript", torch_model), create_backend("numpy", torch_model)]
+    report = check_parity(reference, candidates, n=256, atol=1e-5)
+    assert report["ok"], report
+
+
+def test_exported_npz_matches_eager(torch_model, tmp_path):
+    path = str(tmp_path / "v1.npz")
+    save_weights(export_weights(torch_model), path, version="v1")
+    weights, _ = load_weights(path)
+    x = _inputs()
+    np.testing.assert_allclose(
+        NumpyBackend(weights).predict_proba(x), create_backend("eager", torch_model).predict_proba(x), atol=1e-5,
+    )
@@ -0,0 +1,36 @@
+from backend.models.ai_service.labExtraction import LabExtractor
+
+
+def _labs(text):
+    return {lab["name"]: lab for lab in LabExtractor().extract(text)}
+
+
+def test_dash_separator():
+    labs = _labs("Glucose - 110 mg/dL")
+    assert labs["glucose"]["value"] == 110.0
+    assert labs["glucose"]["rawUnit"] == "mg/dL"
+
+
+def test_dash_before_value_is_not_a_sign():
+    assert _labs("Sodium -140 mmol/L")["sodium"]["value"] == 140.0
+    assert _labs("Sodium – 140 mmol/L")["sodium"]["value"] == 140.0
+
+
+def test_hyphenated_name_is_not_a_reading():
+    assert _labs("Glucose-6-phosphate dehydrogenase normal") == {}
+
+
+def test_hyphenated_name_does_not_hide_later_reading():
+    labs = _labs("Glucose-6-phosphate dehydrogenase normal\nGlucose 110 mg/dL")
+    assert labs["glucose"]["value"] == 110.0
+
+
+def test_most_confident_match_wins():
+    labs = _labs("Glucose 7\nFasting glucose: 110 mg/dL")
+    assert labs["glucose"]["value"] == 110.0
+
+
+def test_urea_and_bun_are_separate():
+    labs = _labs("BUN 6.4 mmol/L\nSerum urea 6.7 mmol/L")
+    assert round(labs["bun"]["value"], 2) == 17.92
+    assert round(labs["urea"]["value"], 2) == 40.24
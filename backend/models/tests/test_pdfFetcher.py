@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from backend.models.ai_service.pdfFetcher import FetchTooLarge, PdfFetcher  # noqa: E402
+
+
+def _pdf(text: str) -> bytes:
+    """A one-page PDF with ``text`` in its text layer."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+REPORT = _pdf("Glucose: 110 mg/dL")
+BIG = b"x" * 4096
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        _Handler.hits[self.path] = _Handler.hits.get(self.path, 0) + 1
+        if self.path == "/report.pdf":
+            etag = '"%s"' % hashlib.sha256(REPORT).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self._send(REPORT, {"ETag": etag, "Content-Length": str(len(REPORT))})
+        elif self.path == "/declared-big.pdf":
+            self._send(BIG, {"Content-Length": str(len(BIG))})
+        elif self.path == "/streamed-big.pdf":
+            self._send(BIG, {})  # no Content-Length: the body ends when the connection closes
+        else:
+            self.send_error(404)
+
+    def _send(self, body, headers):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return PdfFetcher(cache_dir=str(tmp_path), max_bytes=1024)
+
+
+def test_first_fetch_downloads(server, fetcher):
+    result = fetcher.fetch(server + "/report.pdf")
+    assert (result.status, result.revalidated, result.size) == (200, False, len(REPORT))
+    with open(result.path, "rb") as f:
+        assert f.read() == REPORT
+    assert result.hasher.hexdigest() == hashlib.sha256(REPORT).hexdigest()
+    assert result.fetch_ms >= 0
+    fetcher.release(result)
+    assert not os.path.exists(result.path)
+
+
+def test_revalidation_hits_cache(server, fetcher):
+    first = fetcher.fetch(server + "/report.pdf")
+    second = fetcher.fetch(server + "/report.pdf")
+    assert (second.status, second.revalidated) == (304, True)
+    assert second.path != first.path
+    with open(second.path, "rb") as f:
+        assert f.read() == REPORT
+    assert second.hasher.hexdigest() == first.hasher.hexdigest()
+    stats = fetcher.stats()
+    assert (stats["requests"], stats["revalidated"], stats["downloadedBytes"]) == (2, 1, len(REPORT))
+    fetcher.release(first)
+    fetcher.release(second)
+
+
+@pytest.mark.parametrize("path", ["/declared-big.pdf", "/streamed-big.pdf"])
+def test_max_bytes(server, fetcher, path):
+    with pytest.raises(FetchTooLarge):
+        fetcher.fetch(server + path)
+    assert [n for n in os.listdir(fetcher.cache_dir) if n.endswith(".part")] == []
+
+
+def test_extract_from_pdf_reports_fetch_and_timings(server):
+    pytest.importorskip("pdfminer")
+    from fastapi.testclient import TestClient
+
+    from backend.models.ai_service.main import app
+
+    with TestClient(app) as client:
+        body = client.post("/extract_from_pdf", json={"url": server + "/report.pdf"}).json()
+        again = client.post("/extract_from_pdf", json={"url": server + "/report.pdf"}).json()
+    assert body["ok"], body
+    assert body["fetch"]["sizeBytes"] == len(REPORT)
+    assert body["timings"]["fetchMs"] >= 0
+    assert "pdfminerMs" in body["timings"] or body["cached"]
+    assert again["fetch"] == {"status": 304, "revalidated": True, "sizeBytes": len(REPORT)}
+    assert again["cached"] is True
+    assert [lab["name"] for lab in body["extracted"]["labs"]] == ["glucose"]
@@ -0,0 +1,27 @@
+from backend.models.redFlagModel import detect_red_flags, detect_red_flags_batch, get_red_flag_engine
+
+
+def _conditions(payload):
+    return {flag["condition"] for flag in detect_red_flags(payload)}
+
+
+def test_malformed_field_leaves_other_rules_working():
+    assert "Hyperpyrexia" in _conditions({"vitals": {"temperature": 41, "heartRate": "abc"}})
+
+
+def test_malformed_field_is_missing_on_its_own():
+    raw = get_red_flag_engine().raw_values([{"vitals": {"temperature": 41, "heartRate": "abc"}}])
+    fields = get_red_flag_engine().fields
+    assert raw[0, fields.index("temperature")] == 41
+    assert raw[0, fields.index("heartRate")] != raw[0, fields.index("heartRate")]  # NaN
+
+
+def test_alias_fills_missing_field():
+    assert "Hypoxemia" in _conditions({"vitals": {"spo2": 85}})
+
+
+def test_batch_keeps_items_independent():
+    flags = detect_red_flags_batch([{"vitals": {"heartRate": [1]}}, {"vitals": {"temperature": 41}}, None])
+    assert flags[0] == []
+    assert [f["condition"] for f in flags[1]] == ["Hyperpyrexia"]
+    assert flags[2] == []
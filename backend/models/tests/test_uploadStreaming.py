@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from backend.models.ai_service import uploadStreaming
+from backend.models.ai_service.deadlines import DeadlineExceeded, deadline_scope
+from backend.models.ai_service.uploadStreaming import UploadTooLarge, receive_upload
+
+
+class _Request:
+    def __init__(self, body: bytes, content_type: str, chunk: int = 4096, declare: bool = True):
+        self.headers = {"content-type": content_type}
+        if declare:
+            self.headers["content-length"] = str(len(body))
+        self._chunks = [body[i:i + chunk] for i in range(0, len(body), chunk)]
+
+    async def stream(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+def _receive(request, max_bytes=1 << 20):
+    return asyncio.run(receive_upload(request, max_bytes))
+
+
+def test_raw_body_spooled_and_hashed():
+    body = os.urandom(600 * 1024)
+    upload = _receive(_Request(body, "application/pdf"), max_bytes=len(body))
+    try:
+        with open(upload.path, "rb") as f:
+            assert f.read() == body
+        assert (upload.size, upload.mime) == (len(body), "application/pdf")
+        assert upload.hasher.hexdigest() == hashlib.sha256(body).hexdigest()
+    finally:
+        upload.cleanup()
+
+
+def test_multipart_fields_and_file():
+    pytest.importorskip("python_multipart")
+    doc = os.urandom(300 * 1024)
+    body = (
+        b"--xyz\r\nContent-Disposition: form-data; name=\"lang\"\r\n\r\ndeu\r\n"
+        b"--xyz\r\nContent-Disposition: form-data; name=\"file\"; filename=\"r.pdf\"\r\n"
+        b"Content-Type: application/pdf\r\n\r\n" + doc + b"\r\n--xyz--\r\n"
+    )
+    upload = _receive(_Request(body, "multipart/form-data; boundary=xyz"))
+    try:
+        with open(upload.path, "rb") as f:
+            assert f.read() == doc
+        assert (upload.filename, upload.mime, upload.fields) == ("r.pdf", "application/pdf", {"lang": "deu"})
+        assert upload.hasher.hexdigest() == hashlib.sha256(doc).hexdigest()
+    finally:
+        upload.cleanup()
+
+
+def test_writes_run_off_the_event_loop(monkeypatch):
+    threads = set()
+    write = uploadStreaming.SpooledUpload.write
+
+    def recording_write(self, data):
+        threads.add(threading.get_ident())
+        write(self, data)
+
+    monkeypatch.setattr(uploadStreaming.SpooledUpload, "write", recording_write)
+    upload = _receive(_Request(b"x" * 100_000, "application/octet-stream"))
+    upload.cleanup()
+    assert threads and threading.get_ident() not in threads
+
+
+@pytest.mark.parametrize("declare", [True, False])
+def test_too_large(declare):
+    with pytest.raises(UploadTooLarge):
+        _receive(_Request(b"x" * 10_000, "application/pdf", declare=declare), max_bytes=5_000)
+
+
+def test_deadline_checked_while_receiving():
+    async def run():
+        with deadline_scope(time.monotonic() - 1):
+            await receive_upload(_Request(b"x" * 10_000, "application/pdf"), 1 << 20)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
@@ -0,0 +1,420 @@
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+# Allow `python backend/scripts/bulkScore.py` from the project root as well as `-m`
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from backend.models.diagnosisModel import LABELS, get_featurizer  # noqa: E402
+from backend.models.redFlagModel import detect_red_flags_batch  # noqa: E402
+from backend.models.explainabilityUtils import compute_attributions_batch  # noqa: E402
+from backend.models.optionalDeps import optional  # noqa: E402
+from backend.models.ai_service import settings  # noqa: E402
+from backend.models.ai_service.modelRegistry import ModelRegistry, list_checkpoints  # noqa: E402
+
+# Imported by a worker only when it loads a .pt checkpoint; scoring an .npz export never needs it
+TORCH = optional('torch')
+PARQUET = optional('pyarrow', 'pyarrow.parquet')
+FORMATS = ('jsonl', 'csv', 'parquet')
+
+# Offline bulk scoring of check-in exports with the service's model, featurizer and red-flag rules.
+#
+# Input (JSONL, one check-in per line, or CSV) is read in chunks of
+# --chunk-size records. Spawned worker processes each load the pinned model
+# version once, then featurize, score, flag and optionally explain whole
+# chunks and serialize their output rows. The parent writes chunks in input
+# order and records a checkpoint after each one, so an interrupted run
+# continues with --resume where it stopped. At most 2 x workers chunks are in
+# flight, so memory does not grow with the export.
+
+_WORKER = None
+
+
+def _init_worker(model_dir, version, backend, explain, fmt, id_field):
+    global _WORKER
+    # One process per core; see the thread env exported in run()
+    TORCH.on_load(lambda torch: torch.set_num_threads(1))
+    handle = ModelRegistry(model_dir, warm=False, backend=backend).reload(version)
+    _WORKER = {
+        'handle': handle,
+        'featurizer': handle.featurizer or get_featurizer(),
+        'explain': explain if explain != 'none' and getattr(handle.model, '_has_torch', False) else None,
+        'format': fmt,
+        'idField': id_field,
+    }
+
+
+def record_to_payload(record):
+    """The check-in payload of one export record: the record itself, or its ``payload``/``input`` object."""
+    if not isinstance(record, dict):
+        return None
+    for key in ('payload', 'input'):
+        if isinstance(record.get(key), dict):
+            return record[key]
+    return record
+
+
+def csv_to_record(row):
+    """Nest ``vitals.<name>``/``labs.<name>`` columns; ``vitals``/``labs`` columns may hold JSON objects."""
+    record = {}
+    for key, value in row.items():
+        if key is None or value is None or value == '':
+            continue
+        group, dot, name = key.partition('.')
+        if dot and group in ('vitals', 'labs'):
+            record.setdefault(group, {})[name] = value
+        elif key in ('vitals', 'labs'):
+            record.setdefault(key, {}).update(json.loads(value))
+        else:
+            record[key] = value
+    return record
+
+
+def _csv_item(row):
+    try:
+        return csv_to_record(row)
+    except ValueError as e:
+        return e  # reported on the row's output line by the worker
+
+
+def iter_chunks(path, fmt, chunk_size):
+    """Yield ``(first_row, items)`` chunks; items are raw JSON lines, or CSV rows as nested records."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            rows = (_csv_item(row) for row in csv.DictReader(f))
+        else:
+            rows = (line for line in f if line.strip())
+        chunk, first = [], 0
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield first, chunk
+                first += len(chunk)
+                chunk = []
+        if chunk:
+            yield first, chunk
+
+
+def output_columns(features):
+    return (['row', 'id', 'modelVersion', 'topLabel', 'confidence'] + [f'p_{label}' for label in LABELS]
+            + ['redFlags'] + [f'attr_{name}' for name in features] + ['error'])
+
+
+def _flatten(row, features):
+    flat = {k: row.get(k) for k in ('row', 'id', 'modelVersion', 'topLabel', 'confidence', 'error')}
+    for label in LABELS:
+        flat[f'p_{label}'] = (row.get('probabilities') or {}).get(label)
+    flat['redFlags'] = ';'.join(row.get('redFlags') or [])
+    attrs = row.get('attributions') or {}
+    for name in features:
+        flat[f'attr_{name}'] = attrs.get(name)
+    return flat
+
+
+def score_chunk(first_row, items):
+    """Worker task: score one chunk; returns ``(output, rows, errors)`` with output already serialized."""
+    handle, featurizer = _WORKER['handle'], _WORKER['featurizer']
+    id_field = _WORKER['idField']
+    rows, payloads, live = [], [], []
+    for offset, item in enumerate(items):
+        row = {'row': first_row + offset, 'id': None, 'modelVersion': handle.version}
+        try:
+            if isinstance(item, Exception):
+                raise item
+            record = json.loads(item) if isinstance(item, str) else item
+            payload = record_to_payload(record)
+            if payload is None:
+                raise ValueError('record is not an object')
+            row['id'] = record.get(id_field)
+            payloads.append(payload)
+            live.append(len(rows))
+        except ValueError as e:
+            row['error'] = str(e)
+        rows.append(row)
+
+    if payloads:
+        x, errors = featurizer.featurize(payloads, strict=False)
+        ok = [i for i, err in enumerate(errors) if err is None]
+        for i, err in enumerate(errors):
+            if err is not None:
+                rows[live[i]]['error'] = err
+        if ok:
+            x_ok = x[ok] if len(ok) < len(payloads) else x
+            probs = handle.backend.predict_proba(x_ok)
+            top = probs.argmax(axis=1)
+            for r, i in enumerate(ok):
+                rows[live[i]].update(
+                    topLabel=LABELS[int(top[r])],
+                    confidence=round(float(probs[r, top[r]]), 6),
+                    probabilities={label: round(float(p), 6) for label, p in zip(LABELS, probs[r])},
+                )
+            if _WORKER['explain']:
+                x_t = TORCH.load().from_numpy(np.ascontiguousarray(x_ok)).to(getattr(handle.model, 'device', 'cpu'))
+                attrs = compute_attributions_batch(handle.model, x_t, [int(t) for t in top], method=_WORKER['explain'])
+                for r, i in enumerate(ok):
+                    if attrs and attrs[r] is not None:
+                        rows[live[i]]['attributions'] = {
+                            name: round(float(v), 6) for name, v in zip(featurizer.features, attrs[r])
+                        }
+        for i, flags in enumerate(detect_red_flags_batch(payloads)):
+            rows[live[i]]['redFlags'] = [flag['condition'] for flag in flags]
+
+    errors = sum(1 for row in rows if row.get('error'))
+    fmt = _WORKER['format']
+    if fmt == 'jsonl':
+        return ''.join(json.dumps(row) + '\n' for row in rows).encode('utf-8'), len(rows), errors
+    flat = [_flatten(row, featurizer.features) for row in rows]
+    if fmt == 'parquet':
+        return flat, len(rows), errors
+    buf = io.StringIO()
+    csv.DictWriter(buf, fieldnames=output_columns(featurizer.features)).writerows(flat)
+    return buf.getvalue().encode('utf-8'), len(rows), errors
+
+
+def run_ordered(executor, workers, task, chunks):
+    """Map ``task`` over chunks with at most 2 x workers in flight, yielding results in input order."""
+    window = max(1, workers * 2)
+    pending = []
+    for args in chunks:
+        pending.append(executor.submit(task, *args))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    while pending:
+        fut = pending[0]
+        if not fut.done():
+            wait([fut], return_when=FIRST_COMPLETED)
+        yield pending.pop(0).result()
+
+
+class Checkpoint:
+    """Progress of a run, rewritten atomically after every chunk the output holds in full."""
+
+    def __init__(self, path, state):
+        self.path = path
+        self.state = state
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(path, json.load(f))
+
+    def save(self):
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class OutputWriter:
+    """Appends scored chunks to one JSONL/CSV file, or writes one parquet file per chunk into a directory."""
+
+    def __init__(self, path, fmt, features):
+        self.path = path
+        self.fmt = fmt
+        self.features = features
+        self._file = None
+
+    def open(self, resume_bytes=None, fresh=True):
+        if self.fmt == 'parquet':
+            if PARQUET.load() is None:
+                raise RuntimeError('parquet output needs pyarrow (pip install pyarrow)')
+            os.makedirs(self.path, exist_ok=True)
+            if fresh:
+                for name in os.listdir(self.path):
+                    if name.startswith('part-') and name.endswith('.parquet'):
+                        os.unlink(os.path.join(self.path, name))
+            return
+        if fresh:
+            self._file = open(self.path, 'wb')
+            if self.fmt == 'csv':
+                header = io.StringIO()
+                csv.DictWriter(header, fieldnames=output_columns(self.features)).writeheader()
+                self._file.write(header.getvalue().encode('utf-8'))
+        else:
+            # Drop whatever an interrupted run wrote after its last checkpoint
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(resume_bytes)
+            self._file.seek(resume_bytes)
+
+    def write(self, index, output):
+        if self.fmt == 'parquet':
+            pq = PARQUET.load()
+            pa = sys.modules['pyarrow']
+            part = os.path.join(self.path, f'part-{index:06d}.parquet')
+            pq.write_table(pa.Table.from_pylist(output), part + '.tmp')
+            os.replace(part + '.tmp', part)
+            return
+        self._file.write(output)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def tell(self):
+        return self._file.tell() if self._file is not None else None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def resolve_version(model_dir, version):
+    if version:
+        return version
+    versions = list_checkpoints(model_dir)
+    return versions[-1] if versions else None
+
+
+def _detect_format(path, explicit, options):
+    if explicit:
+        return explicit
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return ext if ext in options else options[0]
+
+
+def run(args):
+    started = time.perf_counter()
+    input_fmt = _detect_format(args.input, args.input_format, ('jsonl', 'csv'))
+    fmt = _detect_format(args.output, args.format, FORMATS)
+    checkpoint_path = args.output.rstrip('/\\') + '.checkpoint.json'
+    settings_key = {
+        'input': os.path.abspath(args.input),
+        'inputFormat': input_fmt,
+        'format': fmt,
+        'chunkSize': args.chunk_size,
+        'explain': args.explain,
+        'idField': args.id_field,
+    }
+
+    if args.resume and os.path.exists(checkpoint_path):
+        checkpoint = Checkpoint.load(checkpoint_path)
+        mismatched = [k for k, v in settings_key.items() if checkpoint.state.get(k) != v]
+        if mismatched:
+            print(f'Cannot resume: {", ".join(mismatched)} do not match {checkpoint_path}.', file=sys.stderr)
+            return 2
+        version = checkpoint.state['modelVersion']
+        if args.model_version and args.model_version != version:
+            print(f'Cannot resume: the checkpoint was scored with model {version}.', file=sys.stderr)
+            return 2
+        resume_bytes = checkpoint.state.get('outputBytes')
+        fresh = False
+    else:
+        if os.path.exists(args.output) and not args.overwrite:
+            print(f'{args.output} exists; pass --resume to continue that run or --overwrite to replace it.',
+                  file=sys.stderr)
+            return 2
+        version = resolve_version(args.model_dir, args.model_version)
+        if version is None:
+            print(f'No checkpoint in {args.model_dir}; train or export one first.', file=sys.stderr)
+            return 2
+        checkpoint = Checkpoint(checkpoint_path, dict(settings_key, modelVersion=version, chunksDone=0, rows=0,
+                                                      errors=0, outputBytes=None))
+        resume_bytes = None
+        fresh = True
+
+    # Load the version here too, so a missing or unservable checkpoint fails before any worker starts
+    try:
+        handle = ModelRegistry(args.model_dir, warm=False, backend=args.backend).reload(version)
+    except Exception as e:
+        print(f'Cannot load model {version}: {e}', file=sys.stderr)
+        return 2
+    if handle.backend is None:
+        print(f'Model {version} has no inference backend in this environment.', file=sys.stderr)
+        return 2
+    if args.explain != 'none' and not getattr(handle.model, '_has_torch', False):
+        print(f'Model {version} cannot be explained without torch; scoring without attributions.', file=sys.stderr)
+    features = list((handle.featurizer or get_featurizer()).features)
+
+    writer = OutputWriter(args.output, fmt, features)
+    try:
+        writer.open(resume_bytes, fresh)
+    except (OSError, RuntimeError) as e:
+        print(f'Cannot open {args.output}: {e}', file=sys.stderr)
+        return 2
+    if fresh:
+        checkpoint.state['outputBytes'] = writer.tell()
+        checkpoint.save()
+
+    done = checkpoint.state['chunksDone']
+    rows_before = checkpoint.state['rows']
+    chunks = iter_chunks(args.input, input_fmt, args.chunk_size)
+    for _ in range(done):
+        if next(chunks, None) is None:
+            break
+
+    # One single-threaded process per core: pin native thread pools before the workers start
+    os.environ.update(settings.thread_env(1))
+    ctx = multiprocessing.get_context('spawn')
+    initargs = (args.model_dir, version, args.backend, args.explain, fmt, args.id_field)
+    last_report = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=initargs) as ex:
+            for output, rows, errors in run_ordered(ex, args.workers, score_chunk, chunks):
+                writer.write(done, output)
+                done += 1
+                checkpoint.state.update(chunksDone=done, rows=checkpoint.state['rows'] + rows,
+                                        errors=checkpoint.state['errors'] + errors, outputBytes=writer.tell())
+                checkpoint.save()
+                now = time.perf_counter()
+                if now - last_report >= args.progress_every:
+                    last_report = now
+                    scored = checkpoint.state['rows'] - rows_before
+                    print(json.dumps({'chunks': done, 'rows': checkpoint.state['rows'],
+                                      'rowsPerSec': round(scored / (now - started), 1)}), file=sys.stderr)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    scored = checkpoint.state['rows'] - rows_before
+    summary = {
+        'output': args.output,
+        'format': fmt,
+        'modelVersion': version,
+        'rows': checkpoint.state['rows'],
+        'scoredThisRun': scored,
+        'errors': checkpoint.state['errors'],
+        'chunks': done,
+        'workers': args.workers,
+        'seconds': round(elapsed, 2),
+        'rowsPerSec': round(scored / elapsed, 1) if elapsed > 0 else None,
+    }
+    print(json.dumps(summary))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a check-in export (JSONL or CSV) with DiagnosisModel offline.')
+    parser.add_argument('--input', required=True, help='check-in export (.jsonl, or .csv with vitals.*/labs.* columns)')
+    parser.add_argument('--output', required=True, help='.jsonl or .csv file, or a directory of parquet parts')
+    parser.add_argument('--input-format', choices=('jsonl', 'csv'), help='default: from the input extension')
+    parser.add_argument('--format', choices=FORMATS, help='output format (default: from the output extension)')
+    parser.add_argument('--model-dir', default=settings.MODEL_DIR, help='checkpoint directory (default: AI_MODEL_DIR)')
+    parser.add_argument('--model-version', help='checkpoint version (default: newest; pinned in the checkpoint)')
+    parser.add_argument('--backend', default=settings.INFERENCE_BACKEND, help='inference backend (default: AI_INFERENCE_BACKEND)')
+    parser.add_argument('--explain', default='none', choices=('none', 'auto', 'captum', 'shap'),
+                        help='attributions for the top label (needs torch)')
+    parser.add_argument('--id-field', default='id', help='record field copied to the output id column')
+    parser.add_argument('--chunk-size', type=int, default=8192, help='records per scoring task')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--resume', action='store_true', help='continue from <output>.checkpoint.json')
+    parser.add_argument('--overwrite', action='store_true', help='replace an existing output')
+    parser.add_argument('--progress-every', type=float, default=10.0, help='seconds between progress lines on stderr')
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+
+    if not os.path.exists(args.input):
+        print(f'No export found at {args.input}.', file=sys.stderr)
+        return 2
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
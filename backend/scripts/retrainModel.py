@@ -1,27 +1,394 @@
+import argparse
 import json
 import os
+import sys
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
 
-# Simple retraining stub that reads feedback_export.json and prints summary
-def main():
-    path = os.path.join(os.getcwd(), 'feedback_export.json')
-    if not os.path.exists(path):
-        print('No feedback_export.json found. Nothing to retrain.')
-        return
-    try:
+import numpy as np
+
+# Allow `python backend/scripts/retrainModel.py` from the project root as well as `-m`
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+from backend.models.diagnosisModel import FEATURE_NAMES, LABELS, DiagnosisModel, Featurizer, get_featurizer  # noqa: E402
+from backend.models.inferenceBackends import export_weights, save_weights  # noqa: E402
+
+try:
+    import torch
+    import torch.nn.functional as F
+except Exception:
+    torch = None
+    F = None
+
+DEFAULT_INPUTS = ('feedback_export.jsonl', 'feedback_export.json')
+DEFAULT_OUT_DIR = os.environ.get('AI_MODEL_DIR') or os.path.join(_ROOT, 'backend', 'models', 'checkpoints')
+
+# Streaming, incremental retraining from HITL feedback.
+#
+# Feedback is read line by line from JSONL (one {userId, feedback, createdAt}
+# record per line, as appended by the backend) in chunks of --chunk-size lines.
+# Worker processes parse and featurize chunks with the service's Featurizer
+# while the parent trains on the previous ones, so memory stays bounded by
+# roughly (2 x workers + 1) chunks regardless of export size.
+
+_LABEL_INDEX = {name.lower(): i for i, name in enumerate(LABELS)}
+_WORKER_FEATURIZER = None
+
+
+def record_to_example(record):
+    """Map one feedback record to (payload, label_index), or None when it is unusable.
+
+    The label is read from feedback.label / correctLabel / diagnosis (a label
+    name or index); vitals and labs from feedback, feedback.input or feedback.payload.
+    """
+    feedback = record.get('feedback') if isinstance(record, dict) else None
+    if not isinstance(feedback, dict):
+        return None
+    label = None
+    for key in ('label', 'correctLabel', 'diagnosis', 'labelIndex'):
+        if feedback.get(key) is not None:
+            label = feedback[key]
+            break
+    if isinstance(label, dict):
+        label = label.get('label')
+    if isinstance(label, str):
+        label = _LABEL_INDEX.get(label.strip().lower())
+    if not isinstance(label, int) or not (0 <= label < len(LABELS)):
+        return None
+    source = feedback
+    for key in ('input', 'payload'):
+        if isinstance(feedback.get(key), dict):
+            source = feedback[key]
+            break
+    vitals, labs = source.get('vitals'), source.get('labs')
+    if not vitals and not labs:
+        return None
+    return {'vitals': vitals or {}, 'labs': labs or {}}, label
+
+
+def iter_line_chunks(path, chunk_size):
+    """Yield lists of raw JSON lines; a legacy JSON array file is re-serialized per item."""
+    if path.endswith('.json'):
+        # Legacy export written as one JSON array; this is the only non-streaming path
         with open(path, 'r', encoding='utf-8') as f:
             items = json.load(f)
-    except Exception as e:
-        print('Failed to read feedback_export.json:', e)
+        for start in range(0, len(items), chunk_size):
+            yield [json.dumps(it) for it in items[start:start + chunk_size]]
         return
+    chunk = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
 
-    print(f'Loaded {len(items)} feedback records.')
-    # Here you would transform items into training examples and run fine-tuning
-    # For now we just print a small sample
-    for i, item in enumerate(items[:5]):
-        print(f'- [{i}] user={item.get("userId")}, feedback_keys={list((item.get("feedback") or {}).keys())}')
-    print('Retrain stub complete.')
 
-if __name__ == '__main__':
-    main()
+def _init_worker(stats):
+    global _WORKER_FEATURIZER
+    _WORKER_FEATURIZER = Featurizer.from_stats(stats)
+
+
+def _is_holdout(line, holdout_pct):
+    return holdout_pct > 0 and zlib.crc32(line.encode('utf-8')) % 100 < holdout_pct
+
+
+def _parse_chunk(lines):
+    payloads, labels, kept_lines, skipped = [], [], [], 0
+    for line in lines:
+        try:
+            example = record_to_example(json.loads(line))
+        except ValueError:
+            example = None
+        if example is None:
+            skipped += 1
+            continue
+        payloads.append(example[0])
+        labels.append(example[1])
+        kept_lines.append(line)
+    return payloads, labels, kept_lines, skipped
+
+
+def prepare_chunk(lines, holdout_pct):
+    """Worker task: featurize a chunk and split it into train/holdout arrays."""
+    payloads, labels, raw_lines, skipped = _parse_chunk(lines)
+    if not payloads:
+        empty = np.empty((0, _WORKER_FEATURIZER.num_features), dtype=np.float32)
+        return empty, np.empty(0, dtype=np.int64), empty, np.empty(0, dtype=np.int64), skipped
+    x, errors = _WORKER_FEATURIZER.featurize(payloads, strict=False)
+    y = np.asarray(labels, dtype=np.int64)
+    ok = np.asarray([e is None for e in errors])
+    hold = np.asarray([_is_holdout(line, holdout_pct) for line in raw_lines]) & ok
+    train = ok & ~hold
+    return x[train], y[train], x[hold], y[hold], skipped + int((~ok).sum())
+
+
+def chunk_moments(lines):
+    """Worker task: per-feature count/sum/sum-of-squares of raw (unnormalized) values."""
+    payloads, _, _, _ = _parse_chunk(lines)
+    f = _WORKER_FEATURIZER.num_features
+    if not payloads:
+        return np.zeros(f), np.zeros(f), np.zeros(f)
+    raw, _ = _WORKER_FEATURIZER.fill_raw(payloads, strict=False)  # fill is NaN here, so gaps stay NaN
+    raw = raw.astype(np.float64)
+    present = ~np.isnan(raw)
+    return present.sum(axis=0), np.nansum(raw, axis=0), np.nansum(raw * raw, axis=0)
+
+
+def run_chunks(executor, workers, task, path, chunk_size, *args):
+    """Map ``task`` over line chunks with at most 2 x workers chunks in flight, yielding in order."""
+    window = max(1, workers * 2)
+    chunks = iter_line_chunks(path, chunk_size)
+    pending = {}
+    next_submit = next_yield = 0
+    exhausted = False
+    while True:
+        while not exhausted and len(pending) < window:
+            try:
+                lines = next(chunks)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[next_submit] = executor.submit(task, lines, *args)
+            next_submit += 1
+        if next_yield not in pending:
+            return
+        fut = pending[next_yield]
+        if not fut.done():
+            wait([fut], return_when=FIRST_COMPLETED)
+        yield pending.pop(next_yield).result()
+        next_yield += 1
+
+
+def fit_stats(path, chunk_size, workers, version):
+    """Stream the export once to compute feature means/stds (missing values excluded)."""
+    base = get_featurizer()
+    nan_stats = dict(base.to_stats(), fill=[float('nan')] * base.num_features)
+    ctx = multiprocessing.get_context('spawn')
+    count = total = total_sq = 0.0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(nan_stats,)) as ex:
+        for n, s, sq in run_chunks(ex, workers, chunk_moments, path, chunk_size):
+            count, total, total_sq = count + n, total + s, total_sq + sq
+    safe = np.maximum(count, 1)
+    means = np.where(count > 0, total / safe, base.means)
+    var = np.maximum(total_sq / safe - means * means, 0.0)
+    stds = np.where(count > 1, np.sqrt(var), base.stds)
+    stds = np.where(stds > 1e-6, stds, 1.0)
+    return {
+        'version': version,
+        'features': list(base.features),
+        'means': means.tolist(),
+        'stds': stds.tolist(),
+        # Impute missing values at the mean, i.e. 0 after normalization
+        'fill': means.tolist(),
+    }
 
 
+def rebase_first_layer(model, old_stats, new_stats):
+    """Rewrite layer 0 so a warm-started model sees identical inputs under new normalization.
+
+    x_old = (r - m_old) / s_old and x_new = (r - m_new) / s_new, so
+    W x_old + b = (W * s_new / s_old) x_new + W (m_new - m_old) / s_old + b.
+    """
+    m_old, s_old = np.asarray(old_stats['means']), np.asarray(old_stats['stds'])
+    m_new, s_new = np.asarray(new_stats['means']), np.asarray(new_stats['stds'])
+    layer = model.net[0]
+    with torch.no_grad():
+        w = layer.weight.detach().cpu().numpy().astype(np.float64)
+        shift = w @ ((m_new - m_old) / s_old)
+        layer.weight.copy_(torch.from_numpy((w * (s_new / s_old)).astype(np.float32)))
+        layer.bias.add_(torch.from_numpy(shift.astype(np.float32)))
+
+
+def evaluate(model, x, y):
+    if len(y) == 0:
+        return None
+    model.eval()
+    with torch.no_grad():
+        logits = model.net(torch.from_numpy(x))
+        loss = F.cross_entropy(logits, torch.from_numpy(y)).item()
+        acc = (logits.argmax(dim=1).numpy() == y).mean().item()
+    return {'logLoss': round(loss, 5), 'accuracy': round(acc, 5), 'n': int(len(y))}
+
+
+def resolve_warm_start(spec, out_dir):
+    from backend.models.ai_service.modelRegistry import CHECKPOINT_SUFFIX, list_checkpoints
+
+    if not spec or spec == 'none':
+        return None
+    if spec != 'latest':
+        return spec
+    for version in reversed(list_checkpoints(out_dir)):
+        path = os.path.join(out_dir, version + CHECKPOINT_SUFFIX)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def write_outputs(model, stats, version, out_dir, meta, export_npz=True):
+    """Write <version>.pt (plus .npz and featureStats JSON) atomically into the registry directory."""
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, version)
+    stats_path = base + '.featureStats.json'
+    with open(stats_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+    os.replace(stats_path + '.tmp', stats_path)
+    if export_npz:
+        with open(base + '.npz.tmp', 'wb') as f:
+            save_weights(export_weights(model), f, version=version, input_dim=model.input_dim,
+                         num_classes=model.num_classes, featureStats=stats)
+    blob = {
+        'state_dict': {k: v.detach().cpu() for k, v in model.state_dict().items()},
+        'input_dim': model.input_dim,
+        'num_classes': model.num_classes,
+        'version': version,
+        'featureStats': stats,
+        **meta,
+    }
+    torch.save(blob, base + '.pt.tmp')
+    os.replace(base + '.pt.tmp', base + '.pt')
+    # The export is renamed in only once the checkpoint exists, so a registry that
+    # sees the new version never finds it as an .npz alone (no explain support)
+    if export_npz:
+        os.replace(base + '.npz.tmp', base + '.npz')
+    return base + '.pt'
+
+
+def train(args):
+    from backend.models.ai_service.modelRegistry import load_checkpoint
+
+    started = time.perf_counter()
+    torch.manual_seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+    version = args.version or time.strftime('v%Y%m%d-%H%M%S')
+
+    warm_path = resolve_warm_start(args.warm_start, args.out_dir)
+    base_version = None
+    if warm_path:
+        model, base_version, warm_featurizer = load_checkpoint(warm_path)
+        base_stats = (warm_featurizer or get_featurizer()).to_stats()
+        print(f'Warm-starting from {base_version} ({warm_path})')
+    else:
+        model = DiagnosisModel(input_dim=len(FEATURE_NAMES), num_classes=len(LABELS), device='cpu')
+        base_stats = get_featurizer().to_stats()
+    model.to('cpu')
+    model.device = 'cpu'
+
+    if args.refit_stats:
+        stats = fit_stats(args.input, args.chunk_size, args.workers, version)
+        if warm_path:
+            rebase_first_layer(model, base_stats, stats)
+        print('Refit feature stats:', json.dumps({'means': [round(m, 3) for m in stats['means']]}))
+    else:
+        stats = dict(base_stats)
+
+    optimizer = torch.optim.Adam(model.parameters(), lr=args.lr, weight_decay=args.weight_decay)
+    ctx = multiprocessing.get_context('spawn')
+    val_x, val_y, val_rows = [], [], 0
+    seen = skipped = 0
+    history = []
+    baseline = None
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx, initializer=_init_worker, initargs=(stats,)) as ex:
+        for epoch in range(args.epochs):
+            model.train()
+            total_loss, batches, rows = 0.0, 0, 0
+            for x, y, hx, hy, bad in run_chunks(ex, args.workers, prepare_chunk, args.input, args.chunk_size, args.holdout_pct):
+                if epoch == 0:
+                    skipped += bad
+                    seen += len(y) + len(hy)
+                    if len(hy) and val_rows < args.max_holdout:
+                        take = min(len(hy), args.max_holdout - val_rows)
+                        val_x.append(hx[:take])
+                        val_y.append(hy[:take])
+                        val_rows += take
+                order = rng.permutation(len(y))
+                for s in range(0, len(order), args.batch_size):
+                    idx = order[s:s + args.batch_size]
+                    xb = torch.from_numpy(x[idx])
+                    yb = torch.from_numpy(y[idx])
+                    optimizer.zero_grad(set_to_none=True)
+                    loss = F.cross_entropy(model.net(xb), yb)
+                    loss.backward()
+                    optimizer.step()
+                    total_loss += loss.item() * len(idx)
+                    batches += 1
+                    rows += len(idx)
+            if epoch == 0 and val_x:
+                vx, vy = np.concatenate(val_x), np.concatenate(val_y)
+                if warm_path:
+                    # Score the starting weights on the same holdout; needs a fresh load since training began
+                    start_model = load_checkpoint(warm_path)[0].to('cpu')
+                    if args.refit_stats:
+                        rebase_first_layer(start_model, base_stats, stats)
+                    baseline = evaluate(start_model, vx, vy)
+            val = evaluate(model, vx, vy) if val_x else None
+            entry = {'epoch': epoch + 1, 'trainLoss': round(total_loss / rows, 5) if rows else None, 'rows': rows,
+                     'batches': batches, 'holdout': val}
+            history.append(entry)
+            print(json.dumps(entry))
+            if rows == 0:
+                break
+
+    if not history or history[0]['rows'] == 0:
+        print(f'No usable training examples in {args.input} ({skipped} records skipped). Nothing written.')
+        return 1
+
+    meta = {
+        'baseVersion': base_version,
+        'trainedAt': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'trainingRecords': seen,
+        'skippedRecords': skipped,
+        'metrics': {'baseline': baseline, 'final': history[-1]['holdout'], 'history': history},
+    }
+    path = write_outputs(model.eval(), stats, version, args.out_dir, meta, export_npz=not args.no_npz)
+    print(f'Wrote {path} in {time.perf_counter() - started:.1f}s '
+          f'({seen} examples, {skipped} skipped, baseline={baseline}, final={history[-1]["holdout"]})')
+    return 0
+
+
+def _default_input():
+    for name in DEFAULT_INPUTS:
+        path = os.path.join(os.getcwd(), name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(os.getcwd(), DEFAULT_INPUTS[0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train or fine-tune DiagnosisModel from HITL feedback (JSONL).')
+    parser.add_argument('--input', default=None, help='feedback export (.jsonl; legacy .json arrays are accepted)')
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR, help='checkpoint directory served by the model registry')
+    parser.add_argument('--version', help='checkpoint version (default: timestamp)')
+    parser.add_argument('--warm-start', default='latest', help="'latest', 'none', or a .pt path")
+    parser.add_argument('--refit-stats', action='store_true', help='recompute normalization stats from the export')
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--weight-decay', type=float, default=1e-4)
+    parser.add_argument('--chunk-size', type=int, default=4096, help='records per data-prep task')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument('--holdout-pct', type=int, default=10)
+    parser.add_argument('--max-holdout', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-npz', action='store_true', help='skip the NumPy weights export')
+    args = parser.parse_args(argv)
+    args.input = args.input or _default_input()
+
+    if not os.path.exists(args.input):
+        print(f'No feedback export found at {args.input}. Nothing to retrain.')
+        return 0
+    if torch is None:
+        print('torch is required for training (pip install -r backend/models/requirements.txt).')
+        return 2
+    return train(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -65,7 +65,7 @@ async function saveFeedback(userId, feedback) {
 }
 
 async function saveRetrainingRecord(userId, feedback) {
-  // Save records to Firestore if available; otherwise append to a local JSON file for dev
+  // Save records to Firestore if available; otherwise append to a local JSONL file for dev
   if (admin) {
     const db = admin.firestore();
     const ref = await db.collection('retraining_records').add({ userId, feedback, createdAt: admin.firestore.FieldValue.serverTimestamp() });
@@ -74,13 +74,9 @@ async function saveRetrainingRecord(userId, feedback) {
   try {
     const fs = require('fs');
     const path = require('path');
-    const file = path.join(process.cwd(), 'feedback_export.json');
-    let items = [];
-    if (fs.existsSync(file)) {
-      items = JSON.parse(fs.readFileSync(file, 'utf8') || '[]');
-    }
-    items.push({ userId, feedback, createdAt: new Date().toISOString() });
-    fs.writeFileSync(file, JSON.stringify(items, null, 2));
+    // One record per line so appends stay O(1) and retrainModel.py can stream the file
+    const file = path.join(process.cwd(), 'feedback_export.jsonl');
+    fs.appendFileSync(file, JSON.stringify({ userId, feedback, createdAt: new Date().toISOString() }) + '\n');
     return { file };
   } catch (_) {
     return { skipped: true };
@@ -11,7 +11,9 @@ httpClient.interceptors.response.use(
   async (error) => {
     const config = error.config || {};
     const status = error.response && error.response.status;
-    const shouldRetry = !config.__retryCount && (status >= 500 || !status);
+    // A 503 for an exceeded request deadline means the caller's budget is spent; retrying cannot help
+    const deadlineExceeded = status === 503 && error.response.data && error.response.data.error === 'deadline exceeded';
+    const shouldRetry = !config.__retryCount && !deadlineExceeded && (status >= 500 || !status);
     if (shouldRetry) {
       config.__retryCount = (config.__retryCount || 0) + 1;
       if (config.__retryCount <= 2) {